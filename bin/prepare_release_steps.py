@@ -6,10 +6,21 @@ import pathlib
 import json
 import logging
 import calendar
+import shlex
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from colorama import Fore, Style
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.git_lookup_index import GitLookupIndex
+from development_utils.git_mirror_cache import DEFAULT_MIRROR_DIR, GitMirrorCache, git
+from development_utils.git_refs import RefIndex, format_version
+from development_utils.jira_client import DEFAULT_CONFIG_FILE as DEFAULT_JIRA_CONFIG_FILE, UpdateQueue, load_jira_config, spawn_flush
+from development_utils.logging_setup import setup_logging
+from development_utils.run_history import RunHistory
+
 today = str(datetime.today().strftime('%Y-%m-%d'))
 
 DEFAULT_BITBUCKET_CONFIG_FILE = os.environ.get('HOME') + '/.config/my_bitbucket/git_clone_lookup.txt'
@@ -20,48 +31,356 @@ LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(me
 
 LOG_LEVEL = logging.INFO
 
+DEFAULT_MAX_MENU_SIZE = 50
+
+DEFAULT_MAX_WORKERS = 8
+
+DEFAULT_JIRA_WORKDIR = '/tmp/jira'
+
+MANIFEST_COLUMNS = ('code_base', 'version', 'jira_issue')
+
+
+def select_code_base(git_lookup, code_base):
+    """Resolve the code-base against the lookup index, prompting the user when ambiguous or not exact
+    :param git_lookup: {GitLookupIndex} the compiled lookup index
+    :param code_base: {str} the code-base, prefix or approximate name - may be None
+    :return code_base: {str} an exact code-base name in the lookup
+    """
+    while True:
+        if code_base is None or code_base.strip() == '':
+            code_base = input("Please enter the code-base (name, prefix or approximate name): ")
+            code_base = code_base.strip()
+            continue
+
+        candidates = git_lookup.resolve(code_base, limit=DEFAULT_MAX_MENU_SIZE)
+
+        if len(candidates) == 1:
+            if candidates[0] == code_base:
+                return code_base
+            # A prefix or fuzzy match may be the wrong repository; --execute would merge, tag and push it.
+            answer = input("Code-base '{}' is not in the lookup - use '{}' instead? [y/N] ".format(code_base, candidates[0]))
+            if answer.strip().upper() == 'Y':
+                return candidates[0]
+            code_base = None
+            continue
+
+        if len(candidates) == 0:
+            print(Fore.RED + "No code-base matches '{}'".format(code_base))
+            print(Style.RESET_ALL + '', end='')
+            code_base = None
+            continue
+
+        if len(candidates) > DEFAULT_MAX_MENU_SIZE:
+            print(Fore.YELLOW + "'{}' matches '{}' code-bases - please be more specific".format(code_base, len(candidates)))
+            print(Style.RESET_ALL + '', end='')
+            code_base = None
+            continue
+
+        number_to_code_base_lookup = {}
+        for number, candidate in enumerate(candidates, start=1):
+            print("{}. {}".format(number, candidate))
+            number_to_code_base_lookup[str(number)] = candidate
+
+        selection = input("Please choose the code-base: ")
+        selection = selection.strip()
+        if selection not in number_to_code_base_lookup:
+            raise Exception("Invalid select: '{}'".format(selection))
+
+        return number_to_code_base_lookup[selection]
+
+
+def get_release_git_commands(version, jira_issue):
+    """Derive the git commands executed inside the cloned code-base
+    :param version: {str} the software version
+    :param jira_issue: {str} the JIRA issue identifier
+    :return commands: {list} of git argument lists, without the leading 'git'
+    """
+    return [
+        ['merge', 'origin/release/{}'.format(version)],
+        ['checkout', 'devel'],
+        ['merge', 'origin/release/{}'.format(version)],
+        ['checkout', 'master'],
+        ['push'],
+        ['tag', '-a', version, '-m', 'Establishing {} annotated tag on {}.  Reference: {}'.format(version, today, jira_issue)],
+        ['push', 'origin', version],
+    ]
+
+
+def get_release_steps(code_base, repo, version, jira_issue, workdir):
+    """Derive the shell commands for releasing one code-base
+    :param code_base: {str} the code-base
+    :param repo: {str} the repository URL
+    :param version: {str} the software version
+    :param jira_issue: {str} the JIRA issue identifier
+    :param workdir: {str} the directory the repository will be cloned into
+    :return steps: {list} the shell commands in execution order
+    """
+    steps = [
+        "mkdir -p {}".format(workdir),
+        "cd {}".format(workdir),
+        "git clone {}".format(repo),
+        "cd {}".format(code_base),
+    ]
+
+    for args in get_release_git_commands(version, jira_issue):
+        steps.append(shlex.join(['git'] + args))
+
+    return steps
+
+
+def execute_release(code_base, repo, version, jira_issue, workdir, mirror_cache):
+    """Execute the release steps, cloning from the local reference mirror
+    :param code_base: {str} the code-base
+    :param repo: {str} the repository URL
+    :param version: {str} the software version
+    :param jira_issue: {str} the JIRA issue identifier
+    :param workdir: {str} the directory the repository will be cloned into
+    :param mirror_cache: {GitMirrorCache} the reference mirror cache
+    :return checkout: {str} the cloned working copy
+    """
+    pathlib.Path(workdir).mkdir(parents=True, exist_ok=True)
+
+    checkout = os.path.join(workdir, code_base)
+
+    start = time.monotonic()
+    mirror_cache.clone(repo, checkout)
+    logging.info("Cloned '{}' in '{:.1f}' seconds".format(repo, time.monotonic() - start))
+
+    errors, warnings = RefIndex.from_repo(checkout).validate(version)
+    for warning in warnings:
+        logging.warning("Code-base '{}': {}".format(code_base, warning))
+    if errors:
+        raise Exception("; ".join(errors))
+
+    for args in get_release_git_commands(version, jira_issue):
+        git(args, cwd=checkout, history=mirror_cache.history)
+
+    logging.info("Executed the release steps for code-base '{}' version '{}' in '{}'".format(code_base, version, checkout))
+
+    return checkout
+
+
+def queue_jira_comments(releases, jira_config_file):
+    """Queue a comment on the JIRA issue of every executed release and flush them in the background
+    :param releases: {list} of (code_base, version, jira_issue) tuples
+    :param jira_config_file: {str} the INI file with the [jira] url and credentials
+    :return queued: {int} the number of comments queued
+    """
+    if not releases:
+        return 0
+
+    if not load_jira_config(jira_config_file)['url']:
+        print(Fore.YELLOW + "The Jira url is not defined in '{}' so the JIRA issues will not be updated".format(jira_config_file))
+        print(Style.RESET_ALL + '', end='')
+        return 0
+
+    with UpdateQueue() as update_queue:
+        for code_base, version, jira_issue in releases:
+            update_queue.enqueue(jira_issue, 'comment', "Established the {} annotated tag of {} on {} and merged release/{} into master and devel.".format(
+                version, code_base, today, version))
+        queue_file = update_queue.queue_file
+
+    # Jira latency must not hold up the release run; util/jira_queue.py status shows what is still pending.
+    spawn_flush(queue_file, jira_config_file)
+
+    print("Queued '{}' JIRA comments - they are sent in the background".format(len(releases)))
+
+    return len(releases)
 
-def get_git_lookup(infile):
-    """Parse the bitbucket lookup file
-    :param infile: {str} file containing the listing of the Bitbucket repo
-    :return git_lookup: {dict} 
+
+def get_ref_index(repo, repo_dir=None, mirror_cache=None, mirror_dir=None):
+    """Index the tags and branches of the code-base from a local copy, without contacting the server
+    :param repo: {str} the repository URL
+    :param repo_dir: {str} a local working copy or mirror - takes precedence
+    :param mirror_cache: {GitMirrorCache} when specified, the mirror is updated first
+    :param mirror_dir: {str} the reference mirror cache searched for an existing mirror
+    :return index: {RefIndex} or None when no local copy is available
+    """
+    if repo_dir is None:
+        if mirror_cache is not None:
+            repo_dir = mirror_cache.update(repo)
+        elif os.path.isdir(mirror_dir):
+            repo_dir = GitMirrorCache(mirror_dir).mirror_path(repo)
+
+    if repo_dir is None or not os.path.exists(repo_dir):
+        logging.info("No local copy of '{}' - cannot suggest or validate the version".format(repo))
+        return None
+
+    return RefIndex.from_repo(repo_dir)
+
+
+def read_manifest(manifest_file, default_jira_issue=None):
+    """Parse the batch release CSV manifest
+    :param manifest_file: {str} CSV file with header code_base,version,jira_issue
+    :param default_jira_issue: {str} used for rows that do not specify a JIRA issue
+    :return rows: {list} of dict
+    """
+    rows = []
+
+    with open(manifest_file, newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in MANIFEST_COLUMNS[:2] if column not in (reader.fieldnames or [])]
+        if missing:
+            raise Exception("manifest '{}' is missing column(s): {}".format(manifest_file, ', '.join(missing)))
+
+        for line_number, row in enumerate(reader, start=2):
+            row = {column: (row.get(column) or '').strip() for column in MANIFEST_COLUMNS}
+            if row['code_base'] == '' and row['version'] == '':
+                continue
+            if row['jira_issue'] == '':
+                row['jira_issue'] = default_jira_issue or ''
+            row['line_number'] = line_number
+            rows.append(row)
+
+    logging.info("Read '{}' rows from manifest '{}'".format(len(rows), manifest_file))
+
+    return rows
+
+
+def prepare_release(git_lookup, row, outdir, mirror_cache=None):
+    """Prepare the release step script for one manifest row
+    :param git_lookup: {GitLookupIndex} the compiled lookup index
+    :param row: {dict} the manifest row
+    :param outdir: {str} the directory the step script will be written to
+    :param mirror_cache: {GitMirrorCache} when specified, the steps are also executed
+    :return result: {dict} the row augmented with repo, script, steps, status and error
+    """
+    result = dict(row, repo=None, script=None, steps=[], status='FAILED', error=None)
+
+    if row['version'] == '':
+        result['error'] = "no version specified"
+        return result
+
+    if row['jira_issue'] == '':
+        result['error'] = "no JIRA issue specified"
+        return result
+
+    # Nobody confirms a manifest row, so only an exact name is accepted.
+    if row['code_base'] not in git_lookup:
+        candidates = git_lookup.resolve(row['code_base'])
+        if candidates:
+            result['error'] = "code-base '{}' is not in the lookup - did you mean: {}".format(row['code_base'], ', '.join(candidates))
+        else:
+            result['error'] = "code-base '{}' is not in the lookup".format(row['code_base'])
+        return result
+
+    code_base = row['code_base']
+    repo = git_lookup[code_base]
+    workdir = os.path.join(DEFAULT_JIRA_WORKDIR, row['jira_issue'])
+    steps = get_release_steps(code_base, repo, row['version'], row['jira_issue'], workdir)
+
+    script = os.path.join(outdir, "{}_{}.sh".format(code_base, row['version']))
+    with open(script, 'w') as of:
+        of.write("#!/bin/sh\nset -e\n\n")
+        for step in steps:
+            of.write("{}\n".format(step))
+    os.chmod(script, 0o755)
+
+    logging.info("Wrote release step script '{}' for code-base '{}' version '{}'".format(script, code_base, row['version']))
+
+    result.update(code_base=code_base, repo=repo, script=script, steps=steps)
+
+    if mirror_cache is not None:
+        try:
+            execute_release(code_base, repo, row['version'], row['jira_issue'], workdir, mirror_cache)
+        except Exception as e:
+            logging.error("Execution of the release steps for code-base '{}' failed: {}".format(code_base, e))
+            result['error'] = "execution failed: {}".format(e)
+            return result
+
+    result['status'] = 'OK'
+
+    return result
+
+
+def write_batch_report(results, report_file):
+    """Write the consolidated batch release report
+    :param results: {list} the results returned by prepare_release
+    :param report_file: {str} the report file
     """
-    lookup = {}
+    with open(report_file, 'w') as of:
+        of.write("## Release steps prepared on {}\n\n".format(today))
+        writer = csv.writer(of, delimiter='\t', lineterminator='\n')
+        writer.writerow(['line', 'status', 'code_base', 'version', 'jira_issue', 'script', 'error'])
+        for result in results:
+            writer.writerow([
+                result['line_number'], result['status'], result['code_base'], result['version'],
+                result['jira_issue'], result['script'] or '', result['error'] or '',
+            ])
+
+        for result in results:
+            if result['status'] != 'OK':
+                continue
+            of.write("\n## {} {} ({})\n".format(result['code_base'], result['version'], result['jira_issue']))
+            for step in result['steps']:
+                of.write("{}\n".format(step))
+
+    logging.info("Wrote batch release report '{}'".format(report_file))
+
+
+def run_batch(git_lookup, manifest_file, outdir, max_workers, default_jira_issue=None, mirror_cache=None):
+    """Prepare the releases for every row in the manifest on a worker pool
+    :param git_lookup: {GitLookupIndex} the compiled lookup index
+    :param manifest_file: {str} the CSV manifest
+    :param outdir: {str} the output directory for the report and step scripts
+    :param max_workers: {int} the number of workers
+    :param default_jira_issue: {str} used for rows that do not specify a JIRA issue
+    :param mirror_cache: {GitMirrorCache} when specified, the steps are also executed
+    :return results: {list} one result per manifest row, in manifest order
+    """
+    rows = read_manifest(manifest_file, default_jira_issue)
+    results = []
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(prepare_release, git_lookup, row, outdir, mirror_cache): row for row in rows}
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            if result['status'] == 'OK':
+                print(Fore.GREEN + "Prepared {} {} -> {}".format(result['code_base'], result['version'], result['script']))
+            else:
+                print(Fore.RED + "Could not prepare line {} ({}): {}".format(result['line_number'], result['code_base'], result['error']))
+            print(Style.RESET_ALL + '', end='')
 
-    with open(infile) as f:
-        row_ctr = 0
-        for line in f:
-            parts = line.split()
-            row_ctr += 1
-            lookup[parts[0]] = parts[1]
+    results.sort(key=lambda result: result['line_number'])
 
-        logging.info("Processed '{}' records in tab-delimited file '{}'".format(row_ctr, infile))
+    write_batch_report(results, os.path.join(outdir, 'release_report.txt'))
 
-    return lookup
+    return results
 
 
 @click.command()
 @click.option('--git_lookup_file', help="The default is '{}'".format(DEFAULT_BITBUCKET_CONFIG_FILE))
 @click.option('--logfile', help="The log file")
-@click.option('--code_base', help="The code-base")
+@click.option('--code_base', help="The code-base - a prefix or approximate name will be resolved against the lookup and confirmed")
 @click.option('--version', help="The version")
 @click.option('--jira_issue', help="The JIRA issue identifier")
+@click.option('--manifest', help="CSV file with columns code_base,version,jira_issue (exact code-base names) for preparing several releases in one run")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help="The number of workers in batch mode - default is '{}'".format(DEFAULT_MAX_WORKERS))
+@click.option('--execute', is_flag=True, help="Execute the release steps instead of only printing them")
+@click.option('--mirror_dir', help="The local reference mirror cache used by --execute - default is '{}'".format(DEFAULT_MIRROR_DIR))
 @click.option('--outdir', help="The output directory")
-def main(git_lookup_file, logfile, code_base, version, jira_issue, outdir):
+@click.option('--repo_dir', help="A local working copy or mirror of the code-base used to suggest and validate --version - default is its reference mirror when one exists")
+@click.option('--jira_config_file', default=DEFAULT_JIRA_CONFIG_FILE, help="The INI file with the [jira] url used to comment on the JIRA issue after --execute - default is '{}'".format(DEFAULT_JIRA_CONFIG_FILE))
+@click.option('--no_jira_update', is_flag=True, help="Do not comment on the JIRA issue after --execute")
+def main(git_lookup_file, logfile, code_base, version, jira_issue, manifest, max_workers, execute, mirror_dir, outdir, repo_dir, jira_config_file, no_jira_update):
     """Generate the release steps
     """
 
     error_ctr = 0
 
-    if jira_issue is None:
+    if jira_issue is None and manifest is None:
         print(Fore.RED + "--jira_issue was not specified")
         print(Style.RESET_ALL + '', end='')
         error_ctr += 1
 
+    if manifest is not None and not os.path.exists(manifest):
+        print(Fore.RED + "manifest '{}' does not exist".format(manifest))
+        print(Style.RESET_ALL + '', end='')
+        error_ctr += 1
+
     if error_ctr > 0:
         sys.exit(1)
-    
-    assert isinstance(jira_issue, str)
 
     if git_lookup_file is None:
         git_lookup_file = DEFAULT_BITBUCKET_CONFIG_FILE
@@ -74,7 +393,10 @@ def main(git_lookup_file, logfile, code_base, version, jira_issue, outdir):
         sys.exit(1)
 
     if outdir is None:
-        outdir = '/tmp/jira/' + jira_issue
+        if manifest is not None:
+            outdir = DEFAULT_OUTDIR
+        else:
+            outdir = os.path.join(DEFAULT_JIRA_WORKDIR, jira_issue)
         print(Fore.YELLOW + "--outdir was not specified and therefore was set to '{}'".format(outdir))
         print(Style.RESET_ALL + '', end='')
 
@@ -92,50 +414,79 @@ def main(git_lookup_file, logfile, code_base, version, jira_issue, outdir):
 
     assert isinstance(logfile, str)
 
-    logging.basicConfig(filename=logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
 
-    git_lookup = get_git_lookup(git_lookup_file)
-    number_to_code_base_lookup = {}
-    number = 0
+    git_lookup = GitLookupIndex.load(git_lookup_file)
+    logging.info("Loaded '{}' records from index '{}'".format(len(git_lookup), git_lookup.index_file))
 
-    if code_base is None or code_base == '' or code_base not in git_lookup:
-        for code_base in git_lookup:
-            number += 1
-            print("{}. {}".format(number, code_base))
-            number_to_code_base_lookup[str(number)] = code_base
+    mirror_cache = None
+    if execute:
+        if mirror_dir is None:
+            mirror_dir = DEFAULT_MIRROR_DIR
+            print(Fore.YELLOW + "--mirror_dir was not specified and therefore was set to default '{}'".format(mirror_dir))
+            print(Style.RESET_ALL + '', end='')
+        mirror_cache = GitMirrorCache(mirror_dir, history=RunHistory(os.path.basename(__file__)))
 
-        selection = input("Please choose the code-base: ")
-        selection = selection.strip()
-        if selection not in number_to_code_base_lookup:
-            raise Exception("Invalid select: '{}'".format(selection))
+    if manifest is not None:
+        results = run_batch(git_lookup, manifest, outdir, max_workers, default_jira_issue=jira_issue, mirror_cache=mirror_cache)
+        failed = [result for result in results if result['status'] != 'OK']
+        if mirror_cache is not None and not no_jira_update:
+            queue_jira_comments([(result['code_base'], result['version'], result['jira_issue']) for result in results if result['status'] == 'OK'], jira_config_file)
+        print("\nPrepared '{}' of '{}' releases - see report '{}'".format(len(results) - len(failed), len(results), os.path.join(outdir, 'release_report.txt')))
+        if failed:
+            sys.exit(1)
+        return
 
-        code_base = number_to_code_base_lookup[selection]
+    code_base = select_code_base(git_lookup, code_base)
+
+    repo = git_lookup[code_base]
+
+    ref_index = get_ref_index(repo, repo_dir=repo_dir, mirror_cache=mirror_cache, mirror_dir=mirror_dir or DEFAULT_MIRROR_DIR)
+
+    suggestion = None
+    if ref_index is not None:
+        latest = ref_index.latest_tag()
+        next_build = ref_index.next_build()
+        if next_build is not None:
+            suggestion = format_version(next_build)
+            print("The latest tag is '{}' and the next build is '{}'".format(format_version(latest) if latest else 'none', suggestion))
 
     if version is None or version == '':
-        version = input("Please specify the software version: ")
-        version = version.strip()
+        if suggestion is not None:
+            version = input("Please specify the software version [{}]: ".format(suggestion))
+            version = version.strip() or suggestion
+        else:
+            version = input("Please specify the software version: ")
+            version = version.strip()
         if version is None or version == '':
             raise Exception("Invalid version '{}'".format(version))
 
-    repo = git_lookup[code_base]
+    if ref_index is not None:
+        errors, warnings = ref_index.validate(version)
+        for warning in warnings:
+            print(Fore.YELLOW + "Warning: {}".format(warning))
+            print(Style.RESET_ALL + '', end='')
+        if errors:
+            for error in errors:
+                print(Fore.RED + error)
+                print(Style.RESET_ALL + '', end='')
+            sys.exit(1)
 
     logging.info("The code-base is '{}'".format(code_base))
     logging.info("The software version is '{}'".format(version))
     logging.info("The repository is '{}'".format(repo))
 
-    print("\nExecute the following steps:\n\n")
-    print("mkdir -p {}".format(outdir))
-    print("cd {}".format(outdir))
-    print("git clone {}".format(repo))
-    print("cd {}".format(code_base))
-    print("git merge origin/release/{}".format(version))
-    print("git checkout devel")
-    print("git merge origin/release/{}".format(version))
-    print("git checkout master")
-    print("git push")
-    print("git tag -a {} -m 'Establishing {} annotated tag on {}.  Reference: {}'".format(version, version, today, jira_issue))
-    print("git push origin {}".format(version))
+    if mirror_cache is not None:
+        checkout = execute_release(code_base, repo, version, jira_issue, outdir, mirror_cache)
+        print(Fore.GREEN + "Executed the release steps in '{}'".format(checkout))
+        print(Style.RESET_ALL + '', end='')
+        if not no_jira_update:
+            queue_jira_comments([(code_base, version, jira_issue)], jira_config_file)
+        return
 
+    print("\nExecute the following steps:\n\n")
+    for step in get_release_steps(code_base, repo, version, jira_issue, outdir):
+        print(step)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,5 @@
+"""Shared Python modules for the dev-utils scripts.
+
+Scripts under util/ and bin/ add this directory's parent to sys.path in the
+same way the Perl scripts use lib "$FindBin::Bin/../lib".
+"""
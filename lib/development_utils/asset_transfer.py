@@ -0,0 +1,449 @@
+"""Batched, delta-aware transfer of the assets named in a list file.
+
+scp_assets_by_list_file.pl runs one scp (and one ssh per backup or mkdir)
+for every asset, so each file pays a full SSH handshake.  Here the target is
+asked once for the state of all the listed files, the files it already has
+are skipped, and the rest are grouped into a few batches.  Each batch is one
+tar stream written into a single extracting command on the target, and at
+most max_parallel batches run at the same time.
+
+Two ways of deciding that the target already has a file:
+
+    stat      same size and the same mtime (to the second) - the default
+    checksum  same digest, computed on both sides; only files whose sizes
+              match are hashed
+
+Backends provide the target's state and the extracting command:
+
+    LocalBackend  a directory on this machine, for testing and for mounted shares
+    SshBackend    user@host:dir through one multiplexed connection
+                  (ControlMaster) shared by every query and batch
+"""
+import logging
+import os
+import shlex
+import shutil
+import subprocess
+import tarfile
+import tempfile
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from .checksum_manifest import DEFAULT_ALGORITHM, hash_file, walk_files
+
+DEFAULT_MAX_PARALLEL = 4
+
+DEFAULT_BATCH_FILES = 1000
+
+DEFAULT_BATCH_BYTES = 64 * 1024 * 1024
+
+COMPARE_MODES = ('stat', 'checksum')
+
+DEFAULT_COMPARE = 'stat'
+
+DEFAULT_HASH_WORKERS = os.cpu_count() or 1
+
+# The coreutils program computing each hashlib digest on an SSH target.
+REMOTE_DIGEST_PROGRAMS = {
+    'md5': 'md5sum',
+    'sha1': 'sha1sum',
+    'sha224': 'sha224sum',
+    'sha256': 'sha256sum',
+    'sha384': 'sha384sum',
+    'sha512': 'sha512sum',
+    'blake2b': 'b2sum',
+}
+
+# (size, mtime in seconds, digest or None)
+FileState = Tuple[int, int, Optional[str]]
+
+
+@dataclass
+class TransferResult:
+    """Outcome of one transfer."""
+    files: int = 0
+    skipped: List[str] = field(default_factory=list)
+    sent: List[str] = field(default_factory=list)
+    bytes_sent: int = 0
+    batches: int = 0
+    backed_up: int = 0
+    errors: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+
+
+def read_asset_list(asset_list_file: str) -> List[str]:
+    """Read the asset list, skipping blank lines and comments.
+
+    Lines copied from git status ('modified:   path') are accepted as well.
+    :param asset_list_file: {str} - one file or directory per line
+    :return assets: {list} - in file order, without duplicates
+    """
+    assets = []
+    with open(asset_list_file) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            if line.startswith('modified:'):
+                line = line[len('modified:'):].strip()
+            assets.append(line)
+
+    return list(dict.fromkeys(assets))
+
+
+def expand_assets(indir: str, assets: Iterable[str]) -> Tuple[Dict[str, os.stat_result], List[str]]:
+    """Resolve the listed assets to regular files relative to indir, walking directories.
+    :param indir: {str} - the project base directory
+    :param assets: {list} - paths relative to indir or absolute paths under it
+    :return files, missing: {tuple} - relative path to stat, and the assets that do not exist
+    """
+    files = {}
+    missing = []
+
+    for asset in assets:
+        path = asset if os.path.isabs(asset) else os.path.join(indir, asset)
+        relpath = os.path.relpath(path, indir)
+        if relpath.startswith(os.pardir):
+            raise Exception(f"asset '{asset}' is not under '{indir}'")
+
+        if os.path.isdir(path):
+            for child, st in sorted(walk_files(path)):
+                files[os.path.normpath(os.path.join(relpath, child))] = st
+        elif os.path.isfile(path):
+            files[os.path.normpath(relpath)] = os.stat(path)
+        else:
+            missing.append(asset)
+
+    return files, missing
+
+
+def make_batches(files: Dict[str, os.stat_result], max_files: int = DEFAULT_BATCH_FILES, max_bytes: int = DEFAULT_BATCH_BYTES) -> List[List[str]]:
+    """Group files, in path order, into batches bounded by count and bytes."""
+    batches = []
+    current = []
+    current_bytes = 0
+
+    for relpath in sorted(files):
+        size = files[relpath].st_size
+        if current and (len(current) >= max_files or current_bytes + size > max_bytes):
+            batches.append(current)
+            current = []
+            current_bytes = 0
+        current.append(relpath)
+        current_bytes += size
+
+    if current:
+        batches.append(current)
+
+    return batches
+
+
+def write_batch(indir: str, relpaths: List[str], fileobj) -> int:
+    """Write one batch as an uncompressed tar stream.
+    :return bytes: {int} - the content bytes written
+    """
+    size = 0
+    with tarfile.open(fileobj=fileobj, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+        for relpath in relpaths:
+            tarinfo = tar.gettarinfo(os.path.join(indir, relpath), arcname=relpath)
+            with open(os.path.join(indir, relpath), 'rb') as f:
+                tar.addfile(tarinfo, f)
+            size += tarinfo.size
+    return size
+
+
+class TransferBackend:
+    """A target the batches are extracted into."""
+
+    def describe(self) -> str:
+        raise NotImplementedError
+
+    def open(self) -> None:
+        """Prepare the target, e.g. create the directory or the shared connection."""
+
+    def close(self) -> None:
+        pass
+
+    def state(self, relpaths: List[str], algorithm: Optional[str] = None) -> Dict[str, FileState]:
+        """The state of the files that exist on the target.
+        :param relpaths: {list} - paths relative to the target directory
+        :param algorithm: {str} - when specified, the digests are computed too
+        :return state: {dict} - relative path to (size, mtime, digest)
+        """
+        raise NotImplementedError
+
+    def backup(self, relpaths: List[str], suffix: str) -> None:
+        """Copy existing target files aside before they are overwritten."""
+        raise NotImplementedError
+
+    def extract_argv(self) -> List[str]:
+        """The command reading a tar stream on STDIN into the target directory."""
+        raise NotImplementedError
+
+
+class LocalBackend(TransferBackend):
+    """A directory on this machine."""
+
+    def __init__(self, target_dir: str):
+        self.target_dir = os.path.abspath(target_dir)
+
+    def describe(self) -> str:
+        return self.target_dir
+
+    def open(self) -> None:
+        os.makedirs(self.target_dir, exist_ok=True)
+
+    def state(self, relpaths: List[str], algorithm: Optional[str] = None) -> Dict[str, FileState]:
+        state = {}
+        for relpath in relpaths:
+            path = os.path.join(self.target_dir, relpath)
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+            state[relpath] = (st.st_size, int(st.st_mtime), hash_file(path, algorithm)[0] if algorithm else None)
+        return state
+
+    def backup(self, relpaths: List[str], suffix: str) -> None:
+        for relpath in relpaths:
+            path = os.path.join(self.target_dir, relpath)
+            shutil.copy2(path, path + suffix)
+
+    def extract_argv(self) -> List[str]:
+        return ['tar', '-x', '-f', '-', '-C', self.target_dir]
+
+
+class SshBackend(TransferBackend):
+    """A directory on a remote machine, reached through one multiplexed SSH connection."""
+
+    def __init__(self, host: str, target_dir: str, username: Optional[str] = None, ssh_options: Iterable[str] = ()):
+        """Constructor
+        :param host: {str} - the target machine
+        :param target_dir: {str} - the directory on the target machine
+        :param username: {str} - default is the ssh default for the host
+        :param ssh_options: {list} - extra ssh arguments, e.g. ['-p', '2222']
+        """
+        self.destination = f"{username}@{host}" if username else host
+        self.target_dir = target_dir
+        self.ssh_options = list(ssh_options)
+        self._control_dir = None
+
+    def describe(self) -> str:
+        return f"{self.destination}:{self.target_dir}"
+
+    def _control(self) -> List[str]:
+        return ['-o', f"ControlPath={os.path.join(self._control_dir, 'control')}"] if self._control_dir else []
+
+    def _ssh(self, command: str) -> List[str]:
+        return ['ssh', '-o', 'BatchMode=yes'] + self._control() + self.ssh_options + [self.destination, command]
+
+    def _run(self, command: str, data: bytes = b'') -> bytes:
+        p = subprocess.run(self._ssh(command), input=data, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        if p.returncode != 0:
+            raise Exception(f"'{command}' on '{self.destination}' received status '{p.returncode}': {p.stderr.decode('utf-8', errors='replace').strip()}")
+        return p.stdout
+
+    def open(self) -> None:
+        # A short directory keeps the socket path under the unix socket limit.
+        self._control_dir = tempfile.mkdtemp(prefix='ssh-')
+        subprocess.run(
+            ['ssh', '-o', 'BatchMode=yes', '-o', 'ControlMaster=yes', '-o', 'ControlPersist=yes', '-f', '-N']
+            + self._control() + self.ssh_options + [self.destination],
+            check=True,
+            stdin=subprocess.DEVNULL,
+        )
+        logging.info(f"Opened the shared SSH connection to '{self.destination}'")
+        self._run(f"mkdir -p {shlex.quote(self.target_dir)}")
+
+    def close(self) -> None:
+        if self._control_dir is None:
+            return
+        subprocess.run(['ssh'] + self._control() + ['-O', 'exit'] + self.ssh_options + [self.destination],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        shutil.rmtree(self._control_dir, ignore_errors=True)
+        self._control_dir = None
+
+    def state(self, relpaths: List[str], algorithm: Optional[str] = None) -> Dict[str, FileState]:
+        if algorithm and algorithm not in REMOTE_DIGEST_PROGRAMS:
+            raise Exception(f"checksum algorithm '{algorithm}' cannot be computed on '{self.destination}' - choose from {', '.join(REMOTE_DIGEST_PROGRAMS)}")
+
+        if not relpaths:
+            return {}
+
+        names = b''.join(relpath.encode('utf-8') + b'\0' for relpath in relpaths)
+        cd = f"cd {shlex.quote(self.target_dir)}"
+
+        # Missing files are simply not reported.
+        output = self._run(f"{cd} && xargs -0 -r stat --printf '%s %Y %n\\0' 2>/dev/null; true", names)
+        state = {}
+        for record in output.split(b'\0'):
+            if record:
+                size, mtime, name = record.decode('utf-8', errors='replace').split(' ', 2)
+                state[name] = (int(size), int(mtime), None)
+
+        if algorithm and state:
+            present = b''.join(name.encode('utf-8') + b'\0' for name in state)
+            output = self._run(f"{cd} && xargs -0 -r {REMOTE_DIGEST_PROGRAMS[algorithm]} --zero", present)
+            for record in output.split(b'\0'):
+                if record:
+                    digest, name = record.decode('utf-8', errors='replace').split(' ', 1)
+                    name = name[1:] if name.startswith(('*', ' ')) else name
+                    size, mtime, _ = state[name]
+                    state[name] = (size, mtime, digest)
+
+        return state
+
+    def backup(self, relpaths: List[str], suffix: str) -> None:
+        names = b''.join(relpath.encode('utf-8') + b'\0' for relpath in relpaths)
+        self._run(f"cd {shlex.quote(self.target_dir)} && xargs -0 -r -I{{}} cp -p {{}} {{}}{shlex.quote(suffix)}", names)
+
+    def extract_argv(self) -> List[str]:
+        return self._ssh(f"tar -x -f - -C {shlex.quote(self.target_dir)}")
+
+
+def parse_target(target: str, username: Optional[str] = None) -> TransferBackend:
+    """Create the backend for '[user@]host:dir' or a local directory."""
+    if ':' in target and not target.startswith(('/', '.')):
+        destination, _, target_dir = target.partition(':')
+        if '@' in destination:
+            username, _, destination = destination.partition('@')
+        return SshBackend(destination, target_dir or '.', username=username)
+    return LocalBackend(target)
+
+
+def _send_batch(backend: TransferBackend, indir: str, relpaths: List[str]) -> int:
+    # stderr goes to a file: a pipe nobody reads until the stream is written
+    # would block a chatty extracting tar, and the writer with it.
+    with tempfile.TemporaryFile() as stderr_fh:
+        p = subprocess.Popen(backend.extract_argv(), stdin=subprocess.PIPE, stdout=subprocess.DEVNULL, stderr=stderr_fh)
+        try:
+            size = write_batch(indir, relpaths, p.stdin)
+        except BrokenPipeError:
+            size = 0
+        finally:
+            try:
+                p.stdin.close()
+            except BrokenPipeError:
+                pass
+        p.wait()
+        stderr_fh.seek(0)
+        stderr = stderr_fh.read().decode('utf-8', errors='replace').strip()
+
+    if p.returncode != 0:
+        raise Exception(f"'{' '.join(backend.extract_argv())}' received status '{p.returncode}': {stderr}")
+    if stderr:
+        logging.warning(f"'{' '.join(backend.extract_argv())}' reported: {stderr[-500:]}")
+    return size
+
+
+def _digests(indir: str, relpaths: List[str], algorithm: str, max_workers: int) -> Dict[str, str]:
+    # hashlib releases the GIL for large updates, so threads are enough.
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = executor.map(lambda relpath: hash_file(os.path.join(indir, relpath), algorithm)[0], relpaths)
+        return dict(zip(relpaths, results))
+
+
+def select_changed(
+    indir: str,
+    files: Dict[str, os.stat_result],
+    target_state: Dict[str, FileState],
+    compare: str = DEFAULT_COMPARE,
+    algorithm: str = DEFAULT_ALGORITHM,
+) -> List[str]:
+    """The files the target does not have yet, in path order."""
+    if compare not in COMPARE_MODES:
+        raise Exception(f"unsupported comparison '{compare}' - choose from {', '.join(COMPARE_MODES)}")
+
+    changed = []
+    candidates = []
+    for relpath in sorted(files):
+        st = files[relpath]
+        remote = target_state.get(relpath)
+        if remote is None or remote[0] != st.st_size:
+            changed.append(relpath)
+        elif compare == 'stat' and remote[1] != int(st.st_mtime):
+            changed.append(relpath)
+        elif compare == 'checksum':
+            candidates.append(relpath)
+
+    if candidates:
+        local = _digests(indir, candidates, algorithm, DEFAULT_HASH_WORKERS)
+        changed.extend(relpath for relpath in candidates if local[relpath] != target_state[relpath][2])
+
+    return sorted(changed)
+
+
+def transfer(
+    indir: str,
+    assets: Iterable[str],
+    backend: TransferBackend,
+    compare: str = DEFAULT_COMPARE,
+    algorithm: str = DEFAULT_ALGORITHM,
+    max_parallel: int = DEFAULT_MAX_PARALLEL,
+    batch_files: int = DEFAULT_BATCH_FILES,
+    batch_bytes: int = DEFAULT_BATCH_BYTES,
+    backup: bool = False,
+    dry_run: bool = False,
+) -> TransferResult:
+    """Send the listed assets the target does not already have.
+    :param indir: {str} - the project base directory the assets are relative to
+    :param assets: {list} - files and directories, e.g. from read_asset_list
+    :param backend: {TransferBackend} - the target
+    :param compare: {str} - stat or checksum
+    :param algorithm: {str} - the checksum algorithm
+    :param max_parallel: {int} - the number of batches streamed at the same time
+    :param batch_files: {int} - the maximum number of files per batch
+    :param batch_bytes: {int} - the maximum number of bytes per batch
+    :param backup: {bool} - copy the target files that will be overwritten to <file>.<timestamp>.bak first
+    :param dry_run: {bool} - only determine what would be sent
+    :return result: {TransferResult}
+    """
+    start = time.monotonic()
+    indir = os.path.abspath(indir)
+
+    files, missing = expand_assets(indir, assets)
+    if missing:
+        raise Exception(f"'{len(missing)}' assets do not exist under '{indir}': {', '.join(missing)}")
+
+    result = TransferResult(files=len(files))
+
+    backend.open()
+    try:
+        target_state = backend.state(sorted(files), algorithm if compare == 'checksum' else None)
+        changed = select_changed(indir, files, target_state, compare=compare, algorithm=algorithm)
+        result.skipped = sorted(set(files) - set(changed))
+
+        logging.info(f"'{len(changed)}' of '{len(files)}' files differ from '{backend.describe()}'")
+
+        if dry_run or not changed:
+            result.sent = changed if dry_run else []
+            return result
+
+        existing = [relpath for relpath in changed if relpath in target_state]
+        if backup and existing:
+            backend.backup(existing, '.' + time.strftime('%Y-%m-%d-%H%M%S', time.gmtime()) + '.bak')
+            result.backed_up = len(existing)
+
+        batches = make_batches({relpath: files[relpath] for relpath in changed}, max_files=batch_files, max_bytes=batch_bytes)
+        result.batches = len(batches)
+
+        with ThreadPoolExecutor(max_workers=max_parallel) as executor:
+            futures = [(batch, executor.submit(_send_batch, backend, indir, batch)) for batch in batches]
+            for batch, future in futures:
+                try:
+                    result.bytes_sent += future.result()
+                    result.sent.extend(batch)
+                except Exception as e:
+                    logging.error(f"Could not send a batch of '{len(batch)}' files starting with '{batch[0]}': {e}")
+                    result.errors.append(str(e))
+    finally:
+        backend.close()
+        result.seconds = time.monotonic() - start
+
+    logging.info(f"Sent '{len(result.sent)}' files ({result.bytes_sent} bytes) in '{result.batches}' batches and skipped "
+                 f"'{len(result.skipped)}' to '{backend.describe()}' in '{result.seconds:.2f}' seconds")
+
+    return result
@@ -0,0 +1,500 @@
+"""Content-addressed, deduplicating incremental backups.
+
+A backup splits every file into content-defined chunks and stores each chunk
+once, named by its SHA-256, under <store>/chunks.  A snapshot manifest
+(gzip-compressed JSON under <store>/snapshots) lists every file of the
+source directory with its stat key and its chunk digests, so restoring a
+snapshot streams the chunks back in order, one chunk in memory at a time.
+Directories (including empty ones) and symbolic links, stored as their
+target and never followed, are recorded in the manifest as well; other
+special files such as sockets and FIFOs are skipped and counted.
+
+Chunk boundaries come from a one-bit Gear rolling hash: every byte maps to
+one bit (GEAR_TABLE) and the hash is the shift register of the last
+BOUNDARY_BITS bits; a chunk ends where that register equals BOUNDARY_PATTERN.
+Because the register holds exactly the bits of the last BOUNDARY_BITS bytes,
+the test is a bytes.translate() followed by bytes.find(), which runs in C
+instead of a Python loop per byte.  A boundary depends only on the bytes
+just before it, so an insertion or deletion moves the boundaries near the
+edit and the chunks after it keep their digests.  Chunks are at least
+min_size and at most max_size bytes long.
+
+Incremental runs compare each file's (inode, size, mtime_ns) with the
+previous snapshot of the same source directory and reuse the recorded chunk
+list without reading the file; for the files that are read, only chunks not
+already in the store are compressed (zlib, which releases the GIL) and
+written on a thread pool.  Both the time and the disk space of a run
+therefore follow the amount of change.  Chunks and manifests are fsynced
+before they are renamed into place, and a chunk already in the store is
+verified against its digest before a new snapshot references it.
+
+prune() deletes old snapshots and then every chunk no snapshot references.
+It takes the store lock exclusively; backup() and restore() share it.
+"""
+import fcntl
+import gzip
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import stat as stat_module
+import threading
+import time
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from .checksum_manifest import walk_files
+
+DEFAULT_STORE_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.local', 'share', 'dev-utils', 'backup_store')
+
+DEFAULT_MIN_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_MAX_CHUNK_SIZE = 1024 * 1024
+
+# A boundary is expected every 2**BOUNDARY_BITS bytes after min_size, i.e. ~256 KiB.
+BOUNDARY_BITS = 18
+
+DEFAULT_READ_SIZE = 4 * 1024 * 1024
+
+DEFAULT_COMPRESSION_LEVEL = 6
+
+DEFAULT_MAX_WORKERS = os.cpu_count() or 1
+
+MANIFEST_VERSION = 1
+
+# Fixed forever: changing either re-chunks every file and defeats deduplication against older snapshots.
+GEAR_TABLE = bytes(hashlib.sha256(b'dev-utils-gear' + bytes([b])).digest()[0] & 1 for b in range(256))
+
+BOUNDARY_PATTERN = bytes((byte >> bit) & 1 for byte in hashlib.sha256(b'dev-utils-boundary').digest() for bit in range(8))[:BOUNDARY_BITS]
+
+# The first byte of a stored chunk says how the rest is encoded.
+ZLIB_CHUNK = b'Z'
+
+RAW_CHUNK = b'N'
+
+
+@dataclass
+class BackupStats:
+    """What one backup run read and stored."""
+    snapshot: str = ''
+    files: int = 0
+    reused_files: int = 0
+    read_files: int = 0
+    bytes_read: int = 0
+    chunks: int = 0
+    new_chunks: int = 0
+    bytes_stored: int = 0
+    directories: int = 0
+    symlinks: int = 0
+    skipped: int = 0
+    errors: int = 0
+    seconds: float = 0.0
+
+
+def iter_chunks(
+    f: BinaryIO,
+    min_size: int = DEFAULT_MIN_CHUNK_SIZE,
+    max_size: int = DEFAULT_MAX_CHUNK_SIZE,
+    read_size: int = DEFAULT_READ_SIZE,
+) -> Iterator[bytes]:
+    """Split a binary stream into content-defined chunks.
+    :param f: {file} - opened in binary mode
+    :param min_size: {int} - the smallest chunk, except for the last one
+    :param max_size: {int} - the largest chunk
+    :param read_size: {int} - bytes per read; at least max_size
+    """
+    read_size = max(read_size, max_size)
+    buf = b''
+    bits = b''
+    pos = 0
+    eof = False
+
+    while True:
+        if not eof and len(buf) - pos < max_size:
+            data = f.read(read_size)
+            if data:
+                buf = buf[pos:] + data
+                bits = bits[pos:] + data.translate(GEAR_TABLE)
+                pos = 0
+                continue
+            eof = True
+
+        remaining = len(buf) - pos
+        if remaining == 0:
+            return
+
+        limit = min(pos + max_size, len(buf))
+        if remaining <= min_size:
+            cut = len(buf)
+        else:
+            i = bits.find(BOUNDARY_PATTERN, pos + min_size - len(BOUNDARY_PATTERN), limit)
+            cut = limit if i == -1 else i + len(BOUNDARY_PATTERN)
+
+        yield buf[pos:cut]
+        pos = cut
+
+
+def _safe_relpath(relpath: str) -> str:
+    """Reject manifest paths that would escape the restore directory."""
+    normalized = os.path.normpath(relpath)
+    if os.path.isabs(normalized) or normalized == '..' or normalized.startswith('..' + os.sep):
+        raise Exception(f"refusing to restore unsafe path '{relpath}'")
+    return normalized
+
+
+def walk_tree(indir: str, exclude: Tuple[str, ...] = ()) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield (relative path, lstat) for every directory, file, symbolic link and special file under indir.
+
+    Symbolic links are yielded, not followed.
+    :param indir: {str} - the directory to be walked
+    :param exclude: {tuple} - absolute paths to be left out, with everything below them
+    """
+    stack = [indir]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError as e:
+            logging.warning(f"Could not read directory '{current}': {e}")
+            continue
+
+        for entry in entries:
+            if entry.path in exclude:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            yield os.path.relpath(entry.path, indir), entry.stat(follow_symlinks=False)
+
+
+class BackupStore:
+    """A local chunk store with its snapshot manifests."""
+
+    def __init__(self, store_dir: str = DEFAULT_STORE_DIR, compression_level: int = DEFAULT_COMPRESSION_LEVEL):
+        """Constructor
+        :param store_dir: {str} - the directory holding chunks/ and snapshots/
+        :param compression_level: {int} - zlib level for new chunks, 0 stores them uncompressed
+        """
+        self.store_dir = os.path.abspath(store_dir)
+        self.chunk_dir = os.path.join(self.store_dir, 'chunks')
+        self.snapshot_dir = os.path.join(self.store_dir, 'snapshots')
+        self.compression_level = compression_level
+        pathlib.Path(self.chunk_dir).mkdir(parents=True, exist_ok=True)
+        pathlib.Path(self.snapshot_dir).mkdir(parents=True, exist_ok=True)
+
+    @contextmanager
+    def _locked(self, operation: int):
+        with open(os.path.join(self.store_dir, 'lock'), 'w') as lock_fh:
+            fcntl.flock(lock_fh, operation)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_fh, fcntl.LOCK_UN)
+
+    def chunk_path(self, digest: str) -> str:
+        return os.path.join(self.chunk_dir, digest[:2], digest[2:])
+
+    def _write_chunk(self, digest: str, data: bytes) -> int:
+        """Compress and store one chunk; returns the bytes written."""
+        path = self.chunk_path(digest)
+        payload = RAW_CHUNK + data
+        if self.compression_level > 0:
+            compressed = zlib.compress(data, self.compression_level)
+            if len(compressed) < len(data):
+                payload = ZLIB_CHUNK + compressed
+
+        pathlib.Path(os.path.dirname(path)).mkdir(exist_ok=True)
+        tmp_file = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_file, 'wb') as of:
+            of.write(payload)
+            # A chunk that exists is never written again, so it must be complete on disk before it appears.
+            of.flush()
+            os.fsync(of.fileno())
+        os.replace(tmp_file, path)
+
+        return len(payload)
+
+    def has_chunk(self, digest: str) -> bool:
+        """Whether an intact copy of a chunk is stored.
+
+        The stored chunk is verified rather than trusted for existing: a chunk
+        left empty or truncated by a crash (before chunks were fsynced) would
+        otherwise be referenced by every later snapshot.
+        """
+        if not os.path.exists(self.chunk_path(digest)):
+            return False
+        try:
+            self.read_chunk(digest)
+        except Exception as e:
+            logging.warning(f"Chunk '{digest}' will be written again: {e}")
+            return False
+        return True
+
+    def read_chunk(self, digest: str) -> bytes:
+        """Read, decode and verify one chunk."""
+        with open(self.chunk_path(digest), 'rb') as f:
+            payload = f.read()
+
+        try:
+            data = zlib.decompress(payload[1:]) if payload[:1] == ZLIB_CHUNK else payload[1:]
+        except zlib.error as e:
+            raise Exception(f"chunk '{digest}' in store '{self.store_dir}' is corrupt: {e}")
+
+        if hashlib.sha256(data).hexdigest() != digest:
+            raise Exception(f"chunk '{digest}' in store '{self.store_dir}' is corrupt")
+
+        return data
+
+    def _snapshot_prefix(self, source: str) -> str:
+        key = hashlib.sha1(source.encode('utf-8')).hexdigest()[:8]
+        return f"{os.path.basename(source) or 'root'}-{key}-"
+
+    def list_snapshots(self, source: Optional[str] = None) -> List[str]:
+        """The snapshot names, oldest first, optionally only those of one source directory."""
+        prefix = self._snapshot_prefix(os.path.abspath(source)) if source is not None else ''
+        return sorted(
+            name[:-len('.json.gz')] for name in os.listdir(self.snapshot_dir)
+            if name.endswith('.json.gz') and name.startswith(prefix)
+        )
+
+    def load_snapshot(self, snapshot: str) -> Dict:
+        with gzip.open(os.path.join(self.snapshot_dir, snapshot + '.json.gz'), 'rt') as f:
+            manifest = json.load(f)
+        if manifest.get('version') != MANIFEST_VERSION:
+            raise Exception(f"snapshot '{snapshot}' has unsupported version '{manifest.get('version')}'")
+        return manifest
+
+    def _save_snapshot(self, snapshot: str, manifest: Dict) -> None:
+        path = os.path.join(self.snapshot_dir, snapshot + '.json.gz')
+        tmp_file = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_file, 'wb') as raw:
+            with gzip.open(raw, 'wt') as of:
+                json.dump(manifest, of, separators=(',', ':'))
+            raw.flush()
+            os.fsync(raw.fileno())
+        os.replace(tmp_file, path)
+
+    def backup(self, indir: str, max_workers: int = DEFAULT_MAX_WORKERS, exclude: Tuple[str, ...] = ()) -> BackupStats:
+        """Write a new snapshot of a directory.
+        :param indir: {str} - the directory to back up
+        :param max_workers: {int} - the number of compression threads
+        :param exclude: {tuple} - absolute paths to leave out
+        :return stats: {BackupStats}
+        """
+        start = time.monotonic()
+        source = os.path.abspath(indir)
+        stats = BackupStats(snapshot=self._snapshot_prefix(source) + datetime.now().strftime('%Y-%m-%d-%H%M%S-%f'))
+
+        with self._locked(fcntl.LOCK_SH):
+            previous_snapshots = self.list_snapshots(source)
+            previous = self.load_snapshot(previous_snapshots[-1])['files'] if previous_snapshots else {}
+
+            files = {}
+            directories = {}
+            symlinks = {}
+            submitted = set()
+            lock = threading.Lock()
+            # Bound the chunks held in memory while waiting for a compression thread.
+            in_flight = threading.BoundedSemaphore(max_workers * 2)
+
+            def store(digest: str, data: bytes) -> None:
+                try:
+                    written = self._write_chunk(digest, data)
+                    with lock:
+                        stats.bytes_stored += written
+                finally:
+                    in_flight.release()
+
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = []
+                for relpath, st in walk_tree(source, exclude=exclude):
+                    if stat_module.S_ISDIR(st.st_mode):
+                        directories[relpath] = {'mode': st.st_mode & 0o7777, 'mtime_ns': st.st_mtime_ns}
+                        stats.directories += 1
+                        continue
+
+                    if stat_module.S_ISLNK(st.st_mode):
+                        try:
+                            symlinks[relpath] = os.readlink(os.path.join(source, relpath))
+                        except OSError as e:
+                            logging.error(f"Could not back up symbolic link '{relpath}': {e}")
+                            stats.errors += 1
+                            continue
+                        stats.symlinks += 1
+                        continue
+
+                    if not stat_module.S_ISREG(st.st_mode):
+                        logging.warning(f"Skipping '{relpath}': not a regular file, directory or symbolic link")
+                        stats.skipped += 1
+                        continue
+
+                    stats.files += 1
+                    entry = previous.get(relpath)
+                    if entry is not None and (entry['ino'], entry['size'], entry['mtime_ns']) == (st.st_ino, st.st_size, st.st_mtime_ns):
+                        files[relpath] = entry
+                        stats.reused_files += 1
+                        continue
+
+                    chunks = []
+                    try:
+                        with open(os.path.join(source, relpath), 'rb') as f:
+                            for chunk in iter_chunks(f):
+                                digest = hashlib.sha256(chunk).hexdigest()
+                                chunks.append(digest)
+                                stats.bytes_read += len(chunk)
+                                if digest in submitted or self.has_chunk(digest):
+                                    continue
+                                submitted.add(digest)
+                                in_flight.acquire()
+                                futures.append(executor.submit(store, digest, chunk))
+                    except OSError as e:
+                        logging.error(f"Could not back up '{relpath}': {e}")
+                        stats.errors += 1
+                        continue
+
+                    stats.read_files += 1
+                    files[relpath] = {
+                        'ino': st.st_ino,
+                        'size': st.st_size,
+                        'mtime_ns': st.st_mtime_ns,
+                        'mode': st.st_mode & 0o7777,
+                        'chunks': chunks,
+                    }
+
+                for future in futures:
+                    future.result()
+
+            stats.chunks = sum(len(entry['chunks']) for entry in files.values())
+            stats.new_chunks = len(submitted)
+            stats.seconds = time.monotonic() - start
+
+            self._save_snapshot(stats.snapshot, {
+                'version': MANIFEST_VERSION,
+                'source': source,
+                'created': datetime.now().isoformat(timespec='seconds'),
+                'stats': asdict(stats),
+                'files': files,
+                'directories': directories,
+                'symlinks': symlinks,
+            })
+
+        if stats.skipped:
+            logging.warning(f"Skipped '{stats.skipped}' special files of '{source}'")
+
+        logging.info(f"Wrote snapshot '{stats.snapshot}' of '{source}': '{stats.files}' files, '{stats.directories}' directories, "
+                     f"'{stats.symlinks}' symbolic links, '{stats.reused_files}' unchanged files, "
+                     f"'{stats.bytes_read}' bytes read, '{stats.new_chunks}' new chunks, '{stats.bytes_stored}' bytes stored "
+                     f"in '{stats.seconds:.1f}' seconds")
+
+        return stats
+
+    def restore(self, snapshot: str, outdir: str, paths: Tuple[str, ...] = (), overwrite: bool = False) -> Dict[str, int]:
+        """Recreate the directories, files and symbolic links of a snapshot, streaming one chunk at a time.
+        :param snapshot: {str} - the snapshot name, see list_snapshots
+        :param outdir: {str} - the directory the files are restored into
+        :param paths: {tuple} - only restore these files or directories (relative to the source)
+        :param overwrite: {bool} - replace existing files instead of failing
+        :return stats: {dict} - files, directories, symlinks and bytes restored
+        """
+        stats = {'files': 0, 'directories': 0, 'symlinks': 0, 'bytes': 0}
+        prefixes = tuple(os.path.normpath(path) for path in paths)
+
+        def selected(items: Dict) -> List[Tuple[str, object]]:
+            entries = []
+            for relpath, entry in sorted(items.items()):
+                relpath = _safe_relpath(relpath)
+                if prefixes and not any(relpath == prefix or relpath.startswith(prefix + os.sep) for prefix in prefixes):
+                    continue
+                entries.append((relpath, entry))
+            return entries
+
+        with self._locked(fcntl.LOCK_SH):
+            manifest = self.load_snapshot(snapshot)
+            # Snapshots written before directories and links were recorded have neither.
+            directories = selected(manifest.get('directories', {}))
+
+            for relpath, entry in directories:
+                pathlib.Path(os.path.join(outdir, relpath)).mkdir(parents=True, exist_ok=True)
+
+            for relpath, entry in selected(manifest['files']):
+                dest = os.path.join(outdir, relpath)
+                if os.path.lexists(dest) and not overwrite:
+                    raise Exception(f"'{dest}' already exists")
+
+                pathlib.Path(os.path.dirname(dest)).mkdir(parents=True, exist_ok=True)
+                tmp_file = f"{dest}.{os.getpid()}.tmp"
+                try:
+                    with open(tmp_file, 'wb') as of:
+                        for digest in entry['chunks']:
+                            stats['bytes'] += of.write(self.read_chunk(digest))
+                    os.chmod(tmp_file, entry['mode'])
+                    os.utime(tmp_file, ns=(entry['mtime_ns'], entry['mtime_ns']))
+                    os.replace(tmp_file, dest)
+                except BaseException:
+                    if os.path.exists(tmp_file):
+                        os.unlink(tmp_file)
+                    raise
+
+                stats['files'] += 1
+
+            # Links last, so that no file is ever written through a restored link.
+            for relpath, target in selected(manifest.get('symlinks', {})):
+                dest = os.path.join(outdir, relpath)
+                if os.path.lexists(dest):
+                    if not overwrite:
+                        raise Exception(f"'{dest}' already exists")
+                    if os.path.isdir(dest) and not os.path.islink(dest):
+                        raise Exception(f"'{dest}' is a directory and cannot be replaced by a symbolic link")
+                    os.unlink(dest)
+                pathlib.Path(os.path.dirname(dest)).mkdir(parents=True, exist_ok=True)
+                os.symlink(target, dest)
+                stats['symlinks'] += 1
+
+            # Deepest first: restoring the contents changed the directory mtimes.
+            for relpath, entry in reversed(directories):
+                dest = os.path.join(outdir, relpath)
+                os.chmod(dest, entry['mode'])
+                os.utime(dest, ns=(entry['mtime_ns'], entry['mtime_ns']))
+                stats['directories'] += 1
+
+        logging.info(f"Restored '{stats['files']}' files ('{stats['bytes']}' bytes), '{stats['directories']}' directories and "
+                     f"'{stats['symlinks']}' symbolic links of snapshot '{snapshot}' into '{outdir}'")
+
+        return stats
+
+    def prune(self, keep: int) -> Dict[str, int]:
+        """Keep the newest snapshots of every source and delete the chunks nothing references any more.
+        :param keep: {int} - the number of snapshots kept per source directory
+        :return stats: {dict} - snapshots and chunks deleted, bytes freed
+        """
+        stats = {'snapshots': 0, 'chunks': 0, 'bytes': 0}
+
+        with self._locked(fcntl.LOCK_EX):
+            by_source = {}
+            for snapshot in self.list_snapshots():
+                by_source.setdefault(snapshot.rsplit('-', 5)[0], []).append(snapshot)
+
+            referenced = set()
+            for snapshots in by_source.values():
+                for snapshot in snapshots[:-keep] if keep > 0 else snapshots:
+                    os.unlink(os.path.join(self.snapshot_dir, snapshot + '.json.gz'))
+                    stats['snapshots'] += 1
+                for snapshot in snapshots[-keep:] if keep > 0 else []:
+                    for entry in self.load_snapshot(snapshot)['files'].values():
+                        referenced.update(entry['chunks'])
+
+            for relpath, st in walk_files(self.chunk_dir):
+                digest = relpath.replace(os.sep, '')
+                if digest not in referenced:
+                    os.unlink(os.path.join(self.chunk_dir, relpath))
+                    stats['chunks'] += 1
+                    stats['bytes'] += st.st_size
+
+        logging.info(f"Pruned '{stats['snapshots']}' snapshots and '{stats['chunks']}' chunks ('{stats['bytes']}' bytes) from '{self.store_dir}'")
+
+        return stats
@@ -0,0 +1,292 @@
+"""Benchmarks for the hot paths of the Python utilities.
+
+Each benchmark is a function registered in BENCHMARKS that receives a scratch
+directory and the repeat count and returns a dictionary of named
+measurements, each a list of samples in seconds.  run_benchmarks() reduces
+the samples to median/p95 and compare_results() flags every measurement
+whose median grew by more than the threshold relative to a saved baseline.
+
+The scripts under util/ and bin/ are not importable as packages, so they are
+loaded by path (see load_script) or executed in a child interpreter.
+"""
+import importlib.util
+import logging
+import os
+import platform
+import random
+import socket
+import string
+import subprocess
+import sys
+import time
+
+from datetime import datetime
+from typing import Callable, Dict, List
+
+from .run_history import percentile
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+DEFAULT_REPEAT = 20
+
+DEFAULT_THRESHOLD = 0.2
+
+# Changes smaller than this many seconds are timer noise, whatever the ratio.
+DEFAULT_MIN_DELTA = 0.0002
+
+# The click-based entry points whose start-up is benchmarked with --help.
+STARTUP_SCRIPTS = (
+    os.path.join('util', 'start_of_day.py'),
+    os.path.join('util', 'end_of_day.py'),
+    os.path.join('util', 'create_ssh_key.py'),
+    os.path.join('util', 'git_projects_inspector.py'),
+    os.path.join('util', 'checksum_assets.py'),
+    os.path.join('bin', 'prepare_release_steps.py'),
+)
+
+GIT_LOOKUP_SIZES = (10, 100, 1000, 10000, 100000)
+
+GIT_REFS_TAGS = 20000
+
+ZSHRC_LINES = 200000
+
+BENCHMARKS: Dict[str, Callable[[str, int], Dict[str, List[float]]]] = {}
+
+
+def benchmark(func):
+    """Register a benchmark function under its name."""
+    BENCHMARKS[func.__name__] = func
+    return func
+
+
+def load_script(relpath: str):
+    """Import a script from the repository by path without running its main().
+    :param relpath: {str} - the path relative to the repository, e.g. util/start_of_day.py
+    :return module
+    """
+    path = os.path.join(REPO_DIR, relpath)
+    name = '_bench_' + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _time(func, repeat: int) -> List[float]:
+    """Call func once to warm caches, then time repeat calls."""
+    func()
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def _write_git_lookup_file(path: str, count: int) -> None:
+    rng = random.Random(count)
+    with open(path, 'w') as of:
+        for i in range(count):
+            name = ''.join(rng.choices(string.ascii_lowercase, k=8)) + f"-{i}"
+            of.write(f"{name}\tssh://git@bitbucket.example.com:7999/proj/{name}.git\n")
+
+
+@benchmark
+def execute_cmd(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """Per-spawn overhead of start_of_day._execute_cmd running 'true'."""
+    module = load_script(os.path.join('util', 'start_of_day.py'))
+    outdir = os.path.join(scratch_dir, 'execute_cmd')
+    os.makedirs(outdir, exist_ok=True)
+
+    def spawn():
+        module._execute_cmd('true', outdir=outdir)
+
+    return {'execute_cmd.spawn': _time(spawn, repeat * 5)}
+
+
+@benchmark
+def executor(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """Per-command overhead of running 'true': shell=True, subprocess argv and posix_spawn, with and without cwd."""
+    from .command import run_captured
+    from .executor import run_argv
+
+    rounds = repeat * 5
+    return {
+        'executor.shell': _time(lambda: run_captured('true', shell=True), rounds),
+        'executor.subprocess_argv': _time(lambda: run_captured(['true']), rounds),
+        'executor.subprocess_argv_cwd': _time(lambda: run_captured(['true'], cwd=scratch_dir), rounds),
+        'executor.posix_spawn': _time(lambda: run_argv(['true']), rounds),
+        'executor.posix_spawn_cwd': _time(lambda: run_argv(['true'], cwd=scratch_dir), rounds),
+    }
+
+
+@benchmark
+def git_lookup(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """Parsing the lookup file into a dict (what prepare_release_steps.py did on every run) vs GitLookupIndex.load, 10 to 100k entries."""
+    from .git_lookup_index import GitLookupIndex, parse_lookup_file
+
+    results = {}
+
+    for count in GIT_LOOKUP_SIZES:
+        lookup_file = os.path.join(scratch_dir, f"git_lookup_{count}.txt")
+        index_file = lookup_file + '.idx'
+        _write_git_lookup_file(lookup_file, count)
+        GitLookupIndex.load(lookup_file, index_file=index_file)
+
+        rounds = max(3, repeat if count < 10000 else repeat // 4)
+        results[f"git_lookup.dict.{count}"] = _time(lambda: parse_lookup_file(lookup_file), rounds)
+        results[f"git_lookup.index.{count}"] = _time(lambda: GitLookupIndex.load(lookup_file, index_file=index_file).close(), rounds)
+
+    return results
+
+
+@benchmark
+def git_refs(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """Next build tag of a repository with 20k packed tags: 'git tag -l' parsed in Python vs RefIndex, cold and cached."""
+    from .git_refs import RefIndex, parse_tag
+
+    repo = os.path.join(scratch_dir, 'git_refs')
+    git = ['git', '-C', repo, '-c', 'user.name=bench', '-c', 'user.email=bench@example.com']
+    subprocess.run(['git', 'init', '--quiet', repo], check=True)
+    subprocess.run(git + ['commit', '--quiet', '--allow-empty', '-m', 'bench'], check=True)
+    head = subprocess.run(git + ['rev-parse', 'HEAD'], stdout=subprocess.PIPE, text=True, check=True).stdout.strip()
+
+    commands = ''.join(f"create refs/tags/v{i // 1000}.{i // 100 % 10}.{i % 100} {head}\n" for i in range(GIT_REFS_TAGS))
+    commands += f"create refs/heads/v{(GIT_REFS_TAGS - 1) // 1000}.{(GIT_REFS_TAGS - 1) // 100 % 10} {head}\n"
+    subprocess.run(git + ['update-ref', '--stdin'], input=commands, text=True, check=True)
+    subprocess.run(git + ['pack-refs', '--all'], check=True)
+
+    def with_git():
+        output = subprocess.run(['git', '-C', repo, 'tag', '-l'], stdout=subprocess.PIPE, text=True, check=True).stdout
+        return max(version for version in map(parse_tag, output.split()) if version is not None)
+
+    cache_dir = os.path.join(scratch_dir, 'git_refs_cache')
+    index = RefIndex.from_repo(repo, cache_dir=cache_dir)
+    rounds = max(3, repeat // 2)
+
+    return {
+        'git_refs.git_tag_list': _time(with_git, rounds),
+        'git_refs.index_uncached': _time(lambda: RefIndex.from_repo(repo, cache_dir=None), rounds),
+        'git_refs.index_cached': _time(lambda: RefIndex.from_repo(repo, cache_dir=cache_dir), rounds),
+        'git_refs.next_build': _time(index.next_build, repeat * 5),
+    }
+
+
+@benchmark
+def banner(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """pyfiglet.figlet_format in a fresh interpreter, in-process, and the cached render_banner."""
+    from .startup import render_banner
+
+    code = "import time; t = time.perf_counter(); import pyfiglet; pyfiglet.figlet_format('Start of Day'); print(time.perf_counter() - t)"
+    cold = []
+    for _ in range(max(3, repeat // 4)):
+        p = subprocess.run([sys.executable, '-c', code], stdout=subprocess.PIPE, text=True, check=True)
+        cold.append(float(p.stdout))
+
+    import pyfiglet
+    warm = _time(lambda: pyfiglet.figlet_format('Start of Day'), repeat)
+
+    cache_dir = os.path.join(scratch_dir, 'banners')
+    render_banner('Start of Day', cache_dir=cache_dir)
+    cached = _time(lambda: render_banner('Start of Day', cache_dir=cache_dir), repeat * 5)
+
+    return {'banner.figlet_cold': cold, 'banner.figlet_warm': warm, 'banner.render_cached': cached}
+
+
+@benchmark
+def zshrc_rewrite(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """update_oh_my_zsh_plugins.py rewriting a large ~/.zshrc, run with HOME pointing at the scratch directory."""
+    home = os.path.join(scratch_dir, 'home')
+    os.makedirs(home, exist_ok=True)
+    zshrc = os.path.join(home, '.zshrc')
+
+    lines = [f"export VAR_{i}=value_{i}  # padding to a realistic line length\n" for i in range(ZSHRC_LINES)]
+    lines[ZSHRC_LINES // 2] = 'plugins=(git)\n'
+    content = ''.join(lines)
+
+    env = dict(os.environ, HOME=home)
+    script = os.path.join(REPO_DIR, 'util', 'update_oh_my_zsh_plugins.py')
+
+    samples = []
+    for _ in range(max(3, repeat // 4)):
+        with open(zshrc, 'w') as of:
+            of.write(content)
+        start = time.perf_counter()
+        subprocess.run([sys.executable, script], env=env, stdout=subprocess.DEVNULL, check=True)
+        samples.append(time.perf_counter() - start)
+
+    with open(zshrc) as f:
+        if 'zsh-autosuggestions' not in f.read():
+            raise Exception(f"update_oh_my_zsh_plugins.py did not update '{zshrc}'")
+
+    return {'zshrc_rewrite.200k_lines': samples}
+
+
+@benchmark
+def startup(scratch_dir: str, repeat: int) -> Dict[str, List[float]]:
+    """Cold start of each click entry point: a fresh interpreter running '<script> --help'."""
+    env = dict(os.environ, HOME=os.path.join(scratch_dir, 'home'))
+    results = {}
+
+    for relpath in STARTUP_SCRIPTS:
+        argv = [sys.executable, os.path.join(REPO_DIR, relpath), '--help']
+        results[f"startup.{os.path.basename(relpath)}"] = _time(
+            lambda: subprocess.run(argv, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, check=True),
+            max(3, repeat // 2),
+        )
+
+    return results
+
+
+def run_benchmarks(scratch_dir: str, names: List[str] = None, repeat: int = DEFAULT_REPEAT) -> dict:
+    """Run the selected benchmarks and summarise their samples.
+    :param scratch_dir: {str} - an empty directory the benchmarks may write to
+    :param names: {list} - the BENCHMARKS to run; None runs all of them
+    :param repeat: {int} - the base number of samples per measurement
+    :return results: {dict} - 'meta' and 'results' ({measurement: {median, p95, min, samples}})
+    """
+    results = {}
+
+    for name in names or list(BENCHMARKS):
+        if name not in BENCHMARKS:
+            raise Exception(f"unknown benchmark '{name}' - choose from {', '.join(BENCHMARKS)}")
+
+        logging.info(f"Running benchmark '{name}'")
+        for measurement, samples in BENCHMARKS[name](scratch_dir, repeat).items():
+            results[measurement] = {
+                'median': percentile(samples, 50),
+                'p95': percentile(samples, 95),
+                'min': min(samples),
+                'samples': len(samples),
+            }
+
+    return {
+        'meta': {
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'host': socket.gethostname(),
+            'python': platform.python_version(),
+            'commit': _git_commit(),
+            'repeat': repeat,
+        },
+        'results': results,
+    }
+
+
+def _git_commit() -> str:
+    p = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    return p.stdout.strip() if p.returncode == 0 else None
+
+
+def compare_results(baseline: dict, current: dict, threshold: float = DEFAULT_THRESHOLD, min_delta: float = DEFAULT_MIN_DELTA) -> List[tuple]:
+    """Compare the medians of the measurements present in both result sets.
+    :param threshold: {float} - the relative slow-down treated as a regression, e.g. 0.2 for 20%
+    :param min_delta: {float} - the absolute slow-down in seconds below which nothing is a regression
+    :return rows: {list} - (measurement, baseline_median, current_median, change, regressed) sorted by measurement
+    """
+    rows = []
+    for measurement in sorted(set(baseline['results']) & set(current['results'])):
+        before = baseline['results'][measurement]['median']
+        after = current['results'][measurement]['median']
+        change = (after - before) / before if before > 0 else 0.0
+        rows.append((measurement, before, after, change, change > threshold and after - before > min_delta))
+    return rows
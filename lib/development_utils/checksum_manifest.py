@@ -0,0 +1,223 @@
+"""Incremental, parallel checksum manifests for asset trees.
+
+A manifest records, for every regular file under a directory, its
+(device, inode, size, mtime_ns) stat key and its content digest.  When a
+manifest is rebuilt, any file whose stat key is found in the previous
+manifest reuses the recorded digest without being read, so renamed or
+untouched files cost nothing.  Only new or modified files are hashed, on a
+process pool, reading through mmap for large files and fixed-size buffers
+otherwise.
+"""
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pathlib
+import time
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_ALGORITHM = 'md5'
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024
+
+DEFAULT_MMAP_THRESHOLD = 64 * 1024 * 1024
+
+DEFAULT_MAX_WORKERS = os.cpu_count() or 1
+
+MANIFEST_VERSION = 1
+
+
+@dataclass
+class ManifestDiff:
+    """Relative paths that differ between two manifests."""
+    added: List[str] = field(default_factory=list)
+    removed: List[str] = field(default_factory=list)
+    changed: List[str] = field(default_factory=list)
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.added or self.removed or self.changed)
+
+
+def walk_files(indir: str, exclude: Tuple[str, ...] = ()) -> Iterator[Tuple[str, os.stat_result]]:
+    """Yield (relative path, stat) for every regular file under indir.
+    :param indir: {str} - the directory to be walked
+    :param exclude: {tuple} - absolute paths to be left out, e.g. the manifest itself
+    """
+    stack = [indir]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = list(os.scandir(current))
+        except OSError as e:
+            logging.warning(f"Could not read directory '{current}': {e}")
+            continue
+
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                stack.append(entry.path)
+            elif entry.is_file(follow_symlinks=False) and entry.path not in exclude:
+                yield os.path.relpath(entry.path, indir), entry.stat(follow_symlinks=False)
+
+
+def hash_file(
+    path: str,
+    algorithm: str = DEFAULT_ALGORITHM,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    mmap_threshold: int = DEFAULT_MMAP_THRESHOLD,
+) -> Tuple[str, int]:
+    """Compute the digest of a file.
+    :param path: {str} - the file to be hashed
+    :param algorithm: {str} - any hashlib algorithm name
+    :param chunk_size: {int} - bytes per read or per mmap slice
+    :param mmap_threshold: {int} - files at least this large are memory-mapped
+    :return digest, size: {tuple} - the hex digest and the number of bytes read
+    """
+    h = hashlib.new(algorithm)
+    size = 0
+
+    with open(path, 'rb') as f:
+        file_size = os.fstat(f.fileno()).st_size
+
+        if file_size >= mmap_threshold:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                view = memoryview(mm)
+                try:
+                    for offset in range(0, file_size, chunk_size):
+                        h.update(view[offset:offset + chunk_size])
+                finally:
+                    view.release()
+            size = file_size
+        else:
+            buffer = bytearray(chunk_size)
+            view = memoryview(buffer)
+            while True:
+                n = f.readinto(buffer)
+                if not n:
+                    break
+                h.update(view[:n])
+                size += n
+
+    return h.hexdigest(), size
+
+
+def _hash_worker(args: Tuple[str, str]) -> Tuple[Optional[str], int, Optional[str]]:
+    path, algorithm = args
+    try:
+        digest, size = hash_file(path, algorithm)
+        return digest, size, None
+    except OSError as e:
+        return None, 0, str(e)
+
+
+def load_manifest(manifest_file: str) -> Dict:
+    """Load a manifest, returning an empty one when the file does not exist."""
+    if manifest_file is None or not os.path.exists(manifest_file):
+        return {'version': MANIFEST_VERSION, 'algorithm': None, 'files': {}}
+
+    with open(manifest_file) as f:
+        manifest = json.load(f)
+
+    if manifest.get('version') != MANIFEST_VERSION:
+        raise Exception(f"manifest '{manifest_file}' has unsupported version '{manifest.get('version')}'")
+
+    return manifest
+
+
+def save_manifest(manifest: Dict, manifest_file: str) -> None:
+    """Write the manifest atomically."""
+    pathlib.Path(os.path.dirname(os.path.abspath(manifest_file))).mkdir(parents=True, exist_ok=True)
+
+    tmp_file = f"{manifest_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as of:
+        json.dump(manifest, of)
+    os.replace(tmp_file, manifest_file)
+
+
+def build_manifest(
+    indir: str,
+    previous: Optional[Dict] = None,
+    algorithm: str = DEFAULT_ALGORITHM,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    exclude: Tuple[str, ...] = (),
+) -> Tuple[Dict, Dict]:
+    """Build the manifest for indir, re-hashing only files not in the previous manifest.
+    :param indir: {str} - the directory to be checksummed
+    :param previous: {dict} - the previous manifest; None hashes every file
+    :param algorithm: {str} - any hashlib algorithm name
+    :param max_workers: {int} - the number of hashing processes
+    :param exclude: {tuple} - absolute paths to be left out
+    :return manifest, stats: {tuple}
+    """
+    start = time.monotonic()
+
+    known = {}
+    if previous is not None and previous.get('algorithm') == algorithm:
+        for dev, ino, size, mtime_ns, digest in previous['files'].values():
+            known[(dev, ino, size, mtime_ns)] = digest
+
+    files = {}
+    pending = []
+
+    for relpath, st in walk_files(indir, exclude=exclude):
+        key = (st.st_dev, st.st_ino, st.st_size, st.st_mtime_ns)
+        digest = known.get(key)
+        files[relpath] = [*key, digest]
+        if digest is None:
+            pending.append(relpath)
+
+    bytes_hashed = 0
+    errors = []
+
+    if pending:
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            args = [(os.path.join(indir, relpath), algorithm) for relpath in pending]
+            for relpath, (digest, size, error) in zip(pending, executor.map(_hash_worker, args, chunksize=16)):
+                if error is not None:
+                    logging.warning(f"Could not checksum '{relpath}': {error}")
+                    errors.append(relpath)
+                    del files[relpath]
+                    continue
+                files[relpath][4] = digest
+                bytes_hashed += size
+
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'algorithm': algorithm,
+        'indir': os.path.abspath(indir),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'files': files,
+    }
+
+    stats = {
+        'files': len(files),
+        'hashed': len(pending) - len(errors),
+        'reused': len(files) - (len(pending) - len(errors)),
+        'bytes_hashed': bytes_hashed,
+        'errors': errors,
+        'seconds': time.monotonic() - start,
+    }
+
+    logging.info(f"Built manifest for '{indir}': {stats}")
+
+    return manifest, stats
+
+
+def diff_manifests(previous: Dict, current: Dict) -> ManifestDiff:
+    """Compare two manifests by relative path and digest."""
+    old_files = previous.get('files', {})
+    new_files = current.get('files', {})
+
+    diff = ManifestDiff()
+    diff.added = sorted(path for path in new_files if path not in old_files)
+    diff.removed = sorted(path for path in old_files if path not in new_files)
+    diff.changed = sorted(
+        path for path in new_files
+        if path in old_files and new_files[path][4] != old_files[path][4]
+    )
+
+    return diff
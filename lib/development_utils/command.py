@@ -0,0 +1,231 @@
+"""Execute shell commands while streaming their output.
+
+The child's STDOUT and STDERR are read through fixed-size buffers, written to
+the capture files and echoed to the terminal as the output arrives.  Only a
+bounded tail of each stream is retained in memory so that a failure can still
+be reported without the Python process growing with the child's output.
+
+The child is reaped with os.wait4() so that every CommandResult also carries
+the wall time, user/system CPU time and peak resident set size of the
+command (including the descendants it waited for, e.g. the programs run by
+the shell).  On Linux the peak RSS of a forked child starts from the
+footprint it inherited before exec, so small commands report roughly the
+size of the calling Python process.
+"""
+import logging
+import os
+import selectors
+import subprocess
+import sys
+import threading
+import time
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple, Union
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+DEFAULT_TAIL_SIZE = 16 * 1024
+
+# Serialises echoed chunks when several commands stream at the same time.
+_TERMINAL_LOCK = threading.Lock()
+
+
+class TailBuffer:
+    """Ring buffer that keeps only the last max_size bytes written to it."""
+
+    def __init__(self, max_size: int = DEFAULT_TAIL_SIZE):
+        self.max_size = max_size
+        self._buffer = bytearray()
+
+    def write(self, data: bytes) -> None:
+        self._buffer += data
+        excess = len(self._buffer) - self.max_size
+        if excess > 0:
+            del self._buffer[:excess]
+
+    def getvalue(self) -> str:
+        return self._buffer.decode('utf-8', errors='replace')
+
+
+@dataclass
+class CommandResult:
+    """Outcome of a streamed command."""
+    cmd: str
+    pid: int
+    returncode: int
+    stdout_bytes: int
+    stderr_bytes: int
+    stdout_tail: str
+    stderr_tail: str
+    wall_seconds: float = 0.0
+    user_seconds: float = 0.0
+    system_seconds: float = 0.0
+    max_rss_kb: int = 0
+
+
+def _echo(stream, data: bytes) -> None:
+    """Write raw bytes to a terminal stream, falling back to text streams."""
+    with _TERMINAL_LOCK:
+        if hasattr(stream, 'buffer'):
+            stream.buffer.write(data)
+        else:
+            stream.write(data.decode('utf-8', errors='replace'))
+        stream.flush()
+
+
+def _wait4(pid: int) -> Tuple[int, object]:
+    """Wait for a child and collect its resource usage.
+    :return: {tuple} - the return code and the struct_rusage
+    """
+    _, status, rusage = os.wait4(pid, 0)
+    return os.waitstatus_to_exitcode(status), rusage
+
+
+def _reap(p: subprocess.Popen) -> Tuple[int, Optional[object]]:
+    """Wait for a Popen child and collect its resource usage.
+    :return: {tuple} - the return code and the struct_rusage (None when unavailable)
+    """
+    try:
+        p.returncode, rusage = _wait4(p.pid)
+    except ChildProcessError:
+        return p.wait(), None
+
+    return p.returncode, rusage
+
+
+def _pump(sinks: dict, chunk_size: int) -> dict:
+    """Read pipes until EOF, passing each chunk to the pipe's sink; the pipes are left open.
+    :param sinks: {dict} - file descriptor to callable(bytes)
+    :return counts: {dict} - file descriptor to the number of bytes read
+    """
+    counts = {fd: 0 for fd in sinks}
+
+    with selectors.DefaultSelector() as selector:
+        for fd in sinks:
+            selector.register(fd, selectors.EVENT_READ)
+
+        while selector.get_map():
+            for key, _ in selector.select():
+                data = os.read(key.fd, chunk_size)
+                if not data:
+                    selector.unregister(key.fd)
+                    continue
+
+                counts[key.fd] += len(data)
+                sinks[key.fd](data)
+
+    return counts
+
+
+def _collect(stdout_fd: int, stderr_fd: int, chunk_size: int, tail_size: int) -> Tuple[bytes, bytes, Tuple[TailBuffer, TailBuffer]]:
+    """Read both pipes to EOF keeping all of the output.
+    :return: {tuple} - STDOUT, STDERR and the tail buffers
+    """
+    chunks = ([], [])
+    tails = (TailBuffer(tail_size), TailBuffer(tail_size))
+
+    def sink(chunk_list, tail):
+        def write(data: bytes) -> None:
+            chunk_list.append(data)
+            tail.write(data)
+        return write
+
+    _pump({stdout_fd: sink(chunks[0], tails[0]), stderr_fd: sink(chunks[1], tails[1])}, chunk_size)
+
+    return b''.join(chunks[0]), b''.join(chunks[1]), tails
+
+
+def _result(cmd, pid: int, returncode: int, rusage, started: float, stdout_bytes: int, stderr_bytes: int, tails: Tuple[TailBuffer, TailBuffer]) -> CommandResult:
+    return CommandResult(
+        cmd=cmd,
+        pid=pid,
+        returncode=returncode,
+        stdout_bytes=stdout_bytes,
+        stderr_bytes=stderr_bytes,
+        stdout_tail=tails[0].getvalue(),
+        stderr_tail=tails[1].getvalue(),
+        wall_seconds=time.monotonic() - started,
+        user_seconds=rusage.ru_utime if rusage is not None else 0.0,
+        system_seconds=rusage.ru_stime if rusage is not None else 0.0,
+        max_rss_kb=rusage.ru_maxrss if rusage is not None else 0,
+    )
+
+
+def run_streaming(
+    cmd: str,
+    stdout_file: str,
+    stderr_file: str,
+    echo: bool = True,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tail_size: int = DEFAULT_TAIL_SIZE,
+) -> CommandResult:
+    """Execute cmd via the shell, streaming STDOUT/STDERR to files and the terminal.
+    :param cmd: {str} - the command to be executed
+    :param stdout_file: {str} - the file STDOUT is written to
+    :param stderr_file: {str} - the file STDERR is written to
+    :param echo: {bool} - whether to also copy the output to this process's STDOUT/STDERR
+    :param chunk_size: {int} - the maximum number of bytes read per system call
+    :param tail_size: {int} - the number of trailing bytes of each stream kept in memory
+    :return result: {CommandResult}
+    """
+    if cmd is None:
+        raise Exception("cmd was not specified")
+
+    with open(stdout_file, 'wb') as out_fh, open(stderr_file, 'wb') as err_fh:
+        started = time.monotonic()
+        p = subprocess.Popen(cmd, shell=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        logging.info(f"The child process ID is '{p.pid}'")
+
+        tails = (TailBuffer(tail_size), TailBuffer(tail_size))
+
+        def sink(fh, terminal, tail):
+            def write(data: bytes) -> None:
+                fh.write(data)
+                tail.write(data)
+                if echo:
+                    _echo(terminal, data)
+            return write
+
+        counts = _pump({
+            p.stdout.fileno(): sink(out_fh, sys.stdout, tails[0]),
+            p.stderr.fileno(): sink(err_fh, sys.stderr, tails[1]),
+        }, chunk_size)
+        stdout_bytes, stderr_bytes = counts[p.stdout.fileno()], counts[p.stderr.fileno()]
+
+        p.stdout.close()
+        p.stderr.close()
+        returncode, rusage = _reap(p)
+
+        return _result(cmd, p.pid, returncode, rusage, started, stdout_bytes, stderr_bytes, tails)
+
+
+def run_captured(
+    args: Union[List[str], str],
+    cwd: Optional[str] = None,
+    shell: bool = False,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tail_size: int = DEFAULT_TAIL_SIZE,
+) -> Tuple[CommandResult, str, str]:
+    """Execute a command and return its complete STDOUT/STDERR along with the measurements.
+
+    Meant for commands with modest output (e.g. git plumbing) whose output is parsed.
+    :param args: {list|str} - the argument list, or a command string when shell is True
+    :param cwd: {str} - the working directory
+    :param shell: {bool} - whether args is executed by the shell
+    :return: {tuple} - the CommandResult, STDOUT and STDERR
+    """
+    started = time.monotonic()
+    p = subprocess.Popen(args, cwd=cwd, shell=shell, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+
+    stdout, stderr, tails = _collect(p.stdout.fileno(), p.stderr.fileno(), chunk_size, tail_size)
+
+    p.stdout.close()
+    p.stderr.close()
+    returncode, rusage = _reap(p)
+
+    cmd = args if isinstance(args, str) else ' '.join(args)
+    result = _result(cmd, p.pid, returncode, rusage, started, len(stdout), len(stderr), tails)
+
+    return result, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
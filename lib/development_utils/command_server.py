@@ -0,0 +1,453 @@
+"""Opt-in warm command server for the Python entry points.
+
+The server imports click, colorama, pyfiglet and the development_utils
+modules once, opens the git lookup index and renders the banners, then
+listens on a Unix domain socket.  For every invocation it forks: the child
+inherits the warm interpreter, adopts the client's working directory,
+environment and umask, and runs the script with runpy as __main__, so
+module-level defaults such as the timestamped DEFAULT_OUTDIR are evaluated
+per run exactly as with a fresh interpreter.
+
+The client passes its own STDIN/STDOUT/STDERR descriptors over the socket
+(SCM_RIGHTS), so output streams straight to the caller's terminal (colours
+and interactive prompts included) and the child reports only its PID and
+exit code back over the socket.  The child starts a new session, so the
+terminal is not its controlling terminal and prompts work even when the
+server runs as a background job; the client forwards Ctrl-C to the child's
+process group.  The socket lives in a user-private
+directory and connections from other users are refused.
+
+When a development_utils module changes on disk, the server re-executes
+itself before serving the next request; the client retries transparently.
+"""
+import json
+import logging
+import os
+import socket
+import struct
+import sys
+import time
+
+from typing import List, Optional, Sequence, Tuple
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..'))
+
+LIB_DIR = os.path.realpath(os.path.join(REPO_DIR, 'lib'))
+
+SCRIPT_DIRS = (os.path.join(REPO_DIR, 'util'), os.path.join(REPO_DIR, 'bin'))
+
+DEFAULT_SOCKET_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'command_server.sock')
+
+DEFAULT_PRELOAD = (
+    'click',
+    'colorama',
+    'pyfiglet',
+    'development_utils.checksum_manifest',
+    'development_utils.command',
+    'development_utils.git_lookup_index',
+    'development_utils.git_mirror_cache',
+    'development_utils.git_status_scanner',
+    'development_utils.logging_setup',
+    'development_utils.run_history',
+    'development_utils.startup',
+    'development_utils.step_scheduler',
+)
+
+DEFAULT_BANNERS = ('Start of Day', 'End of Day', 'SSH Keygen')
+
+DEFAULT_GIT_LOOKUP_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.config', 'my_bitbucket', 'git_clone_lookup.txt')
+
+RESTART_WAIT_SECONDS = 10.0
+
+MAX_MESSAGE_SIZE = 16 * 1024 * 1024
+
+LENGTH = struct.Struct('!I')
+
+PEER_CREDENTIALS = struct.Struct('3i')
+
+
+def send_message(sock: socket.socket, message: dict, fds: Sequence[int] = ()) -> None:
+    """Send a length-prefixed JSON message, optionally carrying file descriptors."""
+    payload = json.dumps(message).encode('utf-8')
+    data = LENGTH.pack(len(payload)) + payload
+
+    if fds:
+        sent = socket.send_fds(sock, [data], list(fds))
+        data = data[sent:]
+
+    sock.sendall(data)
+
+
+def recv_message(sock: socket.socket, max_fds: int = 0) -> Tuple[Optional[dict], List[int]]:
+    """Receive one message sent by send_message.
+    :return: {tuple} - the message (None when the peer closed the connection) and any file descriptors
+    """
+    fds = []
+    if max_fds:
+        data, fds, _, _ = socket.recv_fds(sock, 64 * 1024, max_fds)
+    else:
+        data = sock.recv(64 * 1024)
+
+    if not data:
+        return None, fds
+
+    while len(data) < LENGTH.size:
+        more = sock.recv(64 * 1024)
+        if not more:
+            return None, fds
+        data += more
+
+    (length,) = LENGTH.unpack_from(data)
+    if length > MAX_MESSAGE_SIZE:
+        raise Exception(f"message of '{length}' bytes exceeds the limit")
+
+    while len(data) < LENGTH.size + length:
+        more = sock.recv(64 * 1024)
+        if not more:
+            return None, fds
+        data += more
+
+    return json.loads(data[LENGTH.size:LENGTH.size + length]), fds
+
+
+def resolve_script(name: str) -> str:
+    """Resolve a script name or path to a Python script of this repository.
+    :param name: {str} - e.g. 'start_of_day.py' or a path to util/start_of_day.py
+    :return path: {str} - the absolute path
+    """
+    candidates = [os.path.abspath(name)] if os.sep in name else [os.path.join(d, name) for d in SCRIPT_DIRS]
+
+    for candidate in candidates:
+        path = os.path.realpath(candidate)
+        if path.endswith('.py') and os.path.dirname(path) in SCRIPT_DIRS and os.path.isfile(path):
+            return path
+
+    raise Exception(f"'{name}' is not a Python script in {' or '.join(SCRIPT_DIRS)}")
+
+
+class CommandServer:
+    """Serve script invocations from a warm, pre-imported interpreter."""
+
+    def __init__(self, socket_file: str = DEFAULT_SOCKET_FILE, preload: Sequence[str] = DEFAULT_PRELOAD, git_lookup_file: Optional[str] = DEFAULT_GIT_LOOKUP_FILE):
+        """Constructor
+        :param socket_file: {str} - the Unix domain socket to listen on
+        :param preload: {list} - the modules imported before serving
+        :param git_lookup_file: {str} - the lookup file whose index is opened before serving
+        """
+        self.socket_file = socket_file
+        self.preload = preload
+        self.git_lookup_file = git_lookup_file
+        self._mtimes = None
+        self._listener = None
+
+    def warm(self) -> None:
+        """Import the preload modules and warm the banner and lookup caches."""
+        import importlib
+
+        if LIB_DIR not in sys.path:
+            sys.path.insert(0, LIB_DIR)
+
+        start = time.monotonic()
+
+        for name in self.preload:
+            try:
+                importlib.import_module(name)
+            except ImportError as e:
+                logging.warning(f"Could not preload '{name}': {e}")
+
+        from .startup import render_banner
+        for text in DEFAULT_BANNERS:
+            render_banner(text)
+
+        if self.git_lookup_file is not None and os.path.exists(self.git_lookup_file):
+            from .git_lookup_index import GitLookupIndex
+            GitLookupIndex.load(self.git_lookup_file)
+
+        self._mtimes = self._module_mtimes()
+
+        logging.info(f"Preloaded '{len(sys.modules)}' modules in {time.monotonic() - start:.2f} seconds")
+
+    @staticmethod
+    def _module_mtimes() -> dict:
+        mtimes = {}
+        for module in list(sys.modules.values()):
+            path = getattr(module, '__file__', None)
+            if path and os.path.realpath(path).startswith(LIB_DIR + os.sep):
+                try:
+                    mtimes[path] = os.stat(path).st_mtime_ns
+                except OSError:
+                    mtimes[path] = None
+        return mtimes
+
+    def is_stale(self) -> bool:
+        """Whether a preloaded development_utils module changed since warm()."""
+        for path, mtime in self._mtimes.items():
+            try:
+                if os.stat(path).st_mtime_ns != mtime:
+                    return True
+            except OSError:
+                return True
+        return False
+
+    def _bind(self) -> socket.socket:
+        socket_dir = os.path.dirname(self.socket_file)
+        os.makedirs(socket_dir, mode=0o700, exist_ok=True)
+
+        if os.path.exists(self.socket_file):
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_file)
+                raise Exception(f"a command server is already listening on '{self.socket_file}'")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_file)
+            finally:
+                probe.close()
+
+        listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        old_umask = os.umask(0o077)
+        try:
+            listener.bind(self.socket_file)
+        finally:
+            os.umask(old_umask)
+        listener.listen(16)
+        listener.settimeout(1.0)
+        return listener
+
+    @staticmethod
+    def _reap() -> None:
+        """Reap finished children, including those forked before a re-exec."""
+        while True:
+            try:
+                pid, _ = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+
+    def serve_forever(self) -> None:
+        """Accept invocations until a 'stop' request (or SIGTERM/SIGINT) is received."""
+        if self._mtimes is None:
+            self.warm()
+
+        self._listener = self._bind()
+        logging.info(f"Listening on '{self.socket_file}' as PID '{os.getpid()}'")
+
+        restart = False
+        try:
+            while True:
+                self._reap()
+                try:
+                    conn, _ = self._listener.accept()
+                except socket.timeout:
+                    continue
+
+                with conn:
+                    conn.settimeout(None)
+                    action = self._handle(conn)
+
+                if action == 'stop':
+                    break
+                if action == 'restart':
+                    restart = True
+                    break
+        finally:
+            self._listener.close()
+            try:
+                os.unlink(self.socket_file)
+            except FileNotFoundError:
+                pass
+
+        if restart:
+            import atexit
+            logging.info("A preloaded module changed on disk - re-executing the server")
+            # Flush the background log writer, which execv would otherwise discard.
+            atexit._run_exitfuncs()
+            os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    def _handle(self, conn: socket.socket) -> Optional[str]:
+        _, uid, _ = PEER_CREDENTIALS.unpack(conn.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, PEER_CREDENTIALS.size))
+        if uid != os.getuid():
+            logging.warning(f"Refused a connection from UID '{uid}'")
+            return None
+
+        fds = []
+        try:
+            request, fds = recv_message(conn, max_fds=3)
+            if request is None:
+                return None
+
+            op = request.get('op')
+
+            if op == 'ping':
+                send_message(conn, {'status': 'ok', 'pid': os.getpid(), 'modules': len(sys.modules)})
+                return None
+
+            if op == 'stop':
+                send_message(conn, {'status': 'ok'})
+                return 'stop'
+
+            if op != 'run' or len(fds) != 3:
+                send_message(conn, {'status': 'error', 'message': f"invalid request '{op}'"})
+                return None
+
+            if self.is_stale():
+                send_message(conn, {'status': 'restart'})
+                return 'restart'
+
+            try:
+                script = resolve_script(request['script'])
+            except Exception as e:
+                send_message(conn, {'status': 'error', 'message': str(e)})
+                return None
+
+            pid = os.fork()
+            if pid == 0:
+                self._run_child(conn, script, request, fds)
+
+            logging.info(f"Started '{os.path.basename(script)}' as PID '{pid}'")
+            return None
+        finally:
+            for fd in fds:
+                os.close(fd)
+
+    def _run_child(self, conn: socket.socket, script: str, request: dict, fds: List[int]) -> None:
+        """Run script in the forked child; never returns."""
+        import atexit
+        import runpy
+        import signal
+        import traceback
+
+        code = 1
+        try:
+            self._listener.close()
+            # Leave the server's session.  A server started as a background job
+            # would otherwise hand the client's terminal to a background process
+            # group, and the first input() would stop the child with SIGTTIN; a
+            # session without a controlling terminal reads it like any file.
+            os.setsid()
+            signal.signal(signal.SIGINT, signal.default_int_handler)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            from .logging_setup import reset_after_fork
+            reset_after_fork()
+
+            for target, fd in enumerate(fds):
+                os.dup2(fd, target)
+            sys.stdin = open(0, 'r', closefd=False)
+            sys.stdout = open(1, 'w', buffering=1 if os.isatty(1) else -1, closefd=False)
+            sys.stderr = open(2, 'w', buffering=1, closefd=False)
+
+            os.environ.clear()
+            os.environ.update(request['env'])
+            os.chdir(request['cwd'])
+            os.umask(request['umask'])
+
+            send_message(conn, {'status': 'started', 'pid': os.getpid()})
+
+            sys.argv = [script] + list(request['args'])
+            try:
+                runpy.run_path(script, run_name='__main__')
+                code = 0
+            except SystemExit as e:
+                if e.code is None:
+                    code = 0
+                elif isinstance(e.code, int):
+                    code = e.code
+                else:
+                    print(e.code, file=sys.stderr)
+                    code = 1
+            except KeyboardInterrupt:
+                code = 130
+            except BaseException:
+                traceback.print_exc()
+                code = 1
+
+            atexit._run_exitfuncs()
+            sys.stdout.flush()
+            sys.stderr.flush()
+
+            send_message(conn, {'status': 'exited', 'code': code})
+        finally:
+            os._exit(code)
+
+
+def _connect(socket_file: str) -> socket.socket:
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(socket_file)
+    except OSError:
+        sock.close()
+        raise
+    return sock
+
+
+def request(op: str, socket_file: str = DEFAULT_SOCKET_FILE) -> dict:
+    """Send a 'ping' or 'stop' request.
+    :raise OSError: when no server is listening
+    """
+    with _connect(socket_file) as sock:
+        send_message(sock, {'op': op})
+        reply, _ = recv_message(sock)
+    return reply or {}
+
+
+def run_remote(script: str, args: Sequence[str], socket_file: str = DEFAULT_SOCKET_FILE) -> int:
+    """Run a script on the warm server with this process's STDIN/STDOUT/STDERR.
+    :param script: {str} - the script name or path (see resolve_script)
+    :param args: {list} - the script arguments
+    :return code: {int} - the script's exit code
+    :raise OSError: when no server is listening
+    """
+    import signal
+
+    umask = os.umask(0)
+    os.umask(umask)
+
+    message = {
+        'op': 'run',
+        'script': os.path.abspath(script) if os.sep in script else script,
+        'args': list(args),
+        'cwd': os.getcwd(),
+        'env': dict(os.environ),
+        'umask': umask,
+    }
+
+    deadline = time.monotonic() + RESTART_WAIT_SECONDS
+    while True:
+        try:
+            sock = _connect(socket_file)
+        except (ConnectionRefusedError, FileNotFoundError):
+            # The server may be re-executing itself after a module change.
+            if time.monotonic() >= deadline:
+                raise
+            time.sleep(0.05)
+            continue
+
+        with sock:
+            send_message(sock, message, fds=(0, 1, 2))
+            reply, _ = recv_message(sock)
+
+            if reply is None or reply['status'] == 'restart':
+                if time.monotonic() >= deadline:
+                    raise ConnectionRefusedError(f"the command server on '{socket_file}' did not restart")
+                time.sleep(0.05)
+                continue
+
+            if reply['status'] == 'error':
+                print(reply['message'], file=sys.stderr)
+                return 2
+
+            pid = reply['pid']
+            while True:
+                try:
+                    reply, _ = recv_message(sock)
+                except KeyboardInterrupt:
+                    # The child leads its own process group; interrupt the commands it started too.
+                    os.killpg(pid, signal.SIGINT)
+                    continue
+
+                if reply is None:
+                    print(f"The command server child '{pid}' exited without a status", file=sys.stderr)
+                    return 1
+
+                return reply['code']
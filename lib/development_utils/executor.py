@@ -0,0 +1,138 @@
+"""Low-overhead execution of many small commands, e.g. git plumbing.
+
+run_argv() executes an argument list without a shell.  Where the platform
+provides it the child is started with os.posix_spawnp (a vfork+exec in
+glibc), which avoids both the /bin/sh fork+exec of shell=True and
+subprocess's Python-level set-up.  os.posix_spawnp cannot change
+directory, so a call with cwd calls glibc's posix_spawnp through ctypes with
+a posix_spawn_file_actions_addchdir_np action (glibc 2.29 and later); the
+child changes directory between the vfork and the exec, with no extra
+process or exec.  Without that function a call with cwd falls back to
+subprocess.  STDIN is /dev/null and STDOUT/STDERR are captured; the child is
+reaped with os.wait4 so the result carries the same measurements as
+command.run_streaming.
+
+The per-command overhead of each path is reported by the 'executor'
+benchmark of util/benchmark.py.
+"""
+import ctypes
+import ctypes.util
+import os
+import time
+
+from typing import Optional, Sequence, Tuple
+
+from .command import DEFAULT_CHUNK_SIZE, DEFAULT_TAIL_SIZE, CommandResult, _collect, _result, _wait4, run_captured
+
+HAVE_POSIX_SPAWN = hasattr(os, 'posix_spawnp')
+
+# Larger than posix_spawn_file_actions_t on every glibc platform (80 bytes on x86_64).
+FILE_ACTIONS_SIZE = 256
+
+_libc = None
+
+
+def _spawn_libc():
+    """The C library when it provides posix_spawn_file_actions_addchdir_np, else False; looked up once."""
+    global _libc
+    if _libc is None:
+        _libc = False
+        libc_name = ctypes.util.find_library('c')
+        if HAVE_POSIX_SPAWN and libc_name is not None:
+            libc = ctypes.CDLL(libc_name, use_errno=True)
+            if hasattr(libc, 'posix_spawn_file_actions_addchdir_np'):
+                _libc = libc
+    return _libc
+
+
+def have_spawn_chdir() -> bool:
+    """Whether run_argv can start a command in another directory with posix_spawn."""
+    return bool(_spawn_libc())
+
+
+def _posix_spawnp_in(cwd: str, args: Sequence[str], env: dict, stdout_w: int, stderr_w: int) -> int:
+    """posix_spawnp with STDIN from /dev/null, the given STDOUT/STDERR and a chdir to cwd.
+    :return pid: {int}
+    :raise OSError: when the directory or the program does not exist
+    """
+    libc = _spawn_libc()
+
+    argv = (ctypes.c_char_p * (len(args) + 1))(*[os.fsencode(arg) for arg in args], None)
+    environ = [os.fsencode(key) + b'=' + os.fsencode(value) for key, value in env.items()]
+    envp = (ctypes.c_char_p * (len(environ) + 1))(*environ, None)
+
+    file_actions = ctypes.create_string_buffer(FILE_ACTIONS_SIZE)
+    pid = ctypes.c_int()
+
+    libc.posix_spawn_file_actions_init(file_actions)
+    try:
+        for rc in (
+            libc.posix_spawn_file_actions_addopen(file_actions, 0, os.fsencode(os.devnull), os.O_RDONLY, 0),
+            libc.posix_spawn_file_actions_adddup2(file_actions, stdout_w, 1),
+            libc.posix_spawn_file_actions_adddup2(file_actions, stderr_w, 2),
+            libc.posix_spawn_file_actions_addchdir_np(file_actions, os.fsencode(cwd)),
+        ):
+            if rc != 0:
+                raise OSError(rc, os.strerror(rc))
+
+        # Like posix_spawn itself, the return value is the error number.
+        rc = libc.posix_spawnp(ctypes.byref(pid), argv[0], file_actions, None, argv, envp)
+    finally:
+        libc.posix_spawn_file_actions_destroy(file_actions)
+
+    if rc != 0:
+        raise OSError(rc, os.strerror(rc), cwd if not os.path.isdir(cwd) else args[0])
+
+    return pid.value
+
+
+def run_argv(
+    args: Sequence[str],
+    cwd: Optional[str] = None,
+    env: Optional[dict] = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    tail_size: int = DEFAULT_TAIL_SIZE,
+) -> Tuple[CommandResult, str, str]:
+    """Execute an argument list without a shell and capture its output.
+    :param args: {list} - the program and its arguments; the program is looked up on PATH
+    :param cwd: {str} - the working directory
+    :param env: {dict} - the environment - default is os.environ
+    :return: {tuple} - the CommandResult, STDOUT and STDERR
+    :raise FileNotFoundError: when the program does not exist
+    """
+    args = list(args)
+
+    if not HAVE_POSIX_SPAWN or (cwd is not None and not have_spawn_chdir()):
+        return run_captured(args, cwd=cwd)
+
+    started = time.monotonic()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+
+    try:
+        if cwd is not None:
+            pid = _posix_spawnp_in(cwd, args, os.environ if env is None else env, stdout_w, stderr_w)
+        else:
+            pid = os.posix_spawnp(args[0], args, os.environ if env is None else env, file_actions=[
+                (os.POSIX_SPAWN_OPEN, 0, os.devnull, os.O_RDONLY, 0),
+                (os.POSIX_SPAWN_DUP2, stdout_w, 1),
+                (os.POSIX_SPAWN_DUP2, stderr_w, 2),
+            ])
+    except BaseException:
+        os.close(stdout_r)
+        os.close(stderr_r)
+        raise
+    finally:
+        os.close(stdout_w)
+        os.close(stderr_w)
+
+    try:
+        stdout, stderr, tails = _collect(stdout_r, stderr_r, chunk_size, tail_size)
+    finally:
+        os.close(stdout_r)
+        os.close(stderr_r)
+
+    returncode, rusage = _wait4(pid)
+    result = _result(' '.join(args), pid, returncode, rusage, started, len(stdout), len(stderr), tails)
+
+    return result, stdout.decode('utf-8', errors='replace'), stderr.decode('utf-8', errors='replace')
@@ -0,0 +1,248 @@
+"""Compiled, memory-mapped index of the git clone lookup file.
+
+The lookup file (by default ~/.config/my_bitbucket/git_clone_lookup.txt)
+contains one whitespace-separated 'code-base repository-url' pair per line.
+Parsing it on every run gets slow once it lists thousands of repositories,
+so it is compiled into a binary index that is only rebuilt when the source
+file's mtime or size changes.
+
+Index layout (all integers little-endian):
+
+    header   : magic (8s), source mtime_ns (q), source size (q), count (I)
+    entries  : count x (name offset, name length, url offset, url length) (4I)
+    strings  : UTF-8 names and urls referenced by the entries
+
+Entries are sorted by code-base name so that exact and prefix lookups are a
+binary search over the mapped file.
+"""
+import difflib
+import hashlib
+import logging
+import mmap
+import os
+import pathlib
+import struct
+
+from typing import Dict, Iterator, List, Optional
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'git_lookup_index')
+
+DEFAULT_FUZZY_LIMIT = 10
+
+DEFAULT_FUZZY_CUTOFF = 0.6
+
+MAGIC = b'GLIDX001'
+
+HEADER = struct.Struct('<8sqqI')
+
+ENTRY = struct.Struct('<4I')
+
+
+def parse_lookup_file(infile: str) -> Dict[str, str]:
+    """Parse the lookup file into a code-base to repository dictionary.
+    :param infile: {str} - file containing the listing of the repositories
+    :return lookup: {dict}
+    """
+    lookup = {}
+
+    with open(infile) as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) < 2:
+                continue
+            lookup[parts[0]] = parts[1]
+
+    return lookup
+
+
+def default_index_file(source_file: str) -> str:
+    """Derive the index file path for a lookup file.
+    :param source_file: {str} - the lookup file
+    :return index_file: {str}
+    """
+    key = hashlib.sha1(os.path.abspath(source_file).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DEFAULT_CACHE_DIR, key + '.idx')
+
+
+def build_index(source_file: str, index_file: str) -> None:
+    """Compile the lookup file into the binary index, replacing it atomically.
+    :param source_file: {str} - the lookup file
+    :param index_file: {str} - the index file to be written
+    """
+    stat = os.stat(source_file)
+    lookup = parse_lookup_file(source_file)
+
+    names = sorted(lookup)
+    entries = bytearray()
+    strings = bytearray()
+    strings_base = HEADER.size + ENTRY.size * len(names)
+
+    for name in names:
+        name_bytes = name.encode('utf-8')
+        url_bytes = lookup[name].encode('utf-8')
+        name_offset = strings_base + len(strings)
+        strings += name_bytes
+        url_offset = strings_base + len(strings)
+        strings += url_bytes
+        entries += ENTRY.pack(name_offset, len(name_bytes), url_offset, len(url_bytes))
+
+    pathlib.Path(os.path.dirname(index_file)).mkdir(parents=True, exist_ok=True)
+
+    tmp_file = f"{index_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'wb') as of:
+        of.write(HEADER.pack(MAGIC, stat.st_mtime_ns, stat.st_size, len(names)))
+        of.write(entries)
+        of.write(strings)
+    os.replace(tmp_file, index_file)
+
+    logging.info(f"Compiled '{len(names)}' records from '{source_file}' into index '{index_file}'")
+
+
+def _is_current(source_file: str, index_file: str) -> bool:
+    """Check whether the index was built from the current version of the lookup file."""
+    if not os.path.exists(index_file):
+        return False
+
+    stat = os.stat(source_file)
+
+    with open(index_file, 'rb') as f:
+        header = f.read(HEADER.size)
+
+    if len(header) != HEADER.size:
+        return False
+
+    magic, mtime_ns, size, _ = HEADER.unpack(header)
+
+    return magic == MAGIC and mtime_ns == stat.st_mtime_ns and size == stat.st_size
+
+
+_open_indexes = {}
+
+
+class GitLookupIndex:
+    """Read-only view over a memory-mapped lookup index."""
+
+    def __init__(self, index_file: str):
+        """Constructor
+        :param index_file: {str} - a compiled index file
+        """
+        self.index_file = index_file
+
+        with open(index_file, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.source_mtime_ns, self.source_size, self._count = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise Exception(f"'{index_file}' is not a git lookup index")
+
+    @classmethod
+    def load(cls, source_file: str, index_file: Optional[str] = None) -> 'GitLookupIndex':
+        """Open the index for a lookup file, rebuilding it first if it is stale.
+        :param source_file: {str} - the lookup file
+        :param index_file: {str} - the index file - default is derived from source_file
+        :return index: {GitLookupIndex}
+        """
+        if index_file is None:
+            index_file = default_index_file(source_file)
+
+        # Reuse the mapping opened earlier in this process (or inherited from
+        # the warm command server) only while it was built from the current
+        # lookup file; another process may have rebuilt the index file since.
+        stat = os.stat(source_file)
+        cached = _open_indexes.get(index_file)
+        if cached is not None and cached.source_mtime_ns == stat.st_mtime_ns and cached.source_size == stat.st_size:
+            return cached
+
+        if not _is_current(source_file, index_file):
+            logging.info(f"Index '{index_file}' is missing or stale and will be rebuilt")
+            build_index(source_file, index_file)
+
+        _open_indexes[index_file] = cls(index_file)
+
+        return _open_indexes[index_file]
+
+    def close(self) -> None:
+        if _open_indexes.get(self.index_file) is self:
+            del _open_indexes[self.index_file]
+        self._mm.close()
+
+    def __len__(self) -> int:
+        return self._count
+
+    def _entry(self, i: int):
+        return ENTRY.unpack_from(self._mm, HEADER.size + ENTRY.size * i)
+
+    def _name(self, i: int) -> str:
+        name_offset, name_length, _, _ = self._entry(i)
+        return self._mm[name_offset:name_offset + name_length].decode('utf-8')
+
+    def _url(self, i: int) -> str:
+        _, _, url_offset, url_length = self._entry(i)
+        return self._mm[url_offset:url_offset + url_length].decode('utf-8')
+
+    def _bisect_left(self, key: str) -> int:
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self._name(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def names(self) -> Iterator[str]:
+        """Iterate over all code-base names in sorted order."""
+        for i in range(self._count):
+            yield self._name(i)
+
+    def get(self, code_base: str) -> Optional[str]:
+        """Return the repository URL for an exact code-base name, or None."""
+        i = self._bisect_left(code_base)
+        if i < self._count and self._name(i) == code_base:
+            return self._url(i)
+        return None
+
+    def __contains__(self, code_base: str) -> bool:
+        return self.get(code_base) is not None
+
+    def __getitem__(self, code_base: str) -> str:
+        url = self.get(code_base)
+        if url is None:
+            raise KeyError(code_base)
+        return url
+
+    def prefix(self, prefix: str) -> List[str]:
+        """Return the code-base names starting with prefix."""
+        matches = []
+        i = self._bisect_left(prefix)
+        while i < self._count:
+            name = self._name(i)
+            if not name.startswith(prefix):
+                break
+            matches.append(name)
+            i += 1
+        return matches
+
+    def fuzzy(self, query: str, limit: int = DEFAULT_FUZZY_LIMIT, cutoff: float = DEFAULT_FUZZY_CUTOFF) -> List[str]:
+        """Return code-base names containing query, followed by close misspellings."""
+        query_lower = query.lower()
+        names = list(self.names())
+
+        matches = [name for name in names if query_lower in name.lower()]
+        if len(matches) < limit:
+            for name in difflib.get_close_matches(query, names, n=limit, cutoff=cutoff):
+                if name not in matches:
+                    matches.append(name)
+
+        return matches[:limit]
+
+    def resolve(self, query: str, limit: int = DEFAULT_FUZZY_LIMIT) -> List[str]:
+        """Resolve a --code_base value: exact match, else prefix matches, else fuzzy matches."""
+        if query in self:
+            return [query]
+
+        matches = self.prefix(query)
+        if matches:
+            return matches
+
+        return self.fuzzy(query, limit=limit)
@@ -0,0 +1,140 @@
+"""Persistent local bare-mirror cache for git repositories.
+
+Each repository gets one bare mirror under the cache directory.  Before a
+clone, the mirror is brought up to date by comparing 'git ls-remote' against
+the mirror's own refs and fetching only the refs that changed.  Working
+copies are then cloned with --reference/--dissociate so that objects are copied
+from the local mirror instead of being transferred over the network, while
+the clone's origin still points at the real repository.
+"""
+import fcntl
+import hashlib
+import logging
+import os
+import pathlib
+import re
+
+from contextlib import contextmanager
+from typing import Dict, List, Optional
+
+from .executor import run_argv
+from .run_history import RunHistory
+
+DEFAULT_MIRROR_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'git_mirrors')
+
+
+def git(args: List[str], cwd: str = None, history: Optional[RunHistory] = None) -> str:
+    """Run git with an argument list and return its STDOUT.
+    :param args: {list} - the git arguments, without the leading 'git'
+    :param cwd: {str} - the working directory
+    :param history: {RunHistory} - when specified, the resource usage is recorded as step 'git <sub-command>'
+    :return stdout: {str}
+    """
+    cmd = ['git'] + args
+    logging.info(f"Will attempt to execute '{' '.join(cmd)}' in '{cwd or os.getcwd()}'")
+
+    result, stdout, stderr = run_argv(cmd, cwd=cwd)
+
+    if history is not None:
+        history.record(f"git {args[0]}", result)
+
+    if result.returncode != 0:
+        raise Exception(f"'{' '.join(cmd)}' received status '{result.returncode}': {stderr.strip()}")
+
+    return stdout
+
+
+def _parse_refs(output: str) -> Dict[str, str]:
+    """Parse 'hash<whitespace>refname' lines into a refname to hash dictionary."""
+    refs = {}
+    for line in output.splitlines():
+        parts = line.split()
+        if len(parts) != 2 or parts[1].endswith('^{}') or parts[1] == 'HEAD':
+            continue
+        refs[parts[1]] = parts[0]
+    return refs
+
+
+class GitMirrorCache:
+    """Manage bare mirrors keyed by repository URL."""
+
+    def __init__(self, mirror_dir: str = DEFAULT_MIRROR_DIR, history: Optional[RunHistory] = None):
+        """Constructor
+        :param mirror_dir: {str} - the directory the bare mirrors are kept in
+        :param history: {RunHistory} - when specified, every git command is recorded
+        """
+        self.mirror_dir = mirror_dir
+        self.history = history
+        pathlib.Path(mirror_dir).mkdir(parents=True, exist_ok=True)
+
+    def mirror_path(self, repo: str) -> str:
+        """Derive the mirror directory for a repository URL.
+        :param repo: {str} - the repository URL
+        :return path: {str}
+        """
+        name = re.sub(r'(\.git)?/*$', '', repo).rstrip('/').split('/')[-1].split(':')[-1]
+        name = re.sub(r'[^A-Za-z0-9._-]', '_', name) or 'repo'
+        key = hashlib.sha1(repo.encode('utf-8')).hexdigest()[:12]
+        return os.path.join(self.mirror_dir, f"{name}-{key}.git")
+
+    @contextmanager
+    def _locked(self, mirror: str):
+        """Serialise updates of one mirror across threads and processes."""
+        with open(mirror + '.lock', 'w') as lock_fh:
+            fcntl.flock(lock_fh, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_fh, fcntl.LOCK_UN)
+
+    def update(self, repo: str) -> str:
+        """Create the mirror if needed, otherwise fetch only the refs that changed.
+        :param repo: {str} - the repository URL
+        :return mirror: {str} - the mirror directory
+        """
+        mirror = self.mirror_path(repo)
+
+        with self._locked(mirror):
+            if not os.path.exists(mirror):
+                logging.info(f"Creating mirror '{mirror}' of '{repo}'")
+                git(['clone', '--mirror', '--quiet', repo, mirror], history=self.history)
+                return mirror
+
+            remote_refs = _parse_refs(git(['ls-remote', '--heads', '--tags', repo], history=self.history))
+            local_refs = _parse_refs(git(['show-ref'], cwd=mirror, history=self.history) if self._has_refs(mirror) else '')
+
+            changed = sorted(ref for ref, sha in remote_refs.items() if local_refs.get(ref) != sha)
+            deleted = sorted(ref for ref in local_refs if ref not in remote_refs and ref.startswith(('refs/heads/', 'refs/tags/')))
+
+            for ref in deleted:
+                git(['update-ref', '-d', ref], cwd=mirror, history=self.history)
+
+            if changed:
+                refspecs = [f"+{ref}:{ref}" for ref in changed]
+                git(['fetch', '--quiet', repo] + refspecs, cwd=mirror, history=self.history)
+
+            logging.info(f"Mirror '{mirror}' updated: '{len(changed)}' changed and '{len(deleted)}' deleted refs")
+
+        return mirror
+
+    @staticmethod
+    def _has_refs(mirror: str) -> bool:
+        result, _, _ = run_argv(['git', 'show-ref', '--quiet'], cwd=mirror)
+        return result.returncode == 0
+
+    def clone(self, repo: str, dest: str) -> str:
+        """Clone repo into dest using its up-to-date mirror as the object reference.
+        :param repo: {str} - the repository URL
+        :param dest: {str} - the destination working copy directory
+        :return dest: {str}
+        """
+        if os.path.exists(dest):
+            raise Exception(f"clone destination '{dest}' already exists")
+
+        mirror = self.update(repo)
+
+        git(['clone', '--quiet', '--reference', mirror, '--dissociate', repo, dest], history=self.history)
+
+        logging.info(f"Cloned '{repo}' into '{dest}' using reference mirror '{mirror}'")
+
+        return dest
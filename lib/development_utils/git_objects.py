@@ -0,0 +1,96 @@
+"""Object presence checks read directly from a repository's object storage.
+
+ObjectSet collects the names of the loose objects (objects/xx/yyyy...) and
+of every pack (the sorted name table of each version 2 pack index) of one
+repository, so that another repository's objects can be tested against it
+without running git.  Only SHA-1 repositories are supported; an index that
+is not version 2 is skipped, which only makes a caller keep more objects.
+"""
+import logging
+import os
+import struct
+
+from typing import Iterator, Optional, Set
+
+from .git_refs import resolve_git_dir
+
+HASH_SIZE = 20
+
+IDX_MAGIC = b'\xfftOc'
+
+IDX_HEADER = struct.Struct('>4sI')
+
+FANOUT_SIZE = 256 * 4
+
+
+def read_pack_index(idx_file: str) -> Optional[bytes]:
+    """Read the sorted object-name table of a version 2 pack index.
+    :param idx_file: {str} - a pack-<hash>.idx file
+    :return names: {bytes} - count x 20-byte names, or None when the index is not version 2
+    """
+    with open(idx_file, 'rb') as f:
+        header = f.read(IDX_HEADER.size + FANOUT_SIZE)
+        if len(header) < IDX_HEADER.size + FANOUT_SIZE:
+            return None
+        magic, version = IDX_HEADER.unpack_from(header)
+        if magic != IDX_MAGIC or version != 2:
+            logging.warning(f"Skipping pack index '{idx_file}' with unsupported version")
+            return None
+        count = struct.unpack_from('>I', header, IDX_HEADER.size + FANOUT_SIZE - 4)[0]
+        return f.read(count * HASH_SIZE)
+
+
+def iter_names(names: bytes) -> Iterator[bytes]:
+    """Split a name table into 20-byte object names."""
+    return (names[i:i + HASH_SIZE] for i in range(0, len(names), HASH_SIZE))
+
+
+def loose_object_name(relpath: str) -> Optional[bytes]:
+    """The object name of a path like 'ab/cdef...' relative to objects/, or None."""
+    directory, _, name = relpath.partition(os.sep)
+    if len(directory) != 2 or len(name) != 2 * HASH_SIZE - 2:
+        return None
+    try:
+        return bytes.fromhex(directory + name)
+    except ValueError:
+        return None
+
+
+class ObjectSet:
+    """The names of every object stored in one repository."""
+
+    def __init__(self, repo_dir: str):
+        """Constructor
+        :param repo_dir: {str} - a working copy, bare repository or mirror
+        """
+        self.git_dir = resolve_git_dir(repo_dir)
+        self.objects_dir = os.path.join(self.git_dir, 'objects')
+        self.names: Set[bytes] = set()
+
+        pack_dir = os.path.join(self.objects_dir, 'pack')
+        if os.path.isdir(pack_dir):
+            for entry in os.scandir(pack_dir):
+                if entry.name.endswith('.idx'):
+                    table = read_pack_index(entry.path)
+                    if table is not None:
+                        self.names.update(iter_names(table))
+
+        for entry in os.scandir(self.objects_dir):
+            if len(entry.name) == 2 and entry.is_dir():
+                for obj in os.scandir(entry.path):
+                    name = loose_object_name(os.path.join(entry.name, obj.name))
+                    if name is not None:
+                        self.names.add(name)
+
+        logging.info(f"Read the names of '{len(self.names)}' objects in '{self.git_dir}'")
+
+    def __contains__(self, name: bytes) -> bool:
+        return name in self.names
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def covers_pack(self, idx_file: str) -> bool:
+        """Whether every object of a pack (given by its index) is present in this repository."""
+        table = read_pack_index(idx_file)
+        return table is not None and all(name in self.names for name in iter_names(table))
@@ -0,0 +1,294 @@
+"""Tag and branch discovery read directly from a repository's ref storage.
+
+'git tag -l' and 'git ls-remote -t' start a git process and print every tag
+as text, which becomes slow in repositories with tens of thousands of tags.
+read_refs() instead parses <git-dir>/packed-refs and walks the loose refs
+under <git-dir>/refs (a loose ref overrides its packed copy, as in git), and
+RefIndex keeps the version-like names as sorted tuples:
+
+    tags             : vX.Y.Z                     -> (X, Y, Z)
+    dev branches     : vX.Y                       -> (X, Y)
+    release branches : release/vX.Y.Z             -> (X, Y, Z)
+
+Branches are taken from refs/heads and from refs/remotes/<remote>, so a
+working copy, a bare repository and a mirror all give the same answer.
+'latest tag' and 'next build' are binary searches over the sorted lists.
+
+The versions parsed from packed-refs are cached with marshal under
+~/.cache/dev-utils/git_refs, keyed by the git directory and validated by
+the mtime and size of packed-refs, so only a 'git pack-refs' or a fetch that
+rewrites the file pays for parsing again.
+
+The next build follows DevelopmentUtils::Git::Tag::Manager: one more than
+the highest build tagged on the current (highest) development branch, or
+build 1 when that branch has not been tagged yet.
+"""
+import bisect
+import hashlib
+import logging
+import marshal
+import os
+import pathlib
+import re
+import sys
+
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'git_refs')
+
+NAMESPACES = ('refs/heads/', 'refs/remotes/', 'refs/tags/')
+
+TAG_PATTERN = re.compile(r'^v(\d+)\.(\d+)\.(\d+)$')
+
+# The patterns below are applied with findall to all ref names joined by
+# newlines, which keeps the per-ref work of large repositories inside re.
+PACKED_REF_PATTERN = re.compile(r'^([0-9a-f]+) (refs/\S+)$', re.M)
+
+TAG_REF_PATTERN = re.compile(r'^refs/tags/v(\d+)\.(\d+)\.(\d+)$', re.M)
+
+BRANCH_PREFIX = r'^refs/(?:heads|remotes/[^/\n]+)/'
+
+DEV_BRANCH_REF_PATTERN = re.compile(BRANCH_PREFIX + r'v(\d+)\.(\d+)$', re.M)
+
+RELEASE_BRANCH_REF_PATTERN = re.compile(BRANCH_PREFIX + r'release/v(\d+)\.(\d+)\.(\d+)$', re.M)
+
+
+def resolve_git_dir(repo_dir: str) -> str:
+    """Locate the directory holding the refs of a working copy or bare repository.
+    :param repo_dir: {str} - a working copy, a bare repository or a mirror
+    :return git_dir: {str}
+    """
+    dot_git = os.path.join(repo_dir, '.git')
+
+    if os.path.isdir(dot_git):
+        git_dir = dot_git
+    elif os.path.isfile(dot_git):
+        # Worktrees and submodules: '.git' is a file containing 'gitdir: <path>'.
+        with open(dot_git) as f:
+            content = f.read().strip()
+        if not content.startswith('gitdir:'):
+            raise Exception(f"'{dot_git}' is not a gitdir pointer")
+        git_dir = os.path.join(repo_dir, content[len('gitdir:'):].strip())
+    elif os.path.isfile(os.path.join(repo_dir, 'HEAD')) and os.path.isdir(os.path.join(repo_dir, 'refs')):
+        git_dir = repo_dir
+    else:
+        raise Exception(f"'{repo_dir}' is not a git repository")
+
+    # A linked worktree keeps its branches and tags in the common directory.
+    commondir_file = os.path.join(git_dir, 'commondir')
+    if os.path.isfile(commondir_file):
+        with open(commondir_file) as f:
+            git_dir = os.path.join(git_dir, f.read().strip())
+
+    return os.path.normpath(git_dir)
+
+
+def _read_packed_refs(git_dir: str) -> Dict[str, str]:
+    try:
+        with open(os.path.join(git_dir, 'packed-refs')) as f:
+            content = f.read()
+    except FileNotFoundError:
+        return {}
+    # The '#' header and the '^<object>' peeled lines of annotated tags do not match.
+    return {ref: sha for sha, ref in PACKED_REF_PATTERN.findall(content)}
+
+
+def _walk_loose_refs(directory: str, prefix: str, refs: Dict[str, str]) -> None:
+    try:
+        entries = list(os.scandir(directory))
+    except FileNotFoundError:
+        return
+
+    for entry in entries:
+        name = prefix + entry.name
+        if entry.is_dir(follow_symlinks=False):
+            _walk_loose_refs(entry.path, name + '/', refs)
+            continue
+        with open(entry.path) as f:
+            value = f.read().strip()
+        # Symbolic refs such as refs/remotes/origin/HEAD name no object of their own.
+        if value and not value.startswith('ref:'):
+            refs[name] = value
+
+
+def read_refs(git_dir: str, namespaces: Tuple[str, ...] = NAMESPACES) -> Dict[str, str]:
+    """Read the refs without executing git.
+    :param git_dir: {str} - the git directory, see resolve_git_dir
+    :param namespaces: {tuple} - the ref prefixes to read
+    :return refs: {dict} - full ref name to object name
+    """
+    refs = {ref: sha for ref, sha in _read_packed_refs(git_dir).items() if ref.startswith(namespaces)}
+
+    for namespace in namespaces:
+        _walk_loose_refs(os.path.join(git_dir, *namespace.strip('/').split('/')), namespace, refs)
+
+    return refs
+
+
+def format_version(version: tuple) -> str:
+    """Format a version tuple as a tag or branch name, e.g. (1, 2, 3) as v1.2.3."""
+    return 'v' + '.'.join(str(part) for part in version)
+
+
+def parse_tag(name: str) -> Optional[Tuple[int, int, int]]:
+    """Parse a vX.Y.Z tag name; None when the name is not a build tag."""
+    match = TAG_PATTERN.match(name)
+    return tuple(int(part) for part in match.groups()) if match else None
+
+
+def _versions(names: str) -> tuple:
+    """Extract the sorted (tags, dev branches, release branches) from newline-joined ref names."""
+    return (
+        sorted({(int(x), int(y), int(z)) for x, y, z in TAG_REF_PATTERN.findall(names)}),
+        sorted({(int(x), int(y)) for x, y in DEV_BRANCH_REF_PATTERN.findall(names)}),
+        sorted({(int(x), int(y), int(z)) for x, y, z in RELEASE_BRANCH_REF_PATTERN.findall(names)}),
+    )
+
+
+def _packed_versions(git_dir: str, cache_dir: Optional[str]) -> tuple:
+    """The versions named in packed-refs, cached until the file's mtime or size changes."""
+    packed_file = os.path.join(git_dir, 'packed-refs')
+    try:
+        st = os.stat(packed_file)
+    except FileNotFoundError:
+        return [], [], []
+
+    stamp = (st.st_mtime_ns, st.st_size)
+    cache_file = None
+    if cache_dir is not None:
+        key = hashlib.sha1(os.path.realpath(git_dir).encode('utf-8')).hexdigest()[:16]
+        cache_file = os.path.join(cache_dir, f"{key}.marshal")
+        try:
+            with open(cache_file, 'rb') as f:
+                cached_stamp, versions = marshal.loads(f.read())
+            if tuple(cached_stamp) == stamp:
+                return versions
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+    versions = _versions('\n'.join(_read_packed_refs(git_dir)))
+
+    if cache_file is not None:
+        try:
+            pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+            tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'wb') as of:
+                of.write(marshal.dumps((stamp, versions)))
+            os.replace(tmp_file, cache_file)
+        except OSError as e:
+            logging.warning(f"Could not write the ref cache '{cache_file}': {e}")
+
+    return versions
+
+
+class RefIndex:
+    """Sorted semantic-version index of the build tags, development and release branches of one repository."""
+
+    def __init__(self, tags: List[Tuple[int, int, int]], dev_branches: List[Tuple[int, int]], release_branches: List[Tuple[int, int, int]]):
+        """Constructor
+        :param tags: {list} - sorted (X, Y, Z) of the vX.Y.Z tags
+        :param dev_branches: {list} - sorted (X, Y) of the vX.Y branches
+        :param release_branches: {list} - sorted (X, Y, Z) of the release/vX.Y.Z branches
+        """
+        self.tags = tags
+        self.dev_branches = dev_branches
+        self.release_branches = release_branches
+
+    @classmethod
+    def from_refs(cls, refs: Dict[str, str]) -> 'RefIndex':
+        """Build the index from full ref names, e.g. as returned by read_refs."""
+        return cls(*_versions('\n'.join(refs)))
+
+    @classmethod
+    def from_repo(cls, repo_dir: str, cache_dir: Optional[str] = DEFAULT_CACHE_DIR) -> 'RefIndex':
+        """Build the index of a working copy, bare repository or mirror.
+        :param repo_dir: {str}
+        :param cache_dir: {str} - where the versions parsed from packed-refs are cached; None disables the cache
+        :return index: {RefIndex}
+        """
+        git_dir = resolve_git_dir(repo_dir)
+
+        # Loose refs are few and cheap to walk; the packed ones are what grows.
+        loose = {}
+        for namespace in NAMESPACES:
+            _walk_loose_refs(os.path.join(git_dir, *namespace.strip('/').split('/')), namespace, loose)
+
+        lists = []
+        for packed, extra in zip(_packed_versions(git_dir, cache_dir), _versions('\n'.join(loose))):
+            if extra:
+                packed = sorted(set(packed).union(extra))
+            lists.append(packed)
+
+        index = cls(*lists)
+        logging.info(f"Indexed '{len(index.tags)}' build tags, '{len(index.dev_branches)}' development and "
+                     f"'{len(index.release_branches)}' release branches of '{git_dir}'")
+        return index
+
+    def has_tag(self, version: Tuple[int, int, int]) -> bool:
+        i = bisect.bisect_left(self.tags, version)
+        return i < len(self.tags) and self.tags[i] == version
+
+    def has_release_branch(self, version: Tuple[int, int, int]) -> bool:
+        i = bisect.bisect_left(self.release_branches, version)
+        return i < len(self.release_branches) and self.release_branches[i] == version
+
+    def latest_tag(self, series: Optional[Tuple[int, int]] = None) -> Optional[Tuple[int, int, int]]:
+        """The highest build tag, optionally restricted to one vX.Y series.
+        :param series: {tuple} - (X, Y)
+        :return version: {tuple} - (X, Y, Z) or None
+        """
+        if series is None:
+            return self.tags[-1] if self.tags else None
+
+        i = bisect.bisect_right(self.tags, (series[0], series[1], sys.maxsize))
+        if i > 0 and self.tags[i - 1][:2] == tuple(series):
+            return self.tags[i - 1]
+        return None
+
+    def current_dev_branch(self) -> Optional[Tuple[int, int]]:
+        """The highest vX.Y development branch, or None when there is none."""
+        return self.dev_branches[-1] if self.dev_branches else None
+
+    def next_build(self, series: Optional[Tuple[int, int]] = None) -> Optional[Tuple[int, int, int]]:
+        """The next build tag of a series.
+        :param series: {tuple} - (X, Y); default is the current development branch, else the series of the latest tag
+        :return version: {tuple} - (X, Y, Z) or None when the repository has neither
+        """
+        if series is None:
+            series = self.current_dev_branch()
+            if series is None:
+                latest = self.latest_tag()
+                if latest is None:
+                    return None
+                series = latest[:2]
+
+        latest = self.latest_tag(series)
+        return (series[0], series[1], latest[2] + 1 if latest else 1)
+
+    def validate(self, version: str) -> Tuple[List[str], List[str]]:
+        """Check a proposed release version against the existing tags and branches.
+        :param version: {str} - e.g. v1.2.3
+        :return errors, warnings: {tuple} of lists of messages
+        """
+        errors, warnings = [], []
+
+        parsed = parse_tag(version)
+        if parsed is None:
+            warnings.append(f"version '{version}' does not have the form vX.Y.Z")
+            return errors, warnings
+
+        if self.has_tag(parsed):
+            errors.append(f"tag '{version}' already exists")
+
+        latest = self.latest_tag(parsed[:2])
+        if latest is not None and parsed < latest:
+            errors.append(f"version '{version}' is lower than the latest tag '{format_version(latest)}' of series '{format_version(parsed[:2])}'")
+
+        expected = self.next_build(parsed[:2])
+        if parsed != expected and not errors:
+            warnings.append(f"the next build of series '{format_version(parsed[:2])}' would be '{format_version(expected)}'")
+
+        if self.release_branches and not self.has_release_branch(parsed):
+            warnings.append(f"release branch 'release/{version}' does not exist")
+
+        return errors, warnings
@@ -0,0 +1,264 @@
+"""Parallel scanner for uncommitted assets in local git checkouts.
+
+Checkouts are discovered with os.scandir under a projects directory laid out
+as <projects_dir>/<project>/<version_dir>/.git.  Each checkout is queried with
+a single 'git status --porcelain=v2 --branch -z' call on a thread pool and
+the results are yielded as they complete.
+
+A JSON cache records, per checkout, the mtimes of the index, HEAD and the
+checked-out branch ref alongside the last status.  When none of those have
+changed the cached status is reused without running git.  Note that editing
+a tracked file or creating an untracked one does not touch any of those
+files, so callers should offer a way to bypass the cache.
+"""
+import json
+import logging
+import os
+import pathlib
+import re
+import subprocess
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_CACHE_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'git_status_scanner.json')
+
+DEFAULT_MAX_WORKERS = 16
+
+SKIP_DIRECTORIES = ('archive',)
+
+
+@dataclass
+class RepoStatus:
+    """Uncommitted assets and branch state of one checkout."""
+    path: str
+    branch: Optional[str] = None
+    upstream: Optional[str] = None
+    ahead: int = 0
+    behind: int = 0
+    staged: List[str] = field(default_factory=list)
+    unstaged: List[str] = field(default_factory=list)
+    untracked: List[str] = field(default_factory=list)
+    unmerged: List[str] = field(default_factory=list)
+    error: Optional[str] = None
+    cached: bool = False
+
+    @property
+    def has_uncommitted_assets(self) -> bool:
+        return bool(self.staged or self.unstaged or self.untracked or self.unmerged)
+
+    @property
+    def uncommitted_assets(self) -> List[str]:
+        return sorted(set(self.staged + self.unstaged + self.untracked + self.unmerged))
+
+
+def _is_directory_empty(path: str) -> bool:
+    with os.scandir(path) as it:
+        return next(it, None) is None
+
+
+def discover_repos(projects_dir: str, pattern: Optional[str] = None) -> Tuple[List[str], List[str]]:
+    """Find the git checkouts two levels below projects_dir.
+    :param projects_dir: {str} - the projects directory e.g. ~/projects
+    :param pattern: {str} - optional regular expression a checkout path must match
+    :return repos, empty_dirs: {tuple} - checkout paths and empty directories found along the way
+    """
+    regex = re.compile(pattern) if pattern is not None else None
+    repos = []
+    empty_dirs = []
+
+    with os.scandir(projects_dir) as projects:
+        for project in sorted(projects, key=lambda entry: entry.name):
+            if not project.is_dir(follow_symlinks=False) or project.name in SKIP_DIRECTORIES:
+                continue
+
+            if _is_directory_empty(project.path):
+                empty_dirs.append(project.path)
+                continue
+
+            with os.scandir(project.path) as versions:
+                for version in sorted(versions, key=lambda entry: entry.name):
+                    if not version.is_dir(follow_symlinks=False):
+                        continue
+
+                    if _is_directory_empty(version.path):
+                        empty_dirs.append(version.path)
+                        continue
+
+                    if not os.path.exists(os.path.join(version.path, '.git')):
+                        logging.info(f"'{version.path}' is not a git project.  Skipping")
+                        continue
+
+                    if regex is not None and not regex.search(version.path):
+                        logging.info(f"'{version.path}' does not match pattern '{pattern}' and will be skipped")
+                        continue
+
+                    repos.append(version.path)
+
+    logging.info(f"Discovered '{len(repos)}' git checkouts and '{len(empty_dirs)}' empty directories under '{projects_dir}'")
+
+    return repos, empty_dirs
+
+
+def parse_porcelain_v2(path: str, output: str) -> RepoStatus:
+    """Parse the NUL-delimited output of 'git status --porcelain=v2 --branch -z'.
+    :param path: {str} - the checkout path
+    :param output: {str} - the git output
+    :return status: {RepoStatus}
+    """
+    status = RepoStatus(path=path)
+    tokens = output.split('\0')
+    i = 0
+
+    while i < len(tokens):
+        token = tokens[i]
+        i += 1
+
+        if token == '':
+            continue
+
+        if token.startswith('# branch.head '):
+            status.branch = token[len('# branch.head '):]
+        elif token.startswith('# branch.upstream '):
+            status.upstream = token[len('# branch.upstream '):]
+        elif token.startswith('# branch.ab '):
+            ahead, behind = token[len('# branch.ab '):].split()
+            status.ahead = int(ahead)
+            status.behind = abs(int(behind))
+        elif token.startswith('1 ') or token.startswith('2 '):
+            fields = token.split(' ', 9 if token[0] == '2' else 8)
+            xy, file_path = fields[1], fields[-1]
+            if token[0] == '2':
+                # Renames and copies are followed by the original path.
+                i += 1
+            if xy[0] != '.':
+                status.staged.append(file_path)
+            if xy[1] != '.':
+                status.unstaged.append(file_path)
+        elif token.startswith('u '):
+            status.unmerged.append(token.split(' ', 10)[-1])
+        elif token.startswith('? '):
+            status.untracked.append(token[2:])
+
+    return status
+
+
+def _git_dir(repo: str) -> Optional[str]:
+    git_dir = os.path.join(repo, '.git')
+    return git_dir if os.path.isdir(git_dir) else None
+
+
+def _mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def fingerprint(repo: str) -> Optional[List[Optional[int]]]:
+    """Return the mtimes that invalidate a cached status, or None when the checkout cannot be cached."""
+    git_dir = _git_dir(repo)
+    if git_dir is None:
+        return None
+
+    head_file = os.path.join(git_dir, 'HEAD')
+    try:
+        with open(head_file) as f:
+            head = f.read().strip()
+    except OSError:
+        return None
+
+    ref_mtime = None
+    if head.startswith('ref: '):
+        ref_mtime = _mtime_ns(os.path.join(git_dir, head[len('ref: '):]))
+
+    return [
+        _mtime_ns(os.path.join(git_dir, 'index')),
+        _mtime_ns(head_file),
+        ref_mtime,
+        _mtime_ns(os.path.join(git_dir, 'packed-refs')),
+    ]
+
+
+def get_repo_status(repo: str) -> RepoStatus:
+    """Run git status once in the checkout and parse the result.
+    :param repo: {str} - the checkout path
+    :return status: {RepoStatus}
+    """
+    p = subprocess.run(
+        ['git', 'status', '--porcelain=v2', '--branch', '-z'],
+        cwd=repo,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    if p.returncode != 0:
+        return RepoStatus(path=repo, error=p.stderr.strip() or f"git status received status '{p.returncode}'")
+
+    return parse_porcelain_v2(repo, p.stdout)
+
+
+def load_cache(cache_file: str) -> Dict[str, dict]:
+    if not os.path.exists(cache_file):
+        return {}
+
+    try:
+        with open(cache_file) as f:
+            return json.load(f)
+    except (OSError, ValueError) as e:
+        logging.warning(f"Could not read cache file '{cache_file}' and will ignore it: {e}")
+        return {}
+
+
+def save_cache(cache_file: str, cache: Dict[str, dict]) -> None:
+    pathlib.Path(os.path.dirname(cache_file)).mkdir(parents=True, exist_ok=True)
+
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as of:
+        json.dump(cache, of)
+    os.replace(tmp_file, cache_file)
+
+
+def scan(
+    repos: List[str],
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    cache_file: Optional[str] = DEFAULT_CACHE_FILE,
+) -> Iterator[RepoStatus]:
+    """Yield the status of each checkout as soon as it is known.
+    :param repos: {list} - the checkout paths
+    :param max_workers: {int} - the number of concurrent git processes
+    :param cache_file: {str} - the cache file; None disables the cache
+    """
+    cache = load_cache(cache_file) if cache_file is not None else {}
+    fingerprints = {}
+    pending = []
+
+    for repo in repos:
+        fingerprints[repo] = fingerprint(repo)
+        entry = cache.get(repo)
+        if fingerprints[repo] is not None and entry is not None and entry.get('fingerprint') == fingerprints[repo]:
+            status = RepoStatus(**entry['status'])
+            status.cached = True
+            yield status
+        else:
+            pending.append(repo)
+
+    logging.info(f"'{len(repos) - len(pending)}' checkouts unchanged since the last scan; will query '{len(pending)}'")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(get_repo_status, repo): repo for repo in pending}
+            for future in as_completed(futures):
+                status = future.result()
+                repo = futures[future]
+                if status.error is None and fingerprints[repo] is not None:
+                    # Fingerprint again: git status may have refreshed the index.
+                    record = asdict(status)
+                    del record['cached']
+                    cache[repo] = {'fingerprint': fingerprint(repo), 'status': record}
+                yield status
+    finally:
+        if cache_file is not None:
+            save_cache(cache_file, cache)
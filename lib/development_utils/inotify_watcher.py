@@ -0,0 +1,303 @@
+"""Event-driven directory watcher built on Linux inotify.
+
+The watched tree is walked once with os.scandir to seed the set of
+directories (to max_depth, like 'find <indir> -maxdepth N -type d').  After
+that, inotify events are read, coalesced and debounced: the on_change
+callback fires once per burst of activity with the directories added and
+removed.  When inotify is unavailable or the per-user watch limit is
+exhausted (ENOSPC/EMFILE), the watcher falls back to re-walking the tree on
+a fixed polling interval.
+"""
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import select
+import struct
+import time
+
+from typing import Callable, Dict, Optional, Set
+
+DEFAULT_MAX_DEPTH = 2
+
+DEFAULT_DEBOUNCE_SECONDS = 0.25
+
+DEFAULT_POLL_INTERVAL = 60.0
+
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = IN_CREATE | IN_DELETE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR
+
+EVENT_HEADER = struct.Struct('iIII')
+
+READ_SIZE = 64 * 1024
+
+
+class WatchLimitExhausted(Exception):
+    """Raised when inotify cannot be initialised or a watch cannot be added."""
+
+
+def scan_directories(indir: str, max_depth: int = DEFAULT_MAX_DEPTH) -> Set[str]:
+    """Return indir and every directory below it down to max_depth.
+    :param indir: {str} - the root directory
+    :param max_depth: {int} - the maximum depth, as for find -maxdepth
+    :return directories: {set}
+    """
+    directories = {indir}
+    stack = [(indir, 0)]
+
+    while stack:
+        current, depth = stack.pop()
+        if depth >= max_depth:
+            continue
+        try:
+            with os.scandir(current) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        directories.add(entry.path)
+                        stack.append((entry.path, depth + 1))
+        except OSError as e:
+            logging.warning(f"Could not read directory '{current}': {e}")
+
+    return directories
+
+
+class _Inotify:
+    """Minimal ctypes binding for inotify_init1/inotify_add_watch/inotify_rm_watch."""
+
+    def __init__(self):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            raise WatchLimitExhausted("could not locate the C library")
+
+        self._libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(self._libc, 'inotify_init1'):
+            raise WatchLimitExhausted("inotify is not supported on this platform")
+
+        self.fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            e = ctypes.get_errno()
+            raise WatchLimitExhausted(f"inotify_init1 failed: {os.strerror(e)}")
+
+    def add_watch(self, path: str, mask: int) -> int:
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(path), ctypes.c_uint32(mask))
+        if wd < 0:
+            e = ctypes.get_errno()
+            if e in (errno.ENOSPC, errno.EMFILE):
+                raise WatchLimitExhausted(f"inotify watch limit exhausted while adding '{path}': {os.strerror(e)}")
+            raise OSError(e, os.strerror(e), path)
+        return wd
+
+    def rm_watch(self, wd: int) -> None:
+        # EINVAL means the kernel already dropped the watch, e.g. after IN_DELETE.
+        self._libc.inotify_rm_watch(self.fd, ctypes.c_int(wd))
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """Watch a tree of directories and report additions and removals in batches."""
+
+    def __init__(
+        self,
+        indir: str,
+        on_change: Callable[[Set[str], Set[str]], None],
+        max_depth: int = DEFAULT_MAX_DEPTH,
+        debounce: float = DEFAULT_DEBOUNCE_SECONDS,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ):
+        """Constructor
+        :param indir: {str} - the root directory to be watched
+        :param on_change: {callable} - invoked with (added, removed) sets of directories
+        :param max_depth: {int} - the maximum depth, as for find -maxdepth
+        :param debounce: {float} - seconds of quiet before a batch of events is reported
+        :param poll_interval: {float} - seconds between walks when falling back to polling
+        """
+        self.indir = os.path.abspath(indir)
+        self.on_change = on_change
+        self.max_depth = max_depth
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.directories = set()
+        self.mode = None
+        self._inotify = None
+        self._wd_to_path: Dict[int, str] = {}
+
+    def _depth(self, path: str) -> int:
+        relpath = os.path.relpath(path, self.indir)
+        return 0 if relpath == '.' else relpath.count(os.sep) + 1
+
+    def _add_watch(self, path: str) -> None:
+        if self._depth(path) >= self.max_depth:
+            return
+        try:
+            wd = self._inotify.add_watch(path, WATCH_MASK)
+        except FileNotFoundError:
+            return
+        self._wd_to_path[wd] = path
+
+    def _remove_watches(self, path: str) -> None:
+        """Drop the watches of a directory that left the tree and of everything below it.
+
+        Watches follow inodes, so a subtree moved elsewhere would otherwise keep
+        reporting events under its old path.
+        """
+        for wd, watched in list(self._wd_to_path.items()):
+            if watched == path or watched.startswith(path + os.sep):
+                del self._wd_to_path[wd]
+                self._inotify.rm_watch(wd)
+
+    def _fall_back_to_polling(self, e: WatchLimitExhausted) -> None:
+        logging.warning(f"{e} - falling back to polling every '{self.poll_interval}' seconds")
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+        self._wd_to_path = {}
+        self.mode = 'poll'
+
+    def seed(self) -> Set[str]:
+        """Walk the tree once and, when possible, register the inotify watches.
+        :return directories: {set} - the directories currently present
+        """
+        self.directories = scan_directories(self.indir, self.max_depth)
+
+        try:
+            self._inotify = _Inotify()
+            for path in sorted(self.directories):
+                self._add_watch(path)
+            self.mode = 'inotify'
+            logging.info(f"Watching '{len(self._wd_to_path)}' directories under '{self.indir}' with inotify")
+        except WatchLimitExhausted as e:
+            self._fall_back_to_polling(e)
+
+        return set(self.directories)
+
+    def _apply(self, added: Set[str], removed: Set[str]) -> None:
+        added = added - self.directories
+        removed = removed & self.directories
+        if not added and not removed:
+            return
+        self.directories |= added
+        self.directories -= removed
+        self.on_change(added, removed)
+
+    def _rescan(self) -> None:
+        current = scan_directories(self.indir, self.max_depth)
+        if self._inotify is not None:
+            for path in sorted(self.directories - current):
+                self._remove_watches(path)
+            for path in sorted(current - self.directories):
+                self._add_watch(path)
+        self._apply(current - self.directories, self.directories - current)
+
+    def _read_events(self, added: Set[str], removed: Set[str]) -> bool:
+        """Drain pending events into the added/removed sets.
+        :return overflow: {bool} - True when the kernel queue overflowed
+        """
+        overflow = False
+
+        while True:
+            try:
+                data = os.read(self._inotify.fd, READ_SIZE)
+            except BlockingIOError:
+                return overflow
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = EVENT_HEADER.unpack_from(data, offset)
+                offset += EVENT_HEADER.size
+                name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    overflow = True
+                    continue
+
+                parent = self._wd_to_path.get(wd)
+                if parent is None:
+                    continue
+
+                if mask & IN_IGNORED:
+                    del self._wd_to_path[wd]
+                    continue
+
+                if not mask & IN_ISDIR or name == '':
+                    continue
+
+                path = os.path.join(parent, name)
+
+                if mask & (IN_CREATE | IN_MOVED_TO):
+                    removed.discard(path)
+                    added.add(path)
+                    # Pick up directories created inside the new one before its watch existed.
+                    for child in scan_directories(path, self.max_depth - self._depth(path)):
+                        added.add(child)
+                        self._add_watch(child)
+                elif mask & (IN_DELETE | IN_MOVED_FROM):
+                    self._remove_watches(path)
+                    added.discard(path)
+                    removed.add(path)
+                    removed.update(d for d in self.directories if d.startswith(path + os.sep))
+
+    def run(self, duration: Optional[float] = None) -> None:
+        """Process events until duration seconds have elapsed, or forever.
+        :param duration: {float} - how long to run; None runs until interrupted
+        """
+        if self.mode is None:
+            self.seed()
+
+        deadline = None if duration is None else time.monotonic() + duration
+
+        try:
+            while deadline is None or time.monotonic() < deadline:
+                remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+
+                if self.mode == 'poll':
+                    time.sleep(self.poll_interval if remaining is None else min(self.poll_interval, remaining))
+                    self._rescan()
+                    continue
+
+                readable, _, _ = select.select([self._inotify.fd], [], [], remaining)
+                if not readable:
+                    continue
+
+                added = set()
+                removed = set()
+                overflow = False
+
+                try:
+                    # Keep draining until the tree has been quiet for the debounce period.
+                    while True:
+                        overflow |= self._read_events(added, removed)
+                        readable, _, _ = select.select([self._inotify.fd], [], [], self.debounce)
+                        if not readable:
+                            break
+
+                    if overflow:
+                        logging.warning("inotify queue overflowed - rescanning")
+                        self._rescan()
+                    else:
+                        self._apply(added, removed)
+                except WatchLimitExhausted as e:
+                    # The rescan below reports whatever the events collected so far would have.
+                    self._fall_back_to_polling(e)
+                    self._rescan()
+        finally:
+            if self._inotify is not None:
+                self._inotify.close()
+                self._inotify = None
+                self._wd_to_path = {}
+                self.mode = None
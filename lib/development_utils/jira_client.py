@@ -0,0 +1,558 @@
+"""Jira REST client with pooled keep-alive connections and a durable update queue.
+
+JiraClient keeps up to max_connections persistent HTTP(S) connections to
+the Jira server and hands them out to threads, so bulk() can add comments
+and perform transitions on many issues concurrently without a TCP/TLS
+handshake (and a curl process) per call.  A pooled connection the server
+has closed while idle is replaced and the request retried once.
+
+UpdateQueue is a small SQLite database of pending comments and transitions.
+Callers such as commits and release runs only enqueue, which takes
+milliseconds whatever the state of Jira, and start a background flush
+(spawn_flush) that sends everything due in one bulk() call.  Updates that
+fail with a transient error (connection problems, 429, 5xx) stay queued and
+are retried with exponential backoff; rejected updates (other 4xx) are kept
+as failed for inspection instead of being retried forever.  The background
+flush drains the queue: it stays alive, sleeping until the next retry is
+due, until no pending update is left.  Only one flush runs at a time; the
+flush lock is a file lock next to the database.
+
+The connection settings are read from the [jira] section of
+conf/jira_util.ini, or the [Jira] section of conf/commit_code.ini: url (or
+issue_rest_url, the issue endpoint the Perl scripts use), and
+username/password, with JIRA_URL, JIRA_USERNAME and JIRA_PASSWORD (or
+JIRA_API_TOKEN) in the environment taking precedence.
+"""
+import base64
+import configparser
+import fcntl
+import http.client
+import json
+import logging
+import os
+import pathlib
+import queue
+import sqlite3
+import ssl
+import subprocess
+import sys
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import quote, urlsplit
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'conf', 'jira_util.ini')
+
+DEFAULT_QUEUE_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.local', 'share', 'dev-utils', 'jira_queue.sqlite')
+
+DEFAULT_MAX_CONNECTIONS = 8
+
+DEFAULT_TIMEOUT = 30.0
+
+DEFAULT_MAX_ATTEMPTS = 10
+
+BACKOFF_BASE = 30.0
+
+BACKOFF_MAX = 3600.0
+
+DRAIN_POLL_INTERVAL = 5.0
+
+ISSUE_REST_PATH = '/rest/api/2/issue'
+
+ACTIONS = ('comment', 'transition')
+
+STATUS_PENDING = 'PENDING'
+STATUS_FAILED = 'FAILED'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS updates (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    issue TEXT NOT NULL,
+    action TEXT NOT NULL,
+    value TEXT NOT NULL,
+    status TEXT NOT NULL,
+    created REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS updates_due ON updates (status, next_attempt);
+'''
+
+TRANSIENT_ERRORS = (http.client.HTTPException, OSError)
+
+
+class JiraError(Exception):
+    """A request Jira answered with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"Jira returned status '{status}': {message}")
+        self.status = status
+
+    @property
+    def transient(self) -> bool:
+        return self.status == 429 or self.status >= 500
+
+
+@dataclass
+class Update:
+    """One queued comment or transition."""
+    issue: str
+    action: str
+    value: str
+    id: Optional[int] = None
+    status: str = STATUS_PENDING
+    created: float = 0.0
+    attempts: int = 0
+    next_attempt: float = 0.0
+    last_error: Optional[str] = None
+
+
+@dataclass
+class UpdateResult:
+    """Outcome of sending one update."""
+    update: Update
+    error: Optional[str] = None
+    transient: bool = False
+    deferred: bool = False
+    seconds: float = 0.0
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load_jira_config(config_file: str = DEFAULT_CONFIG_FILE) -> Dict[str, Optional[str]]:
+    """Read the Jira URL and credentials.
+    :param config_file: {str} - the INI file with a [jira] or [Jira] section
+    :return config: {dict} - url, username and password; missing values are None
+    """
+    parser = configparser.ConfigParser(interpolation=None)
+    if config_file is not None and os.path.exists(config_file):
+        parser.read(config_file)
+
+    section = {}
+    for name in ('Jira', 'jira'):
+        if parser.has_section(name):
+            section.update({key: value.strip() for key, value in parser[name].items() if value.strip()})
+
+    url = section.get('url')
+    if not url and section.get('issue_rest_url'):
+        # commit_code.ini configures the Perl scripts with the issue endpoint, e.g. http://host/tracker/rest/api/2/issue
+        url = section['issue_rest_url'].rstrip('/')
+        if url.endswith(ISSUE_REST_PATH):
+            url = url[:-len(ISSUE_REST_PATH)]
+
+    return {
+        'url': os.environ.get('JIRA_URL') or url,
+        'username': os.environ.get('JIRA_USERNAME') or section.get('username'),
+        'password': os.environ.get('JIRA_PASSWORD') or os.environ.get('JIRA_API_TOKEN') or section.get('password'),
+    }
+
+
+class JiraClient:
+    """Thread-safe Jira REST client over a pool of keep-alive connections."""
+
+    def __init__(
+        self,
+        url: str,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        max_connections: int = DEFAULT_MAX_CONNECTIONS,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        """Constructor
+        :param url: {str} - the base URL of the Jira instance, e.g. https://jira.example.com
+        :param username: {str} - for basic authentication
+        :param password: {str} - the password or API token
+        :param max_connections: {int} - the number of pooled connections and concurrent requests
+        :param timeout: {float} - seconds per request
+        """
+        if not url:
+            raise Exception("the Jira url was not defined")
+
+        parts = urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise Exception(f"unsupported Jira url '{url}'")
+
+        self.url = url
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self._scheme = parts.scheme
+        self._host = parts.hostname
+        self._port = parts.port
+        self._base_path = parts.path.rstrip('/')
+        self._headers = {'Content-Type': 'application/json', 'Accept': 'application/json', 'Connection': 'keep-alive'}
+        if username is not None:
+            token = base64.b64encode(f"{username}:{password or ''}".encode('utf-8')).decode('ascii')
+            self._headers['Authorization'] = f"Basic {token}"
+
+        self._pool = queue.LifoQueue()
+        for _ in range(max_connections):
+            self._pool.put(None)
+        self.connections_opened = 0
+
+    def _connect(self) -> http.client.HTTPConnection:
+        self.connections_opened += 1
+        if self._scheme == 'https':
+            return http.client.HTTPSConnection(self._host, self._port, timeout=self.timeout, context=ssl.create_default_context())
+        return http.client.HTTPConnection(self._host, self._port, timeout=self.timeout)
+
+    @contextmanager
+    def _connection(self):
+        connection = self._pool.get()
+        try:
+            if connection is None:
+                connection = self._connect()
+            yield connection
+        except BaseException:
+            connection.close()
+            connection = None
+            raise
+        finally:
+            self._pool.put(connection)
+
+    def request(self, method: str, path: str, payload: Optional[dict] = None) -> Optional[dict]:
+        """Send one REST request.
+        :param method: {str} - GET, POST, ...
+        :param path: {str} - relative to the base URL, e.g. /rest/api/2/issue/ABC-1/comment
+        :param payload: {dict} - the JSON body
+        :return data: {dict} - the decoded JSON response, or None when it is empty
+        :raise JiraError: when Jira answers with a status of 400 or more
+        """
+        body = json.dumps(payload).encode('utf-8') if payload is not None else None
+
+        with self._connection() as connection:
+            for attempt in range(2):
+                reused = connection.sock is not None
+                try:
+                    connection.request(method, self._base_path + path, body=body, headers=self._headers)
+                    response = connection.getresponse()
+                    data = response.read()
+                    break
+                except (http.client.RemoteDisconnected, BrokenPipeError, ConnectionResetError):
+                    # The server closed the idle connection; reconnect once.
+                    connection.close()
+                    if attempt or not reused:
+                        raise
+
+            if response.getheader('Connection', '').lower() == 'close':
+                connection.close()
+
+        if response.status >= 400:
+            raise JiraError(response.status, data.decode('utf-8', errors='replace')[:500])
+
+        if not data.strip():
+            return None
+
+        try:
+            return json.loads(data)
+        except ValueError:
+            # A proxy or SSO page in front of Jira; the request itself succeeded.
+            logging.warning(f"Jira answered {method} '{path}' with status '{response.status}' and a body that is not JSON: {data[:200]!r}")
+            return None
+
+    def add_comment(self, issue: str, body: str) -> Optional[dict]:
+        """Add a comment to an issue."""
+        return self.request('POST', f"/rest/api/2/issue/{quote(issue)}/comment", {'body': body})
+
+    def get_transitions(self, issue: str) -> Dict[str, str]:
+        """The transitions currently available for an issue, by lower-case name and by id."""
+        data = self.request('GET', f"/rest/api/2/issue/{quote(issue)}/transitions") or {}
+        transitions = {}
+        for transition in data.get('transitions', []):
+            transitions[transition['name'].lower()] = transition['id']
+            transitions[str(transition['id'])] = transition['id']
+        return transitions
+
+    def transition(self, issue: str, transition: str) -> Optional[dict]:
+        """Move an issue through a workflow transition.
+        :param issue: {str} - the issue key
+        :param transition: {str} - the transition name (case-insensitive) or id
+        """
+        transitions = self.get_transitions(issue)
+        transition_id = transitions.get(transition.lower())
+        if transition_id is None:
+            raise JiraError(400, f"transition '{transition}' is not available for issue '{issue}'")
+        return self.request('POST', f"/rest/api/2/issue/{quote(issue)}/transitions", {'transition': {'id': transition_id}})
+
+    def send(self, update: Update) -> UpdateResult:
+        """Send one update, turning any failure into the result's error."""
+        start = time.monotonic()
+        result = UpdateResult(update=update)
+        try:
+            if update.action == 'comment':
+                self.add_comment(update.issue, update.value)
+            elif update.action == 'transition':
+                self.transition(update.issue, update.value)
+            else:
+                raise JiraError(400, f"unsupported action '{update.action}'")
+        except JiraError as e:
+            result.error = str(e)
+            result.transient = e.transient
+        except TRANSIENT_ERRORS as e:
+            result.error = f"{type(e).__name__}: {e}"
+            result.transient = True
+        except Exception as e:
+            # Unexpected; keep the update as failed rather than sending it again on every flush.
+            logging.exception(f"Could not send {update.action} for Jira issue '{update.issue}'")
+            result.error = f"{type(e).__name__}: {e}"
+        result.seconds = time.monotonic() - start
+        return result
+
+    def bulk(self, updates: List[Update], results: Optional[List[Optional[UpdateResult]]] = None) -> List[UpdateResult]:
+        """Send many updates concurrently, at most max_connections at a time.
+
+        The updates of one issue are sent in order, one after the other, so a
+        comment and a following transition are applied as queued; once one
+        fails, the later updates of that issue are deferred without being sent.
+        :param updates: {list} of Update
+        :param results: {list} - optional, as long as updates; filled in as the updates are sent, so a
+            caller can still see what was sent when bulk() is interrupted
+        :return results: {list} of UpdateResult in the order of updates
+        """
+        by_issue: Dict[str, List[int]] = {}
+        for i, update in enumerate(updates):
+            by_issue.setdefault(update.issue, []).append(i)
+
+        if results is None:
+            results = [None] * len(updates)
+
+        def send_issue(indexes: List[int]) -> None:
+            blocked = False
+            for i in indexes:
+                if blocked:
+                    results[i] = UpdateResult(update=updates[i], error='an earlier update of the issue failed', transient=True, deferred=True)
+                    continue
+                results[i] = self.send(updates[i])
+                blocked = not results[i].ok
+
+        with ThreadPoolExecutor(max_workers=self.max_connections) as executor:
+            list(executor.map(send_issue, by_issue.values()))
+
+        return results
+
+    def close(self) -> None:
+        while not self._pool.empty():
+            connection = self._pool.get()
+            if connection is not None:
+                connection.close()
+        for _ in range(self.max_connections):
+            self._pool.put(None)
+
+
+class UpdateQueue:
+    """Durable queue of Jira updates waiting to be sent."""
+
+    def __init__(self, queue_file: str = DEFAULT_QUEUE_FILE):
+        """Constructor
+        :param queue_file: {str} - the SQLite database
+        """
+        self.queue_file = queue_file
+        pathlib.Path(os.path.dirname(os.path.abspath(queue_file))).mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(queue_file, timeout=30)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'UpdateQueue':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def enqueue(self, issue: str, action: str, value: str) -> Update:
+        """Add an update; it is sent by the next flush."""
+        if action not in ACTIONS:
+            raise Exception(f"unsupported action '{action}' - choose from {', '.join(ACTIONS)}")
+        if not issue or not value:
+            raise Exception(f"the issue and the {action} must be specified")
+
+        now = time.time()
+        with self._conn:
+            cursor = self._conn.execute(
+                'INSERT INTO updates (issue, action, value, status, created, next_attempt) VALUES (?, ?, ?, ?, ?, ?)',
+                (issue, action, value, STATUS_PENDING, now, now),
+            )
+
+        logging.info(f"Queued {action} for Jira issue '{issue}' in '{self.queue_file}'")
+
+        return Update(issue=issue, action=action, value=value, id=cursor.lastrowid, created=now, next_attempt=now)
+
+    def _select(self, where: str, args: tuple = ()) -> List[Update]:
+        rows = self._conn.execute(
+            'SELECT issue, action, value, id, status, created, attempts, next_attempt, last_error FROM updates '
+            f"WHERE {where} ORDER BY id",
+            args,
+        )
+        return [Update(*row) for row in rows]
+
+    def due(self, now: Optional[float] = None) -> List[Update]:
+        """The pending updates whose next attempt is due, oldest first.
+
+        An update waits while an earlier update of the same issue is pending
+        but not yet due, so the updates of an issue reach Jira in queue order.
+        """
+        now = time.time() if now is None else now
+        return self._select(
+            'status = ? AND next_attempt <= ? AND NOT EXISTS (SELECT 1 FROM updates earlier WHERE earlier.issue = updates.issue '
+            'AND earlier.id < updates.id AND earlier.status = ? AND earlier.next_attempt > ?)',
+            (STATUS_PENDING, now, STATUS_PENDING, now),
+        )
+
+    def updates(self, status: Optional[str] = None) -> List[Update]:
+        """Every queued update, or those with one status."""
+        return self._select('status = ?', (status,)) if status else self._select('1')
+
+    def record(self, results: List[UpdateResult], max_attempts: int = DEFAULT_MAX_ATTEMPTS) -> Tuple[int, int, int]:
+        """Remove the sent updates and reschedule or fail the others.
+        :return sent, retrying, failed: {tuple}
+        """
+        sent = retrying = failed = 0
+        now = time.time()
+
+        with self._conn:
+            for result in results:
+                update = result.update
+                if result.ok:
+                    self._conn.execute('DELETE FROM updates WHERE id = ?', (update.id,))
+                    sent += 1
+                    continue
+
+                if result.deferred:
+                    # Not sent; due() holds it back until the failed update before it goes through.
+                    retrying += 1
+                    continue
+
+                attempts = update.attempts + 1
+                if result.transient and attempts < max_attempts:
+                    delay = min(BACKOFF_MAX, BACKOFF_BASE * 2 ** (attempts - 1))
+                    status = STATUS_PENDING
+                    retrying += 1
+                else:
+                    delay = 0
+                    status = STATUS_FAILED
+                    failed += 1
+                self._conn.execute(
+                    'UPDATE updates SET status = ?, attempts = ?, next_attempt = ?, last_error = ? WHERE id = ?',
+                    (status, attempts, now + delay, result.error, update.id),
+                )
+
+        return sent, retrying, failed
+
+    def next_attempt(self) -> Optional[float]:
+        """When the earliest pending update is due, or None when none is pending."""
+        return self._conn.execute('SELECT MIN(next_attempt) FROM updates WHERE status = ?', (STATUS_PENDING,)).fetchone()[0]
+
+    def retry(self, ids: Optional[List[int]] = None) -> int:
+        """Make failed (or the given) updates due again."""
+        with self._conn:
+            if ids:
+                marks = ', '.join('?' * len(ids))
+                cursor = self._conn.execute(f"UPDATE updates SET status = ?, next_attempt = 0 WHERE id IN ({marks})", (STATUS_PENDING, *ids))
+            else:
+                cursor = self._conn.execute('UPDATE updates SET status = ?, next_attempt = 0 WHERE status = ?', (STATUS_PENDING, STATUS_FAILED))
+        return cursor.rowcount
+
+    @contextmanager
+    def flush_lock(self, blocking: bool = True):
+        """Hold the lock that serialises flushes; yields False when not blocking and another flush holds it."""
+        with open(self.queue_file + '.lock', 'w') as lock_fh:
+            try:
+                fcntl.flock(lock_fh, fcntl.LOCK_EX | (0 if blocking else fcntl.LOCK_NB))
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock_fh, fcntl.LOCK_UN)
+
+
+def _send_due(update_queue: UpdateQueue, client: JiraClient, max_attempts: int, stats: Dict[str, float]) -> None:
+    """Send the due updates once and record every result, even those of an interrupted bulk()."""
+    due = update_queue.due()
+    stats['due'] += len(due)
+    if not due:
+        return
+
+    results: List[Optional[UpdateResult]] = [None] * len(due)
+    try:
+        client.bulk(due, results)
+    finally:
+        results = [result for result in results if result is not None]
+        for result in results:
+            if not result.ok:
+                logging.warning(f"Could not send {result.update.action} for Jira issue '{result.update.issue}': {result.error}")
+        sent, stats['retrying'], failed = update_queue.record(results, max_attempts=max_attempts)
+        stats['sent'] += sent
+        stats['failed'] += failed
+
+
+def flush(
+    update_queue: UpdateQueue,
+    client: JiraClient,
+    blocking: bool = True,
+    max_attempts: int = DEFAULT_MAX_ATTEMPTS,
+    drain: bool = False,
+    poll_interval: float = DRAIN_POLL_INTERVAL,
+) -> Dict[str, float]:
+    """Send every due update in one bulk call and record the outcome.
+    :param blocking: {bool} - wait for a running flush instead of returning at once
+    :param drain: {bool} - keep going, sleeping until retries are due, until no pending update is left;
+        updates queued meanwhile are picked up within poll_interval seconds
+    :return stats: {dict} - due, sent, retrying, failed and seconds; skipped is True when another flush was running
+    """
+    start = time.monotonic()
+    stats = {'due': 0, 'sent': 0, 'retrying': 0, 'failed': 0, 'skipped': False, 'seconds': 0.0}
+
+    while True:
+        with update_queue.flush_lock(blocking=blocking) as locked:
+            if not locked:
+                stats['skipped'] = stats['due'] == 0
+                break
+
+            _send_due(update_queue, client, max_attempts, stats)
+
+            while drain:
+                next_attempt = update_queue.next_attempt()
+                if next_attempt is None:
+                    break
+                # A pending update that is already due is waiting behind an earlier update of its issue.
+                delay = next_attempt - time.time()
+                time.sleep(min(poll_interval, delay) if delay > 0 else poll_interval)
+                _send_due(update_queue, client, max_attempts, stats)
+
+        # A flush started while the lock was held skipped; make sure its updates are not left behind.
+        if not drain or update_queue.next_attempt() is None:
+            break
+        blocking = False
+
+    stats['seconds'] = time.monotonic() - start
+    logging.info(f"Flushed Jira queue '{update_queue.queue_file}': {stats}")
+    return stats
+
+
+def spawn_flush(queue_file: str = DEFAULT_QUEUE_FILE, config_file: str = DEFAULT_CONFIG_FILE) -> int:
+    """Start a detached 'jira_queue.py flush --drain' so the caller does not wait for Jira.
+
+    The process keeps running until every pending update was sent or has failed for good.
+    :return pid: {int}
+    """
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', '..', 'util', 'jira_queue.py')
+    log_file = os.path.splitext(queue_file)[0] + '.flush.log'
+    with open(log_file, 'a') as log_fh:
+        p = subprocess.Popen(
+            [sys.executable, script, 'flush', '--queue_file', queue_file, '--config_file', config_file, '--no_wait', '--drain'],
+            stdin=subprocess.DEVNULL,
+            stdout=log_fh,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+    logging.info(f"Started background Jira flush '{p.pid}' for queue '{queue_file}'")
+    return p.pid
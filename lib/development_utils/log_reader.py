@@ -0,0 +1,336 @@
+"""Memory-mapped log reader with reverse scanning, time-range seeks and follow mode.
+
+Supported timestamp formats are detected from the first timestamped line:
+
+    python     LOGGING_FORMAT used by the Python utilities
+               INFO : 2026-10-18 17:09:17,994 : /path/script.py : 42 : message
+    apache     Apache HTTP Server error log
+               [Wed Jan 22 11:40:14 2014] [error] [client 10.10.198.190] message
+    log4perl   Log4perl default layout used by DevelopmentUtils::Logger
+               2014/01/22 11:40:14 ...
+
+Lines without a timestamp (tracebacks, continuation lines) belong to the
+preceding timestamped line.
+
+The latest session is found by scanning backwards from EOF until either a
+session marker line or a gap between consecutive entries larger than
+session_gap seconds is seen, so only the tail of the file is read.  For
+time-range queries a sparse timestamp to byte-offset index is built by
+probing the file every index_stride bytes; it is cached on disk and
+extended, rather than rebuilt, when the log only grew.  The inode and size
+alone cannot tell growth from a copytruncate rotation followed by new
+writes, so the cached index also records a digest of the first block and
+is only reused while that block and the last indexed entry are unchanged.
+"""
+import bisect
+import hashlib
+import json
+import logging
+import mmap
+import os
+import pathlib
+import re
+import time
+
+from datetime import datetime
+from typing import Iterator, List, Optional, Tuple
+
+DEFAULT_INDEX_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'log_index')
+
+DEFAULT_INDEX_STRIDE = 1024 * 1024
+
+DEFAULT_SESSION_GAP = 300.0
+
+DEFAULT_FOLLOW_INTERVAL = 0.25
+
+READ_SIZE = 64 * 1024
+
+MONTHS = {name: i for i, name in enumerate(
+    (b'Jan', b'Feb', b'Mar', b'Apr', b'May', b'Jun', b'Jul', b'Aug', b'Sep', b'Oct', b'Nov', b'Dec'), start=1)}
+
+NAIVE_EPOCH = datetime(1970, 1, 1)
+
+
+def to_seconds(dt: datetime) -> float:
+    """Convert a naive local datetime to seconds without a time-zone lookup.
+
+    Log timestamps carry no zone, so they are compared as naive wall-clock
+    times; this avoids a mktime() call per line.
+    """
+    return (dt - NAIVE_EPOCH).total_seconds()
+
+
+def _python_datetime(match) -> datetime:
+    return datetime.fromisoformat(match.group(1).replace(b',', b'.').decode('ascii'))
+
+
+def _apache_datetime(match) -> datetime:
+    month, day, clock, year = match.group(1), match.group(2), match.group(3), match.group(4)
+    return datetime.fromisoformat(f"{year.decode()}-{MONTHS[month]:02d}-{int(day):02d} {clock.decode()}")
+
+
+def _log4perl_datetime(match) -> datetime:
+    return datetime.fromisoformat(match.group(1).replace(b'/', b'-').decode('ascii'))
+
+
+FORMATS = {
+    'python': (re.compile(rb'^[A-Z]+ : (\d{4}-\d\d-\d\d \d\d:\d\d:\d\d,\d{3}) : '), _python_datetime),
+    'apache': (re.compile(rb'^\[\w{3} (\w{3}) +(\d+) (\d\d:\d\d:\d\d)(?:\.\d+)? (\d{4})\]'), _apache_datetime),
+    'log4perl': (re.compile(rb'^(\d{4}/\d\d/\d\d \d\d:\d\d:\d\d)'), _log4perl_datetime),
+}
+
+INDEX_VERSION = 2
+
+FINGERPRINT_BYTES = 4096
+
+
+class LogFile:
+    """Read-only, memory-mapped view over a log file."""
+
+    def __init__(self, path: str, log_format: Optional[str] = None):
+        """Constructor
+        :param path: {str} - the log file
+        :param log_format: {str} - one of FORMATS; detected from the file when None
+        """
+        self.path = path
+
+        with open(path, 'rb') as f:
+            st = os.fstat(f.fileno())
+            self.size = st.st_size
+            self.inode = st.st_ino
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if self.size > 0 else None
+
+        if log_format is None:
+            log_format = self._detect_format()
+
+        if log_format not in FORMATS:
+            raise Exception(f"unsupported log format '{log_format}' for '{path}'")
+
+        self.log_format = log_format
+        self._regex, self._to_datetime = FORMATS[log_format]
+
+    def close(self) -> None:
+        if self._mm is not None:
+            self._mm.close()
+
+    def _detect_format(self) -> str:
+        for _, line in self.lines(0, limit=200):
+            for name, (regex, _) in FORMATS.items():
+                if regex.match(line):
+                    return name
+        raise Exception(f"could not detect the timestamp format of '{self.path}'")
+
+    def timestamp(self, line: bytes) -> Optional[float]:
+        """Return the line's timestamp in seconds (see to_seconds), or None for continuation lines."""
+        match = self._regex.match(line)
+        if match is None:
+            return None
+        return to_seconds(self._to_datetime(match))
+
+    def lines(self, offset: int = 0, end: Optional[int] = None, limit: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+        """Yield (offset, line) pairs forwards from offset, without the trailing newline."""
+        if self._mm is None:
+            return
+
+        end = self.size if end is None else end
+        count = 0
+
+        while offset < end and (limit is None or count < limit):
+            newline = self._mm.find(b'\n', offset, end)
+            stop = end if newline == -1 else newline
+            yield offset, self._mm[offset:stop]
+            offset = stop + 1
+            count += 1
+
+    def reverse_lines(self, end: Optional[int] = None) -> Iterator[Tuple[int, bytes]]:
+        """Yield (offset, line) pairs backwards from end (default EOF)."""
+        if self._mm is None:
+            return
+
+        end = self.size if end is None else end
+        if end > 0 and self._mm[end - 1:end] == b'\n':
+            end -= 1
+
+        while end > 0:
+            newline = self._mm.rfind(b'\n', 0, end)
+            start = newline + 1
+            yield start, self._mm[start:end]
+            end = max(newline, 0)
+
+    def _next_line_start(self, offset: int) -> int:
+        if offset <= 0:
+            return 0
+        newline = self._mm.find(b'\n', offset - 1)
+        return self.size if newline == -1 else newline + 1
+
+    def latest_session(self, marker: Optional[str] = None, gap: float = DEFAULT_SESSION_GAP) -> int:
+        """Find where the most recent session starts by scanning backwards from EOF.
+        :param marker: {str} - regular expression matching the first line of a session
+        :param gap: {float} - seconds between consecutive entries that separate sessions
+        :return offset: {int} - the byte offset of the first line of the latest session
+        """
+        marker_regex = re.compile(marker.encode('utf-8')) if marker is not None else None
+        session_start = 0
+        later_timestamp = None
+        later_offset = None
+
+        for offset, line in self.reverse_lines():
+            if marker_regex is not None and marker_regex.search(line):
+                return offset
+
+            ts = self.timestamp(line)
+            if ts is None:
+                continue
+
+            if marker_regex is None and later_timestamp is not None and later_timestamp - ts > gap:
+                return later_offset
+
+            later_timestamp = ts
+            later_offset = offset
+            session_start = offset
+
+        return session_start
+
+    def _index_file(self, index_dir: str) -> str:
+        key = hashlib.sha1(os.path.abspath(self.path).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(index_dir, f"{key}.json")
+
+    def _head_digest(self, length: int) -> str:
+        return hashlib.sha1(self._mm[:length] if self._mm is not None else b'').hexdigest()
+
+    def _is_same_log(self, cached: dict) -> bool:
+        """Check that the file only grew since the cached index was written."""
+        if cached['head_bytes'] > self.size or self._head_digest(cached['head_bytes']) != cached['head_sha1']:
+            return False
+
+        if cached['entries']:
+            ts, offset = cached['entries'][-1]
+            line = next(self.lines(offset, limit=1), (None, b''))[1]
+            if self.timestamp(line) != ts:
+                return False
+
+        return True
+
+    def build_index(self, stride: int = DEFAULT_INDEX_STRIDE, index_dir: Optional[str] = DEFAULT_INDEX_DIR) -> List[Tuple[float, int]]:
+        """Build (or extend) the sparse timestamp to byte-offset index.
+        :param stride: {int} - the distance in bytes between index probes
+        :param index_dir: {str} - where the index is cached; None disables the cache
+        :return index: {list} - sorted (timestamp, offset) pairs
+        """
+        entries = []
+        probe = 0
+
+        index_file = self._index_file(index_dir) if index_dir is not None else None
+        if index_file is not None and os.path.exists(index_file):
+            try:
+                with open(index_file) as f:
+                    cached = json.load(f)
+                if (cached.get('version') == INDEX_VERSION and cached['inode'] == self.inode
+                        and cached['stride'] == stride and cached['size'] <= self.size
+                        and cached['log_format'] == self.log_format):
+                    if self._is_same_log(cached):
+                        entries = [tuple(entry) for entry in cached['entries']]
+                        probe = cached['next_probe']
+                    else:
+                        logging.info(f"'{self.path}' was truncated and rewritten since it was indexed; rebuilding the index")
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable log index '{index_file}': {e}")
+
+        while probe < self.size:
+            start = self._next_line_start(probe)
+            for offset, line in self.lines(start, end=min(self.size, start + stride)):
+                ts = self.timestamp(line)
+                if ts is not None:
+                    if not entries or offset > entries[-1][1]:
+                        entries.append((ts, offset))
+                    break
+            probe += stride
+
+        if index_file is not None:
+            pathlib.Path(index_dir).mkdir(parents=True, exist_ok=True)
+            tmp_file = f"{index_file}.{os.getpid()}.tmp"
+            with open(tmp_file, 'w') as of:
+                json.dump({
+                    'version': INDEX_VERSION,
+                    'path': os.path.abspath(self.path),
+                    'inode': self.inode,
+                    'size': self.size,
+                    'stride': stride,
+                    'log_format': self.log_format,
+                    'next_probe': probe,
+                    'head_bytes': min(FINGERPRINT_BYTES, self.size),
+                    'head_sha1': self._head_digest(min(FINGERPRINT_BYTES, self.size)),
+                    'entries': entries,
+                }, of)
+            os.replace(tmp_file, index_file)
+
+        logging.info(f"Log index for '{self.path}' has '{len(entries)}' entries")
+
+        return entries
+
+    def time_range(self, start: Optional[float] = None, end: Optional[float] = None, index: Optional[List[Tuple[float, int]]] = None) -> Iterator[Tuple[int, bytes]]:
+        """Yield the lines whose entry timestamp falls in [start, end].
+        :param start: {float} - seconds as returned by to_seconds(); None means the beginning of the file
+        :param end: {float} - seconds as returned by to_seconds(); None means EOF
+        :param index: {list} - the sparse index from build_index(); built when None
+        """
+        if index is None:
+            index = self.build_index()
+
+        offset = 0
+        if start is not None and index:
+            i = bisect.bisect_left(index, (start, -1)) - 1
+            offset = index[i][1] if i >= 0 else 0
+
+        in_range = False
+        for line_offset, line in self.lines(offset):
+            ts = self.timestamp(line)
+            if ts is not None:
+                if end is not None and ts > end:
+                    return
+                in_range = start is None or ts >= start
+            if in_range:
+                yield line_offset, line
+
+
+def follow(path: str, offset: int, interval: float = DEFAULT_FOLLOW_INTERVAL, duration: Optional[float] = None) -> Iterator[bytes]:
+    """Yield complete lines appended to path after offset, like tail -f.
+
+    Truncation or rotation (a new inode, or the file shrinking) restarts at the
+    beginning of the new file.
+    :param path: {str} - the log file
+    :param offset: {int} - the byte offset to start from, normally the current size
+    :param interval: {float} - seconds between checks for new data
+    :param duration: {float} - stop after this many seconds; None follows forever
+    """
+    deadline = None if duration is None else time.monotonic() + duration
+    f = open(path, 'rb')
+    inode = os.fstat(f.fileno()).st_ino
+    f.seek(offset)
+    partial = b''
+
+    try:
+        while deadline is None or time.monotonic() < deadline:
+            data = f.read(READ_SIZE)
+            if data:
+                partial += data
+                *complete, partial = partial.split(b'\n')
+                for line in complete:
+                    yield line
+                continue
+
+            time.sleep(interval)
+
+            try:
+                st = os.stat(path)
+            except FileNotFoundError:
+                continue
+
+            if st.st_ino != inode or st.st_size < f.tell():
+                logging.info(f"'{path}' was rotated or truncated - reopening")
+                f.close()
+                f = open(path, 'rb')
+                inode = os.fstat(f.fileno()).st_ino
+                partial = b''
+    finally:
+        f.close()
@@ -0,0 +1,172 @@
+"""Non-blocking logging shared by the Python utilities.
+
+setup_logging() replaces logging.basicConfig(filename=...): the root logger
+gets a QueueHandler, so a log call only formats the message and appends the
+record to an in-memory queue, and a QueueListener thread does the file I/O.
+A slow or network-mounted /tmp therefore no longer stalls _execute_cmd or
+the scheduler threads.
+
+The log file is rotated by size; rotated files are gzip-compressed by the
+listener thread.  Setting DEV_UTILS_LOG_FORMAT=json (or passing
+json_lines=True) writes one JSON object per line instead of LOGGING_FORMAT
+text, including the current step ID (see log_step) and any 'duration' passed
+through the extra argument.
+"""
+import atexit
+import contextvars
+import gzip
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import shutil
+import time
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Optional
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_FORMAT_ENV_VAR = 'DEV_UTILS_LOG_FORMAT'
+
+DEFAULT_MAX_BYTES = 50 * 1024 * 1024
+
+DEFAULT_BACKUP_COUNT = 5
+
+_current_step = contextvars.ContextVar('current_step', default=None)
+
+_listener = None
+
+
+class StepFilter(logging.Filter):
+    """Stamp each record with the step ID of the calling context.
+
+    Runs in the thread that logs, before the record is queued, so that the
+    step set by log_step() in a scheduler worker is preserved.
+    """
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if not hasattr(record, 'step'):
+            record.step = _current_step.get()
+        return True
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """Format a record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            'time': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'file': record.pathname,
+            'line': record.lineno,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+
+        if getattr(record, 'step', None) is not None:
+            entry['step'] = record.step
+
+        if getattr(record, 'duration', None) is not None:
+            entry['duration'] = round(record.duration, 6)
+
+        return json.dumps(entry)
+
+
+def _gzip_rotator(source: str, dest: str) -> None:
+    with open(source, 'rb') as f_in, gzip.open(dest, 'wb') as f_out:
+        shutil.copyfileobj(f_in, f_out)
+    os.remove(source)
+
+
+def _gzip_namer(name: str) -> str:
+    return name + '.gz'
+
+
+def setup_logging(
+    logfile: str,
+    format: str = LOGGING_FORMAT,
+    level: int = logging.INFO,
+    json_lines: Optional[bool] = None,
+    max_bytes: int = DEFAULT_MAX_BYTES,
+    backup_count: int = DEFAULT_BACKUP_COUNT,
+    compress: bool = True,
+) -> logging.handlers.QueueListener:
+    """Configure the root logger to write to logfile through a background thread.
+    :param logfile: {str} - the log file
+    :param format: {str} - the text format, as for logging.basicConfig
+    :param level: {int} - the root logger level
+    :param json_lines: {bool} - write JSON lines; None consults DEV_UTILS_LOG_FORMAT
+    :param max_bytes: {int} - rotate when the log file would exceed this size; 0 disables rotation
+    :param backup_count: {int} - the number of rotated files kept
+    :param compress: {bool} - gzip the rotated files
+    :return listener: {QueueListener} - already started; stopped (and flushed) at exit
+    """
+    global _listener
+
+    if json_lines is None:
+        json_lines = os.environ.get(LOG_FORMAT_ENV_VAR, 'text').lower() == 'json'
+
+    file_handler = logging.handlers.RotatingFileHandler(logfile, maxBytes=max_bytes, backupCount=backup_count, delay=True)
+    if compress:
+        file_handler.rotator = _gzip_rotator
+        file_handler.namer = _gzip_namer
+    file_handler.setFormatter(JsonLinesFormatter() if json_lines else logging.Formatter(format))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = logging.handlers.QueueHandler(log_queue)
+    queue_handler.addFilter(StepFilter())
+
+    _stop_listener()
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=True)
+    _listener.start()
+
+    return _listener
+
+
+def _stop_listener() -> None:
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(_stop_listener)
+
+
+def reset_after_fork() -> None:
+    """Detach a forked child from the parent's listener, whose thread does not exist in the child."""
+    global _listener
+    _listener = None
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+
+
+@contextmanager
+def log_step(step: str):
+    """Tag the records logged inside the block with step and log its duration.
+    :param step: {str} - the step ID
+    """
+    token = _current_step.set(step)
+    start = time.monotonic()
+    status = 'failed'
+    try:
+        yield
+        status = 'completed'
+    finally:
+        duration = time.monotonic() - start
+        logging.info(f"Step '{step}' {status} in {duration:.3f} seconds", extra={'duration': duration})
+        _current_step.reset(token)
@@ -0,0 +1,329 @@
+"""Streaming tar archives compressed on every core.
+
+archive_directory() writes a tar stream (tarfile in 'w|' mode) straight into
+a compressing writer; nothing is staged on disk.
+
+ParallelGzipWriter cuts the stream into fixed-size blocks and deflates them
+on a thread pool (zlib releases the GIL), as pigz does: each block is a raw
+deflate stream primed with the last 32 KiB of the previous block as its
+dictionary and ended with a sync flush, so the blocks concatenate into one
+deflate stream.  An empty final block, the CRC-32 and the length complete a
+single-member .gz file that gzip, tar -z and Python's gzip module read as
+usual.
+
+ZstdWriter uses the multi-threaded compressor of the zstandard package when
+it is installed and otherwise pipes into 'zstd -T<workers>'.
+
+Optionally, the .git objects that a reference mirror (e.g. one kept by
+GitMirrorCache) already holds are left out: loose objects present in the
+mirror and packs whose every object is in the mirror.  The mirror's object
+directory is then listed in .git/objects/info/alternates of the archived
+checkout, which is how git finds them again after extraction.
+"""
+import collections
+import importlib.util
+import io
+import logging
+import os
+import struct
+import subprocess
+import tarfile
+import time
+import zlib
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import BinaryIO, Optional
+
+from .git_objects import ObjectSet, loose_object_name
+
+DEFAULT_BLOCK_SIZE = 1024 * 1024
+
+DEFAULT_MAX_WORKERS = os.cpu_count() or 1
+
+DEFAULT_LEVELS = {'gzip': 6, 'zstd': 3}
+
+FORMATS = tuple(DEFAULT_LEVELS)
+
+EXTENSIONS = {'gzip': '.tar.gz', 'zstd': '.tar.zst'}
+
+DICTIONARY_SIZE = 32 * 1024
+
+PACK_SUFFIXES = ('.pack', '.idx', '.rev', '.bitmap', '.keep', '.promisor')
+
+
+@dataclass
+class ArchiveStats:
+    """Volume and speed of one archive run."""
+    outfile: str
+    format: str
+    files: int = 0
+    bytes_in: int = 0
+    bytes_out: int = 0
+    excluded_objects: int = 0
+    excluded_bytes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def ratio(self) -> float:
+        return self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+
+    @property
+    def throughput(self) -> float:
+        """Uncompressed MiB per second."""
+        return self.bytes_in / 1024 / 1024 / self.seconds if self.seconds else 0.0
+
+
+def _deflate_block(block: bytes, dictionary: bytes, level: int) -> bytes:
+    if dictionary:
+        c = zlib.compressobj(level, zlib.DEFLATED, -15, zlib.DEF_MEM_LEVEL, zlib.Z_DEFAULT_STRATEGY, dictionary)
+    else:
+        c = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return c.compress(block) + c.flush(zlib.Z_SYNC_FLUSH)
+
+
+class ParallelGzipWriter(io.RawIOBase):
+    """A write-only stream producing one gzip member, compressed block-parallel."""
+
+    def __init__(self, fileobj: BinaryIO, level: int = DEFAULT_LEVELS['gzip'], max_workers: int = DEFAULT_MAX_WORKERS,
+                 block_size: int = DEFAULT_BLOCK_SIZE):
+        """Constructor
+        :param fileobj: {file} - the binary output
+        :param level: {int} - the zlib level
+        :param max_workers: {int} - the number of compression threads
+        :param block_size: {int} - uncompressed bytes per block
+        """
+        super().__init__()
+        self._fileobj = fileobj
+        self._level = level
+        self._max_in_flight = max_workers * 2
+        self._block_size = block_size
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._pending = collections.deque()
+        self._buffer = bytearray()
+        self._dictionary = b''
+        self._crc = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+
+        # magic, deflate, no flags, no mtime, no extra flags, OS unix
+        self._emit(b'\x1f\x8b\x08\x00' + struct.pack('<I', 0) + b'\x00\x03')
+
+    def writable(self) -> bool:
+        return True
+
+    def _emit(self, data: bytes) -> None:
+        self._fileobj.write(data)
+        self.bytes_out += len(data)
+
+    def _submit(self, block: bytes) -> None:
+        self._crc = zlib.crc32(block, self._crc)
+        self._pending.append(self._executor.submit(_deflate_block, block, self._dictionary, self._level))
+        self._dictionary = block[-DICTIONARY_SIZE:]
+        while len(self._pending) > self._max_in_flight:
+            self._emit(self._pending.popleft().result())
+
+    def write(self, data) -> int:
+        self._buffer += data
+        self.bytes_in += len(data)
+        while len(self._buffer) >= self._block_size:
+            block = bytes(self._buffer[:self._block_size])
+            del self._buffer[:self._block_size]
+            self._submit(block)
+        return len(data)
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            if self._buffer:
+                self._submit(bytes(self._buffer))
+                self._buffer.clear()
+            while self._pending:
+                self._emit(self._pending.popleft().result())
+            # An empty final deflate block, then CRC-32 and ISIZE.
+            self._emit(b'\x03\x00' + struct.pack('<II', self._crc & 0xffffffff, self.bytes_in & 0xffffffff))
+        finally:
+            self._executor.shutdown()
+            super().close()
+
+
+class ZstdWriter(io.RawIOBase):
+    """A write-only stream producing zstd output with the multi-threaded compressor."""
+
+    def __init__(self, fileobj: BinaryIO, level: int = DEFAULT_LEVELS['zstd'], max_workers: int = DEFAULT_MAX_WORKERS):
+        """Constructor
+        :param fileobj: {file} - the binary output; must be a real file when the zstd program is used
+        :param level: {int} - the zstd level
+        :param max_workers: {int} - the number of compression threads
+        """
+        super().__init__()
+        self._fileobj = fileobj
+        self._start = fileobj.tell()
+        self.bytes_in = 0
+
+        if importlib.util.find_spec('zstandard') is not None:
+            import zstandard
+            self._process = None
+            self._stream = zstandard.ZstdCompressor(level=level, threads=max_workers).stream_writer(fileobj, closefd=False)
+        else:
+            fileobj.flush()
+            self._process = subprocess.Popen(['zstd', '-q', f"-{level}", f"-T{max_workers}", '-c'], stdin=subprocess.PIPE, stdout=fileobj)
+            self._stream = self._process.stdin
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._stream.write(data)
+        self.bytes_in += len(data)
+        return len(data)
+
+    @property
+    def bytes_out(self) -> int:
+        return self._fileobj.tell() - self._start if self._process is None else os.fstat(self._fileobj.fileno()).st_size - self._start
+
+    def close(self) -> None:
+        if self.closed:
+            return
+        try:
+            self._stream.close()
+            if self._process is not None and self._process.wait() != 0:
+                raise Exception(f"zstd received status '{self._process.returncode}'")
+        finally:
+            super().close()
+
+
+def open_compressor(fmt: str, fileobj: BinaryIO, level: Optional[int] = None, max_workers: int = DEFAULT_MAX_WORKERS,
+                    block_size: int = DEFAULT_BLOCK_SIZE) -> io.RawIOBase:
+    """Create the compressing writer for a format.
+    :param fmt: {str} - gzip or zstd
+    :return writer: a stream with write(), close(), bytes_in and bytes_out
+    """
+    if fmt not in FORMATS:
+        raise Exception(f"unsupported format '{fmt}' - choose from {', '.join(FORMATS)}")
+
+    level = DEFAULT_LEVELS[fmt] if level is None else level
+
+    if fmt == 'gzip':
+        return ParallelGzipWriter(fileobj, level=level, max_workers=max_workers, block_size=block_size)
+    return ZstdWriter(fileobj, level=level, max_workers=max_workers)
+
+
+class _MirroredObjectFilter:
+    """tarfile filter that leaves out the .git objects a reference mirror already has."""
+
+    def __init__(self, indir: str, arcname: str, reference: str, stats: ArchiveStats):
+        self.mirror = ObjectSet(reference)
+        self.stats = stats
+        self.objects_prefix = f"{arcname}/.git/objects/"
+        self.alternates_name = self.objects_prefix + 'info/alternates'
+        self.alternates = []
+
+        objects_dir = os.path.join(indir, '.git', 'objects')
+        alternates_file = os.path.join(objects_dir, 'info', 'alternates')
+        if os.path.exists(alternates_file):
+            with open(alternates_file) as f:
+                self.alternates = [line.strip() for line in f if line.strip()]
+
+        self.covered_packs = set()
+        pack_dir = os.path.join(objects_dir, 'pack')
+        if os.path.isdir(pack_dir):
+            for entry in os.scandir(pack_dir):
+                if entry.name.endswith('.idx') and self.mirror.covers_pack(entry.path):
+                    self.covered_packs.add(entry.name[:-len('.idx')])
+
+        logging.info(f"'{len(self.covered_packs)}' packs of '{indir}' are fully contained in reference '{self.mirror.git_dir}'")
+
+    def __call__(self, tarinfo: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
+        if not tarinfo.isfile() or not tarinfo.name.startswith(self.objects_prefix):
+            return tarinfo
+
+        relpath = tarinfo.name[len(self.objects_prefix):]
+
+        if relpath == 'info/alternates':
+            # Re-added with the mirror once the walk is complete.
+            return None
+
+        if relpath.startswith('pack/'):
+            base, ext = os.path.splitext(relpath[len('pack/'):])
+            excluded = ext in PACK_SUFFIXES and base in self.covered_packs
+        else:
+            name = loose_object_name(relpath.replace('/', os.sep))
+            excluded = name is not None and name in self.mirror
+
+        if excluded:
+            self.stats.excluded_objects += 1
+            self.stats.excluded_bytes += tarinfo.size
+            return None
+
+        return tarinfo
+
+    def add_alternates(self, tar: tarfile.TarFile) -> None:
+        lines = self.alternates + [os.path.abspath(self.mirror.objects_dir)]
+        data = ''.join(f"{line}\n" for line in dict.fromkeys(lines)).encode('utf-8')
+        tarinfo = tarfile.TarInfo(self.alternates_name)
+        tarinfo.size = len(data)
+        tarinfo.mtime = int(time.time())
+        tarinfo.mode = 0o644
+        tar.addfile(tarinfo, io.BytesIO(data))
+
+
+def archive_directory(
+    indir: str,
+    outfile: str,
+    fmt: str = 'gzip',
+    level: Optional[int] = None,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    block_size: int = DEFAULT_BLOCK_SIZE,
+    reference: Optional[str] = None,
+) -> ArchiveStats:
+    """Archive a directory as <basename>/... in a compressed tar file.
+    :param indir: {str} - the directory, typically a git checkout
+    :param outfile: {str} - the archive to create; must not exist
+    :param fmt: {str} - gzip or zstd
+    :param level: {int} - the compression level - default depends on fmt
+    :param max_workers: {int} - the number of compression threads
+    :param block_size: {int} - uncompressed bytes per gzip block
+    :param reference: {str} - a bare mirror whose objects are left out of .git
+    :return stats: {ArchiveStats}
+    """
+    start = time.monotonic()
+    indir = os.path.abspath(indir)
+    arcname = os.path.basename(indir)
+    stats = ArchiveStats(outfile=outfile, format=fmt)
+
+    object_filter = None
+    if reference is not None:
+        if not os.path.isdir(os.path.join(indir, '.git')):
+            raise Exception(f"'{indir}' has no .git directory to leave mirrored objects out of")
+        object_filter = _MirroredObjectFilter(indir, arcname, reference, stats)
+
+    def count(tarinfo: tarfile.TarInfo) -> Optional[tarfile.TarInfo]:
+        if object_filter is not None:
+            tarinfo = object_filter(tarinfo)
+        if tarinfo is not None and tarinfo.isfile():
+            stats.files += 1
+        return tarinfo
+
+    # 'x' refuses to overwrite an existing archive.
+    with open(outfile, 'xb') as of:
+        try:
+            writer = open_compressor(fmt, of, level=level, max_workers=max_workers, block_size=block_size)
+            with tarfile.open(fileobj=writer, mode='w|', format=tarfile.PAX_FORMAT) as tar:
+                tar.add(indir, arcname=arcname, filter=count)
+                if object_filter is not None and stats.excluded_objects:
+                    object_filter.add_alternates(tar)
+            writer.close()
+            stats.bytes_in = writer.bytes_in
+            stats.bytes_out = writer.bytes_out
+        except BaseException:
+            os.unlink(outfile)
+            raise
+
+    stats.seconds = time.monotonic() - start
+
+    logging.info(f"Archived '{indir}' into '{outfile}': '{stats.files}' files, '{stats.bytes_in}' bytes in, '{stats.bytes_out}' bytes out, "
+                 f"'{stats.excluded_objects}' mirrored objects left out, '{stats.throughput:.1f}' MiB/s")
+
+    return stats
@@ -0,0 +1,138 @@
+"""Static discovery of the module dependencies of Perl source trees.
+
+A module's dependencies are the package names it loads at compile time:
+
+    use Foo::Bar ...;                     require Foo::Bar;
+    use base / use parent qw(Foo Bar);    extends 'Foo::Bar';    with 'Role', 'Other::Role';
+
+Only names that resolve to a .pm file under the given library directories
+are kept; pragmas, core and CPAN modules are outside the tree.  Like @INC,
+the first library directory providing a package wins.  POD and everything
+after __END__/__DATA__ are ignored.
+"""
+import logging
+import os
+import re
+
+from typing import Dict, Iterable, List, Optional, Set
+
+PACKAGE_NAME = r'[A-Za-z_]\w*(?:::\w+)*'
+
+USE_PATTERN = re.compile(r'^\s*(?:use|require)\s+(' + PACKAGE_NAME + r')', re.M)
+
+# base/parent and the Moose extends/with keywords take a list of names, quoted or in qw().
+LIST_PATTERN = re.compile(r'^\s*(use\s+(?:base|parent)|extends|with)\b(.*?);', re.M | re.S)
+
+LIST_NAME_PATTERN = re.compile(r"""['"](""" + PACKAGE_NAME + r""")['"]|qw\s*[(\[{/]([^)\]}/]*)""")
+
+PACKAGE_PATTERN = re.compile(r'^\s*package\s+(' + PACKAGE_NAME + r')', re.M)
+
+POD_PATTERN = re.compile(r'^=[a-zA-Z].*?(?:^=cut\b.*?$|\Z)', re.M | re.S)
+
+END_PATTERN = re.compile(r'^__(?:END|DATA)__\b', re.M)
+
+
+def strip_non_code(source: str) -> str:
+    """Remove POD and the __END__/__DATA__ section, keeping the line numbers of the code."""
+    match = END_PATTERN.search(source)
+    if match:
+        source = source[:match.start()]
+    return POD_PATTERN.sub(lambda pod: '\n' * pod.group(0).count('\n'), source)
+
+
+def parse_dependency_lines(source: str) -> Dict[str, int]:
+    """Extract the package names loaded by a Perl source file with the line of their first use.
+    :param source: {str} - the content of a .pm or .pl file
+    :return names: {dict} - package name to line number, including pragmas and modules outside the tree
+    """
+    source = strip_non_code(source)
+    found = []
+
+    for match in USE_PATTERN.finditer(source):
+        found.append((match.start(1), match.group(1)))
+
+    for match in LIST_PATTERN.finditer(source):
+        # The keyword's offset; '^\s*' may have matched blank lines before it.
+        offset = match.start(1)
+        for quoted, words in LIST_NAME_PATTERN.findall(match.group(2)):
+            if quoted:
+                found.append((offset, quoted))
+            else:
+                found.extend((offset, word) for word in words.split() if re.fullmatch(PACKAGE_NAME, word))
+
+    names = {}
+    for offset, name in sorted(found):
+        if name not in names:
+            names[name] = source.count('\n', 0, offset) + 1
+    return names
+
+
+def parse_dependencies(source: str) -> Set[str]:
+    """Extract the package names loaded by a Perl source file.
+    :param source: {str} - the content of a .pm or .pl file
+    :return names: {set} - package names, including pragmas and modules outside the tree
+    """
+    return set(parse_dependency_lines(source))
+
+
+def parse_package(source: str) -> Optional[str]:
+    """The first package declared by a Perl source file, or None."""
+    match = PACKAGE_PATTERN.search(strip_non_code(source))
+    return match.group(1) if match else None
+
+
+def module_name(module_file: str, lib_dir: str) -> str:
+    """Derive the package name of a module file, e.g. <lib>/Foo/Bar.pm as Foo::Bar."""
+    relpath = os.path.relpath(module_file, lib_dir)
+    return os.path.splitext(relpath)[0].replace(os.sep, '::')
+
+
+def find_modules(lib_dirs: Iterable[str]) -> Dict[str, str]:
+    """Map each package name to its .pm file, the first library directory winning.
+    :param lib_dirs: {list} - the library directories in @INC order
+    :return modules: {dict} - package name to absolute module file
+    """
+    modules = {}
+
+    for lib_dir in lib_dirs:
+        lib_dir = os.path.abspath(lib_dir)
+        for root, dirs, files in os.walk(lib_dir):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.pm'):
+                    path = os.path.join(root, name)
+                    modules.setdefault(module_name(path, lib_dir), path)
+
+    logging.info(f"Found '{len(modules)}' modules under '{', '.join(lib_dirs)}'")
+
+    return modules
+
+
+def read_dependencies(module_file: str) -> Set[str]:
+    """Parse the package names loaded by one file."""
+    with open(module_file, encoding='utf-8', errors='replace') as f:
+        return parse_dependencies(f.read())
+
+
+def build_graph(modules: Dict[str, str]) -> Dict[str, List[str]]:
+    """The in-tree dependency edges of every module.
+    :param modules: {dict} - package name to module file, as returned by find_modules
+    :return graph: {dict} - package name to the sorted in-tree package names it loads
+    """
+    return {
+        name: sorted(dependency for dependency in read_dependencies(path) if dependency in modules and dependency != name)
+        for name, path in modules.items()
+    }
+
+
+def transitive_closure(graph: Dict[str, List[str]], start: str) -> Set[str]:
+    """Every package reachable from start through the graph, excluding start itself."""
+    seen = set()
+    stack = list(graph.get(start, ()))
+    while stack:
+        name = stack.pop()
+        if name in seen or name == start:
+            continue
+        seen.add(name)
+        stack.extend(graph.get(name, ()))
+    return seen
@@ -0,0 +1,175 @@
+"""Persistent reverse-dependency index of the Perl modules of a directory tree.
+
+The index is a SQLite database with one row per .pm file (its declared
+package and its (mtime_ns, size) stat key) and one row per edge from a file
+to a package it loads with use/require/base/parent/extends/with, including
+pragmas and CPAN modules such as Moose (see perl_dependencies).  Edges are
+indexed by the package loaded, so 'who uses X' is an index lookup and the
+transitive 'who depends on X' is a breadth-first walk over those lookups.
+
+update() walks the tree with stat only and re-parses just the files whose
+stat key changed, adding new files and dropping deleted ones, so keeping the
+index current costs a directory walk rather than reading every module.
+"""
+import hashlib
+import logging
+import os
+import pathlib
+import sqlite3
+import time
+
+from dataclasses import dataclass
+from typing import Dict, List
+
+from .checksum_manifest import walk_files
+from .perl_dependencies import module_name, parse_dependency_lines, parse_package
+
+DEFAULT_INDEX_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'perl_dependency_index')
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    package TEXT NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS files_package ON files (package);
+CREATE TABLE IF NOT EXISTS edges (
+    path TEXT NOT NULL,
+    dependency TEXT NOT NULL,
+    line INTEGER NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS edges_dependency ON edges (dependency);
+CREATE INDEX IF NOT EXISTS edges_path ON edges (path);
+'''
+
+
+@dataclass
+class Use:
+    """One module loading a package."""
+    package: str
+    path: str
+    line: int
+    text: str
+    depth: int = 1
+
+
+def default_index_file(indir: str) -> str:
+    """Derive the index database for a directory tree."""
+    key = hashlib.sha1(indir.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DEFAULT_INDEX_DIR, f"{os.path.basename(indir) or 'root'}-{key}.sqlite")
+
+
+class DependencyIndex:
+    """On-disk inverted index of the use/require/extends/with edges of one directory tree."""
+
+    def __init__(self, indir: str, index_file: str = None):
+        """Constructor
+        :param indir: {str} - the directory containing the modules
+        :param index_file: {str} - the SQLite database - default is derived from indir under DEFAULT_INDEX_DIR
+        """
+        self.indir = os.path.abspath(indir)
+        self.index_file = index_file or default_index_file(self.indir)
+        pathlib.Path(os.path.dirname(self.index_file)).mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(self.index_file, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.executescript(SCHEMA)
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def __enter__(self) -> 'DependencyIndex':
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
+
+    def _parse(self, relpath: str) -> tuple:
+        path = os.path.join(self.indir, relpath)
+        with open(path, encoding='utf-8', errors='replace') as f:
+            source = f.read()
+
+        package = parse_package(source) or module_name(path, self.indir)
+        lines = source.splitlines()
+        edges = [
+            (relpath, dependency, line, lines[line - 1].strip() if line <= len(lines) else '')
+            for dependency, line in parse_dependency_lines(source).items()
+        ]
+        return package, edges
+
+    def update(self) -> Dict[str, int]:
+        """Bring the index up to date with the tree.
+        :return stats: {dict} - files, parsed, removed and seconds
+        """
+        start = time.monotonic()
+
+        known = {path: (mtime_ns, size) for path, mtime_ns, size in self._conn.execute('SELECT path, mtime_ns, size FROM files')}
+        current = {}
+        for relpath, st in walk_files(self.indir):
+            if relpath.endswith('.pm'):
+                current[relpath] = (st.st_mtime_ns, st.st_size)
+
+        changed = sorted(relpath for relpath, key in current.items() if known.get(relpath) != key)
+        removed = sorted(relpath for relpath in known if relpath not in current)
+
+        with self._conn:
+            for relpath in removed:
+                self._conn.execute('DELETE FROM files WHERE path = ?', (relpath,))
+                self._conn.execute('DELETE FROM edges WHERE path = ?', (relpath,))
+
+            for relpath in changed:
+                try:
+                    package, edges = self._parse(relpath)
+                except OSError as e:
+                    logging.warning(f"Could not read '{relpath}' under '{self.indir}': {e}")
+                    continue
+                self._conn.execute('DELETE FROM edges WHERE path = ?', (relpath,))
+                self._conn.execute('INSERT OR REPLACE INTO files (path, package, mtime_ns, size) VALUES (?, ?, ?, ?)',
+                                   (relpath, package) + current[relpath])
+                self._conn.executemany('INSERT INTO edges (path, dependency, line, text) VALUES (?, ?, ?, ?)', edges)
+
+        stats = {'files': len(current), 'parsed': len(changed), 'removed': len(removed), 'seconds': time.monotonic() - start}
+        logging.info(f"Updated index '{self.index_file}' of '{self.indir}': '{stats['files']}' files, "
+                     f"'{stats['parsed']}' parsed and '{stats['removed']}' removed in '{stats['seconds']:.3f}' seconds")
+        return stats
+
+    def users(self, package: str) -> List[Use]:
+        """The modules that load package directly.
+        :param package: {str} - e.g. Moose or DevelopmentUtils::Logger
+        :return uses: {list} of Use sorted by package
+        """
+        rows = self._conn.execute(
+            'SELECT f.package, e.path, e.line, e.text FROM edges e JOIN files f ON f.path = e.path '
+            'WHERE e.dependency = ? AND f.package != ? ORDER BY f.package, e.path',
+            (package, package),
+        )
+        return [Use(*row) for row in rows]
+
+    def dependents(self, package: str) -> List[Use]:
+        """The modules that depend on package directly or through other modules.
+        :param package: {str}
+        :return uses: {list} of Use, one per dependent module, sorted by depth and package;
+            each Use is the edge that reaches the module first
+        """
+        found = {}
+        frontier = [package]
+        depth = 0
+
+        while frontier:
+            depth += 1
+            next_frontier = []
+            for name in frontier:
+                for use in self.users(name):
+                    if use.package in found or use.package == package:
+                        continue
+                    use.depth = depth
+                    found[use.package] = use
+                    next_frontier.append(use.package)
+            frontier = next_frontier
+
+        return sorted(found.values(), key=lambda use: (use.depth, use.package))
+
+    def packages(self) -> Dict[str, str]:
+        """Every indexed package and its file relative to the tree."""
+        return {package: path for path, package in self._conn.execute('SELECT path, package FROM files ORDER BY path')}
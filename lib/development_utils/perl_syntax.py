@@ -0,0 +1,173 @@
+"""Parallel, cached 'perl -wc' checking of Perl modules.
+
+Every module is checked with 'perl -wc -I <lib> ... <module>', many at a
+time; the work happens in the perl processes, so a thread per running check
+is enough to keep one perl per CPU busy.
+
+The outcome of a check is cached per module file under a key that hashes
+the perl executable, the -I directories, the module's own content and the
+content of every in-tree module it loads, directly or transitively (see
+perl_dependencies).  A module is therefore only re-checked when it or one
+of its dependencies changed, and editing one module costs one check for it
+plus one for each module that uses it.  Passing and failing results are
+both cached; modules outside the tree (core, CPAN) are not part of the key.
+"""
+import hashlib
+import json
+import logging
+import os
+import pathlib
+import shutil
+import subprocess
+import time
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional
+
+from .perl_dependencies import build_graph, find_modules, transitive_closure
+
+DEFAULT_CACHE_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'perl_syntax', 'results.json')
+
+DEFAULT_MAX_WORKERS = os.cpu_count() or 1
+
+CACHE_VERSION = 1
+
+
+@dataclass
+class SyntaxResult:
+    """Outcome of checking one module."""
+    module: str
+    module_file: str
+    status: str
+    output: str
+    seconds: float = 0.0
+    cached: bool = False
+
+
+def _digest_file(path: str) -> str:
+    with open(path, 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def _perl_identity(perl: str) -> str:
+    """Identify the interpreter by path, size and mtime so an upgrade invalidates the cache."""
+    st = os.stat(perl)
+    return f"{os.path.realpath(perl)}:{st.st_size}:{st.st_mtime_ns}"
+
+
+def cache_keys(modules: Dict[str, str], lib_dirs: List[str], perl: str) -> Dict[str, str]:
+    """Derive the cache key of every module.
+    :param modules: {dict} - package name to module file, as returned by find_modules
+    :param lib_dirs: {list} - the -I directories
+    :param perl: {str} - the perl executable
+    :return keys: {dict} - package name to key
+    """
+    graph = build_graph(modules)
+    digests = {name: _digest_file(path) for name, path in modules.items()}
+    prefix = '\n'.join([_perl_identity(perl)] + lib_dirs)
+
+    keys = {}
+    for name in modules:
+        h = hashlib.sha256(prefix.encode('utf-8'))
+        h.update(f"\n{name}={digests[name]}".encode('utf-8'))
+        for dependency in sorted(transitive_closure(graph, name)):
+            h.update(f"\n{dependency}={digests[dependency]}".encode('utf-8'))
+        keys[name] = h.hexdigest()
+
+    return keys
+
+
+def check_module(module_file: str, lib_dirs: List[str], perl: str = 'perl') -> SyntaxResult:
+    """Run 'perl -wc' on one module.
+    :param module_file: {str} - the .pm file
+    :param lib_dirs: {list} - the -I directories
+    :param perl: {str} - the perl executable
+    :return result: {SyntaxResult} - module is left empty for the caller
+    """
+    args = [perl, '-wc']
+    for lib_dir in lib_dirs:
+        args += ['-I', lib_dir]
+    args.append(module_file)
+
+    start = time.monotonic()
+    p = subprocess.run(args, stdin=subprocess.DEVNULL, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, text=True, errors='replace')
+    seconds = time.monotonic() - start
+
+    # 'perl -c' ends with '<file> syntax OK' on success, as the Perl checker expected.
+    ok = p.returncode == 0 and p.stdout.rstrip().endswith('syntax OK')
+
+    return SyntaxResult(module='', module_file=module_file, status='OK' if ok else 'FAILED', output=p.stdout, seconds=seconds)
+
+
+def load_cache(cache_file: str) -> Dict[str, dict]:
+    """Read the cached results; a missing or incompatible cache is empty."""
+    try:
+        with open(cache_file) as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    if cache.get('version') != CACHE_VERSION:
+        return {}
+    return cache.get('results', {})
+
+
+def save_cache(results: Dict[str, dict], cache_file: str) -> None:
+    pathlib.Path(os.path.dirname(cache_file)).mkdir(parents=True, exist_ok=True)
+    tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as of:
+        json.dump({'version': CACHE_VERSION, 'results': results}, of)
+    os.replace(tmp_file, cache_file)
+
+
+def check_modules(
+    lib_dirs: List[str],
+    cache_file: Optional[str] = DEFAULT_CACHE_FILE,
+    max_workers: int = DEFAULT_MAX_WORKERS,
+    perl: Optional[str] = None,
+    full: bool = False,
+) -> Iterator[SyntaxResult]:
+    """Check every module under the library directories, yielding the results as they complete.
+    Cached results are yielded first; the cache is saved once all checks have finished.
+    :param lib_dirs: {list} - the library directories, also passed to perl as -I
+    :param cache_file: {str} - the results cache; None checks every module
+    :param max_workers: {int} - the number of perl processes run at the same time
+    :param perl: {str} - the perl executable - default is the one on PATH
+    :param full: {bool} - check every module, only refreshing the cache
+    """
+    perl = perl or shutil.which('perl')
+    if perl is None:
+        raise Exception("perl was not found on PATH")
+
+    lib_dirs = [os.path.abspath(lib_dir) for lib_dir in lib_dirs]
+    modules = find_modules(lib_dirs)
+    keys = cache_keys(modules, lib_dirs, perl)
+
+    cached = load_cache(cache_file) if cache_file is not None else {}
+    results = {}
+    pending = []
+
+    for name, module_file in sorted(modules.items()):
+        entry = cached.get(module_file)
+        if not full and entry is not None and entry['key'] == keys[name]:
+            results[module_file] = entry
+            yield SyntaxResult(module=name, module_file=module_file, status=entry['status'], output=entry['output'], cached=True)
+        else:
+            pending.append(name)
+
+    logging.info(f"Reusing '{len(modules) - len(pending)}' cached results and checking '{len(pending)}' modules with '{max_workers}' workers")
+
+    try:
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {executor.submit(check_module, modules[name], lib_dirs, perl): name for name in pending}
+            for future in as_completed(futures):
+                result = future.result()
+                result.module = futures[future]
+                results[result.module_file] = {'key': keys[result.module], 'status': result.status, 'output': result.output}
+                yield result
+    finally:
+        if cache_file is not None:
+            # Modules checked in other trees keep their entries; deleted modules are dropped.
+            cached = {module_file: entry for module_file, entry in cached.items() if os.path.exists(module_file)}
+            cached.update(results)
+            save_cache(cached, cache_file)
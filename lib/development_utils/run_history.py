@@ -0,0 +1,232 @@
+"""Local SQLite history of executed commands and their resource usage.
+
+Every command executed by start_of_day.py, end_of_day.py, create_ssh_key.py
+and prepare_release_steps.py is recorded with its wall time, user/system CPU
+time, peak RSS, output volume and return code.  The history is shared by all
+of the scripts (one database file, WAL journal so that concurrent runs do not
+block each other) and is summarised by util/run_history.py.
+"""
+import logging
+import os
+import pathlib
+import socket
+import sqlite3
+import threading
+import time
+
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+from .command import CommandResult
+
+DEFAULT_HISTORY_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'run_history.sqlite')
+
+# Disable recording by setting DEV_UTILS_RUN_HISTORY=0.
+HISTORY_ENV_VAR = 'DEV_UTILS_RUN_HISTORY'
+
+DEFAULT_REGRESSION_THRESHOLD = 0.25
+
+DAY_SECONDS = 24 * 60 * 60
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    started REAL NOT NULL,
+    host TEXT NOT NULL,
+    script TEXT NOT NULL,
+    step TEXT NOT NULL,
+    cmd TEXT NOT NULL,
+    returncode INTEGER NOT NULL,
+    wall_seconds REAL NOT NULL,
+    user_seconds REAL NOT NULL,
+    system_seconds REAL NOT NULL,
+    max_rss_kb INTEGER NOT NULL,
+    stdout_bytes INTEGER NOT NULL,
+    stderr_bytes INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_script_step_started ON runs (script, step, started);
+'''
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of a list of values.
+    :param values: {list} - need not be sorted
+    :param pct: {float} - between 0 and 100
+    :return: {float}
+    """
+    if not values:
+        raise Exception("percentile of an empty list")
+
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * pct / 100.0
+    lower = int(rank)
+    upper = min(lower + 1, len(ordered) - 1)
+    return ordered[lower] + (ordered[upper] - ordered[lower]) * (rank - lower)
+
+
+@dataclass
+class StepSummary:
+    """Wall-time distribution of one script step over a period."""
+    script: str
+    step: str
+    runs: int
+    failures: int
+    p50: float
+    p95: float
+    max_rss_kb: int
+
+
+@dataclass
+class Regression:
+    """A step whose median wall time grew compared with the baseline period."""
+    script: str
+    step: str
+    baseline_p50: float
+    recent_p50: float
+
+    @property
+    def change(self) -> float:
+        return (self.recent_p50 - self.baseline_p50) / self.baseline_p50 if self.baseline_p50 > 0 else float('inf')
+
+
+class RunHistory:
+    """Record and query command executions for one script."""
+
+    def __init__(self, script: str, history_file: str = DEFAULT_HISTORY_FILE):
+        """Constructor
+        :param script: {str} - the name the runs are recorded under, normally os.path.basename(__file__)
+        :param history_file: {str} - the SQLite database file
+        """
+        self.script = script
+        self.history_file = history_file
+        self.enabled = os.environ.get(HISTORY_ENV_VAR, '1') != '0'
+        self._lock = threading.Lock()
+        self._conn = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            pathlib.Path(os.path.dirname(self.history_file)).mkdir(parents=True, exist_ok=True)
+            self._conn = sqlite3.connect(self.history_file, timeout=10, check_same_thread=False)
+            self._conn.execute('PRAGMA journal_mode=WAL')
+            self._conn.executescript(SCHEMA)
+        return self._conn
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
+
+    def record(self, step: str, result: CommandResult, started: Optional[float] = None) -> None:
+        """Store one command execution; failures to record are logged, never raised.
+        :param step: {str} - the step name, e.g. the INI section or the git sub-command
+        :param result: {CommandResult} - as returned by run_streaming/run_captured
+        :param started: {float} - epoch seconds; derived from the wall time when None
+        """
+        if not self.enabled:
+            return
+
+        if started is None:
+            started = time.time() - result.wall_seconds
+
+        row = (
+            started, socket.gethostname(), self.script, step, result.cmd, result.returncode,
+            result.wall_seconds, result.user_seconds, result.system_seconds, result.max_rss_kb,
+            result.stdout_bytes, result.stderr_bytes,
+        )
+
+        try:
+            with self._lock:
+                conn = self._connect()
+                with conn:
+                    conn.execute(
+                        'INSERT INTO runs (started, host, script, step, cmd, returncode, wall_seconds, user_seconds, '
+                        'system_seconds, max_rss_kb, stdout_bytes, stderr_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                        row,
+                    )
+        except sqlite3.Error as e:
+            logging.warning(f"Could not record step '{step}' in run history '{self.history_file}': {e}")
+            return
+
+        logging.info(
+            f"Step '{step}' took {result.wall_seconds:.2f}s wall, {result.user_seconds:.2f}s user, "
+            f"{result.system_seconds:.2f}s sys, peak RSS {result.max_rss_kb} KiB"
+        )
+
+
+def _query(history_file: str, sql: str, params: tuple) -> List[tuple]:
+    if not os.path.exists(history_file):
+        return []
+    conn = sqlite3.connect(history_file, timeout=10)
+    try:
+        return conn.execute(sql, params).fetchall()
+    finally:
+        conn.close()
+
+
+def _wall_times(history_file: str, since: float, until: float, script: Optional[str]) -> Dict[Tuple[str, str], List[tuple]]:
+    sql = 'SELECT script, step, wall_seconds, returncode, max_rss_kb FROM runs WHERE started >= ? AND started < ?'
+    params = [since, until]
+    if script is not None:
+        sql += ' AND script = ?'
+        params.append(script)
+
+    grouped = {}
+    for row_script, step, wall, returncode, max_rss_kb in _query(history_file, sql, tuple(params)):
+        grouped.setdefault((row_script, step), []).append((wall, returncode, max_rss_kb))
+    return grouped
+
+
+def summarize(history_file: str = DEFAULT_HISTORY_FILE, days: float = 30, script: Optional[str] = None, now: Optional[float] = None) -> List[StepSummary]:
+    """Summarise the wall time of every step over the last days.
+    :return summaries: {list} of StepSummary sorted by script and step
+    """
+    now = time.time() if now is None else now
+    summaries = []
+
+    for (row_script, step), rows in sorted(_wall_times(history_file, now - days * DAY_SECONDS, now, script).items()):
+        walls = [wall for wall, returncode, _ in rows if returncode == 0] or [wall for wall, _, _ in rows]
+        summaries.append(StepSummary(
+            script=row_script,
+            step=step,
+            runs=len(rows),
+            failures=sum(1 for _, returncode, _ in rows if returncode != 0),
+            p50=percentile(walls, 50),
+            p95=percentile(walls, 95),
+            max_rss_kb=max(rss for _, _, rss in rows),
+        ))
+
+    return summaries
+
+
+def find_regressions(
+    history_file: str = DEFAULT_HISTORY_FILE,
+    recent_days: float = 7,
+    baseline_days: float = 28,
+    threshold: float = DEFAULT_REGRESSION_THRESHOLD,
+    script: Optional[str] = None,
+    now: Optional[float] = None,
+) -> List[Regression]:
+    """Compare the median wall time of successful runs in the last recent_days
+    with the baseline_days before that.
+    :param threshold: {float} - the relative slow-down reported, e.g. 0.25 for 25%
+    :return regressions: {list} of Regression, largest slow-down first
+    """
+    now = time.time() if now is None else now
+    boundary = now - recent_days * DAY_SECONDS
+
+    recent = _wall_times(history_file, boundary, now, script)
+    baseline = _wall_times(history_file, boundary - baseline_days * DAY_SECONDS, boundary, script)
+
+    regressions = []
+    for key, rows in recent.items():
+        recent_walls = [wall for wall, returncode, _ in rows if returncode == 0]
+        baseline_walls = [wall for wall, returncode, _ in baseline.get(key, []) if returncode == 0]
+        if not recent_walls or not baseline_walls:
+            continue
+
+        regression = Regression(key[0], key[1], percentile(baseline_walls, 50), percentile(recent_walls, 50))
+        if regression.change > threshold:
+            regressions.append(regression)
+
+    return sorted(regressions, key=lambda r: r.change, reverse=True)
@@ -0,0 +1,385 @@
+"""Concurrent HTTP smoke tests of installed webapp instances.
+
+Instances and their checks are declared in an INI file where each section is
+one instance; values in [DEFAULT] apply to every instance:
+
+    [DEFAULT]
+    checks=/, /login, /api/status
+    expect_status=200
+
+    [prod-1]
+    base_url=http://server1:8080/myapp
+
+    [prod-2]
+    base_url=https://server2/myapp
+    expect_text=Welcome
+    verify_tls=false
+
+Every (instance, check) pair is requested 'repeat' times.  All requests run
+on one asyncio event loop, at most max_concurrency at a time, and at most
+per_host_limit at a time against any one host.  Connections are HTTP/1.1
+keep-alive and are pooled per (scheme, host, port), so the checks of one
+instance, and of instances sharing a server, reuse a few TCP/TLS
+connections instead of paying a handshake per request.  Only the standard
+library is used: the client speaks the small subset of HTTP/1.1 a smoke test
+needs (GET, Content-Length and chunked bodies, no redirects followed).
+
+For every request the time to first byte (request written until the status
+line arrives) and the total latency (including the body) are recorded;
+summarize() reports p50/p95/p99 per check path across instances and overall.
+"""
+import asyncio
+import configparser
+import logging
+import os
+import ssl
+import time
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urljoin, urlsplit
+
+DEFAULT_MAX_CONCURRENCY = 64
+
+DEFAULT_PER_HOST_LIMIT = 8
+
+DEFAULT_TIMEOUT = 10.0
+
+DEFAULT_REPEAT = 1
+
+MAX_BODY_SIZE = 4 * 1024 * 1024
+
+USER_AGENT = 'dev-utils-smoke-test'
+
+PERCENTILES = (50, 95, 99)
+
+
+@dataclass
+class Check:
+    """One URL of one instance and what its response must look like."""
+    instance: str
+    path: str
+    url: str
+    expect_status: Tuple[int, ...] = (200,)
+    expect_text: Optional[str] = None
+    timeout: float = DEFAULT_TIMEOUT
+    repeat: int = DEFAULT_REPEAT
+    verify_tls: bool = True
+
+
+@dataclass
+class CheckResult:
+    """Outcome of one request."""
+    check: Check
+    status: Optional[int] = None
+    ttfb: Optional[float] = None
+    latency: Optional[float] = None
+    bytes: int = 0
+    reused: bool = False
+    error: Optional[str] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+@dataclass
+class LatencySummary:
+    """Percentiles of the successful requests of one check path (or of all of them)."""
+    name: str
+    count: int = 0
+    failures: int = 0
+    ttfb: Dict[int, float] = field(default_factory=dict)
+    latency: Dict[int, float] = field(default_factory=dict)
+    max_latency: float = 0.0
+
+
+def _split_list(value: str) -> List[str]:
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def load_checks(config_file: str) -> List[Check]:
+    """Parse the INI smoke-test configuration file.
+    :param config_file: {str} - one section per instance with base_url and checks
+    :return checks: {list} of Check in declaration order
+    """
+    if not os.path.exists(config_file):
+        raise Exception(f"config file '{config_file}' does not exist")
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(config_file)
+
+    checks = []
+
+    for name in parser.sections():
+        section = parser[name]
+
+        base_url = os.path.expandvars(section.get('base_url', '').strip())
+        if urlsplit(base_url).scheme not in ('http', 'https'):
+            raise Exception(f"instance '{name}' in config file '{config_file}' does not have an http(s) 'base_url'")
+
+        paths = _split_list(section.get('checks', '/'))
+        if not base_url.endswith('/'):
+            base_url += '/'
+
+        for path in paths:
+            checks.append(Check(
+                instance=name,
+                path=path,
+                url=urljoin(base_url, path.lstrip('/')),
+                expect_status=tuple(int(status) for status in _split_list(section.get('expect_status', '200'))),
+                expect_text=section.get('expect_text') or None,
+                timeout=section.getfloat('timeout', DEFAULT_TIMEOUT),
+                repeat=section.getint('repeat', DEFAULT_REPEAT),
+                verify_tls=section.getboolean('verify_tls', True),
+            ))
+
+    logging.info(f"Loaded '{len(checks)}' checks of '{len(parser.sections())}' instances from config file '{config_file}'")
+
+    return checks
+
+
+class _Connection:
+    """One keep-alive connection."""
+
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+        self.used = False
+
+    def close(self) -> None:
+        self.writer.close()
+
+
+class ConnectionPool:
+    """Idle keep-alive connections and a concurrency limit per (scheme, host, port)."""
+
+    def __init__(self, per_host_limit: int = DEFAULT_PER_HOST_LIMIT):
+        self.per_host_limit = per_host_limit
+        self._idle: Dict[tuple, List[_Connection]] = {}
+        self._limits: Dict[tuple, asyncio.Semaphore] = {}
+        self.opened = 0
+
+    def limit(self, key: tuple) -> asyncio.Semaphore:
+        if key not in self._limits:
+            self._limits[key] = asyncio.Semaphore(self.per_host_limit)
+        return self._limits[key]
+
+    async def acquire(self, key: tuple, verify_tls: bool) -> _Connection:
+        idle = self._idle.get(key)
+        while idle:
+            connection = idle.pop()
+            if not connection.reader.at_eof():
+                return connection
+            connection.close()
+
+        scheme, host, port = key
+        context = None
+        if scheme == 'https':
+            context = ssl.create_default_context()
+            if not verify_tls:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+
+        reader, writer = await asyncio.open_connection(host, port, ssl=context, limit=MAX_BODY_SIZE)
+        self.opened += 1
+        return _Connection(reader, writer)
+
+    def release(self, key: tuple, connection: _Connection) -> None:
+        connection.used = True
+        self._idle.setdefault(key, []).append(connection)
+
+    def close(self) -> None:
+        for connections in self._idle.values():
+            for connection in connections:
+                connection.close()
+        self._idle.clear()
+
+
+async def _read_body(reader: asyncio.StreamReader, status: int, headers: Dict[str, str]) -> Tuple[bytes, bool]:
+    """Read the response body; the flag tells whether the connection can be reused."""
+    if status in (204, 304) or 100 <= status < 200:
+        # These responses never have a body, whatever the headers say.
+        return b'', status != 101
+
+    if headers.get('transfer-encoding', '').lower() == 'chunked':
+        chunks = []
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                break
+            chunks.append(await reader.readexactly(size))
+            await reader.readline()
+        return b''.join(chunks), True
+
+    if 'content-length' in headers:
+        return await reader.readexactly(int(headers['content-length'])), True
+
+    # Neither length nor chunking: the body ends when the server closes the connection.
+    body = bytearray()
+    while len(body) < MAX_BODY_SIZE:
+        data = await reader.read(MAX_BODY_SIZE - len(body))
+        if not data:
+            break
+        body += data
+    return bytes(body), False
+
+
+async def _request(connection: _Connection, check: Check, host_header: str, target: str) -> Tuple[CheckResult, bool]:
+    result = CheckResult(check=check, reused=connection.used)
+    start = time.perf_counter()
+
+    connection.writer.write(
+        f"GET {target} HTTP/1.1\r\nHost: {host_header}\r\nUser-Agent: {USER_AGENT}\r\nAccept: */*\r\nConnection: keep-alive\r\n\r\n".encode('latin-1')
+    )
+    await connection.writer.drain()
+
+    while True:
+        status_line = await connection.reader.readline()
+        if not status_line:
+            raise ConnectionResetError('the server closed the connection')
+        if result.ttfb is None:
+            result.ttfb = time.perf_counter() - start
+
+        parts = status_line.decode('latin-1').split(None, 2)
+        if len(parts) < 2 or not parts[0].startswith('HTTP/'):
+            raise Exception(f"invalid status line '{status_line.strip()}'")
+        result.status = int(parts[1])
+
+        headers = {}
+        while True:
+            line = await connection.reader.readline()
+            if line in (b'\r\n', b'\n', b''):
+                break
+            name, _, value = line.decode('latin-1').partition(':')
+            headers[name.strip().lower()] = value.strip()
+
+        # Interim responses (100 Continue, 103 Early Hints) precede the final one.
+        if not 100 <= result.status < 200 or result.status == 101:
+            break
+
+    body, reusable = await _read_body(connection.reader, result.status, headers)
+    result.latency = time.perf_counter() - start
+    result.bytes = len(body)
+
+    keep_alive = reusable and headers.get('connection', '').lower() != 'close' and parts[0] != 'HTTP/1.0'
+
+    if result.status not in check.expect_status:
+        result.error = f"status '{result.status}' is not one of '{', '.join(map(str, check.expect_status))}'"
+    elif check.expect_text and check.expect_text not in body.decode('utf-8', errors='replace'):
+        result.error = f"the response does not contain '{check.expect_text}'"
+
+    return result, keep_alive
+
+
+async def run_check(check: Check, pool: ConnectionPool, global_limit: asyncio.Semaphore) -> CheckResult:
+    """Request one check once, through the pool, within both concurrency limits."""
+    url = urlsplit(check.url)
+    port = url.port or (443 if url.scheme == 'https' else 80)
+    key = (url.scheme, url.hostname, port)
+    target = url.path or '/'
+    if url.query:
+        target += '?' + url.query
+
+    async with global_limit, pool.limit(key):
+        # A pooled connection may have been closed by the server while idle; retry once on a fresh one.
+        for attempt in range(2):
+            connection = None
+            try:
+                connection = await asyncio.wait_for(pool.acquire(key, check.verify_tls), check.timeout)
+                result, keep_alive = await asyncio.wait_for(_request(connection, check, url.netloc, target), check.timeout)
+            except (ConnectionResetError, BrokenPipeError, asyncio.IncompleteReadError) as e:
+                if connection is not None:
+                    connection.close()
+                if attempt == 0 and connection is not None and connection.used:
+                    continue
+                return CheckResult(check=check, error=f"{type(e).__name__}: {e}")
+            except asyncio.TimeoutError:
+                if connection is not None:
+                    connection.close()
+                return CheckResult(check=check, error=f"timed out after '{check.timeout}' seconds")
+            except Exception as e:
+                if connection is not None:
+                    connection.close()
+                return CheckResult(check=check, error=f"{type(e).__name__}: {e}")
+
+            if keep_alive:
+                pool.release(key, connection)
+            else:
+                connection.close()
+            return result
+
+
+async def run_checks_async(
+    checks: List[Check],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+) -> Tuple[List[CheckResult], Dict[str, float]]:
+    """Run every check 'repeat' times concurrently.
+    :return results, stats: {tuple} - one CheckResult per request, and connection and timing counts
+    """
+    start = time.perf_counter()
+    pool = ConnectionPool(per_host_limit=per_host_limit)
+    global_limit = asyncio.Semaphore(max_concurrency)
+
+    try:
+        results = await asyncio.gather(*(
+            run_check(check, pool, global_limit)
+            for check in checks
+            for _ in range(check.repeat)
+        ))
+    finally:
+        pool.close()
+
+    stats = {
+        'requests': len(results),
+        'connections': pool.opened,
+        'reused': sum(1 for result in results if result.reused),
+        'seconds': time.perf_counter() - start,
+    }
+
+    logging.info(f"Ran '{stats['requests']}' requests over '{stats['connections']}' connections in '{stats['seconds']:.3f}' seconds")
+
+    return results, stats
+
+
+def run_checks(
+    checks: List[Check],
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    per_host_limit: int = DEFAULT_PER_HOST_LIMIT,
+) -> Tuple[List[CheckResult], Dict[str, float]]:
+    """Synchronous entry point for run_checks_async()."""
+    return asyncio.run(run_checks_async(checks, max_concurrency=max_concurrency, per_host_limit=per_host_limit))
+
+
+def percentile(values: List[float], p: int) -> float:
+    """Nearest-rank percentile of a sorted list."""
+    if not values:
+        return 0.0
+    rank = max(1, -(-p * len(values) // 100))
+    return values[rank - 1]
+
+
+def _summary(name: str, results: List[CheckResult]) -> LatencySummary:
+    ok = [result for result in results if result.ok]
+    ttfb = sorted(result.ttfb for result in ok)
+    latency = sorted(result.latency for result in ok)
+    return LatencySummary(
+        name=name,
+        count=len(results),
+        failures=len(results) - len(ok),
+        ttfb={p: percentile(ttfb, p) for p in PERCENTILES},
+        latency={p: percentile(latency, p) for p in PERCENTILES},
+        max_latency=latency[-1] if latency else 0.0,
+    )
+
+
+def summarize(results: List[CheckResult]) -> List[LatencySummary]:
+    """Latency percentiles per check path across instances, followed by the overall summary."""
+    by_path: Dict[str, List[CheckResult]] = {}
+    for result in results:
+        by_path.setdefault(result.check.path, []).append(result)
+
+    return [_summary(path, by_path[path]) for path in by_path] + [_summary('(all)', results)]
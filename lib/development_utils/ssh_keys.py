@@ -0,0 +1,191 @@
+"""Batch generation of ed25519 SSH key pairs.
+
+Each key is generated by one 'ssh-keygen' execution (an argument list, no
+shell) into a scratch directory; identities are processed concurrently on a
+thread pool, so a batch costs about as long as its slowest few keys rather
+than the sum of them.  The key pair is then written to temporary files in
+the destination directory with the final permissions (0600 private, 0644
+public) and hard-linked into place, so a key file is either complete or
+absent and an existing key is never overwritten.
+"""
+import base64
+import csv
+import hashlib
+import logging
+import os
+import re
+import subprocess
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import List, Optional
+
+DEFAULT_SSH_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.ssh')
+
+DEFAULT_MAX_WORKERS = 8
+
+BATCH_COLUMNS = ('email_address', 'name')
+
+KEY_PREFIX = 'id_ed25519_'
+
+
+@dataclass
+class KeyResult:
+    """Outcome of generating the key pair for one identity."""
+    email_address: str
+    name: str
+    private_key_file: str
+    public_key: Optional[str] = None
+    fingerprint: Optional[str] = None
+    status: str = 'PENDING'
+    error: Optional[str] = None
+
+
+def key_basename(email_address: str) -> str:
+    """Derive the key file name from the email address, as create_ssh_key.py always has."""
+    return KEY_PREFIX + email_address.split('@')[0].replace('.', '_')
+
+
+def fingerprint(public_key: str) -> str:
+    """Return the OpenSSH SHA256 fingerprint of a 'type base64 [comment]' public key line."""
+    blob = base64.b64decode(public_key.split()[1])
+    return 'SHA256:' + base64.b64encode(hashlib.sha256(blob).digest()).decode('ascii').rstrip('=')
+
+
+def read_identities(batch_file: str) -> List[dict]:
+    """Parse the batch CSV file
+    :param batch_file: {str} - CSV file with header email_address,name
+    :return rows: {list} of dict
+    """
+    rows = []
+
+    with open(batch_file, newline='') as f:
+        reader = csv.DictReader(f)
+        missing = [column for column in BATCH_COLUMNS if column not in (reader.fieldnames or [])]
+        if missing:
+            raise Exception(f"batch file '{batch_file}' is missing column(s): {', '.join(missing)}")
+
+        seen = {}
+        for line_number, row in enumerate(reader, start=2):
+            row = {column: (row.get(column) or '').strip() for column in BATCH_COLUMNS}
+            if row['email_address'] == '':
+                continue
+            if not re.match(r'^[^@\s]+@[^@\s]+$', row['email_address']):
+                raise Exception(f"invalid email address '{row['email_address']}' on line '{line_number}' of '{batch_file}'")
+
+            basename = key_basename(row['email_address'])
+            if basename in seen:
+                raise Exception(f"line '{line_number}' of '{batch_file}' maps to key '{basename}' like line '{seen[basename]}'")
+            seen[basename] = line_number
+
+            rows.append(row)
+
+    logging.info(f"Read '{len(rows)}' identities from batch file '{batch_file}'")
+
+    return rows
+
+
+def _generate_with_ssh_keygen(comment: str, scratch_dir: str):
+    key_file = os.path.join(scratch_dir, 'key')
+    p = subprocess.run(
+        ['ssh-keygen', '-q', '-t', 'ed25519', '-N', '', '-C', comment, '-f', key_file],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    if p.returncode != 0:
+        raise Exception(f"ssh-keygen received status '{p.returncode}': {p.stderr.strip()}")
+
+    with open(key_file, 'rb') as f:
+        private_bytes = f.read()
+    with open(key_file + '.pub', 'rb') as f:
+        public_bytes = f.read()
+
+    return private_bytes, public_bytes
+
+
+def _write_new_file(path: str, data: bytes, mode: int) -> None:
+    """Create path atomically with mode; fails if it already exists."""
+    directory = os.path.dirname(path)
+    fd, tmp_file = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', dir=directory)
+    try:
+        os.fchmod(fd, mode)
+        with os.fdopen(fd, 'wb') as of:
+            of.write(data)
+            of.flush()
+            os.fsync(of.fileno())
+        os.link(tmp_file, path)
+    finally:
+        os.unlink(tmp_file)
+
+
+def generate_key(email_address: str, name: str = '', ssh_dir: str = DEFAULT_SSH_DIR) -> KeyResult:
+    """Generate one unencrypted ed25519 key pair named after the email address.
+    :param email_address: {str} - used for the file name and the key comment
+    :param name: {str} - the identity's name, reported only
+    :param ssh_dir: {str} - the directory the key pair is written to
+    :return result: {KeyResult}
+    """
+    private_key_file = os.path.join(ssh_dir, key_basename(email_address))
+    result = KeyResult(email_address=email_address, name=name, private_key_file=private_key_file)
+
+    try:
+        for path in (private_key_file, private_key_file + '.pub'):
+            if os.path.exists(path):
+                raise Exception(f"'{path}' already exists")
+
+        with tempfile.TemporaryDirectory(dir=ssh_dir) as scratch_dir:
+            private_bytes, public_bytes = _generate_with_ssh_keygen(email_address, scratch_dir)
+
+        _write_new_file(private_key_file, private_bytes, 0o600)
+        try:
+            _write_new_file(private_key_file + '.pub', public_bytes, 0o644)
+        except Exception:
+            os.unlink(private_key_file)
+            raise
+
+        result.public_key = public_bytes.decode('ascii').strip()
+        result.fingerprint = fingerprint(result.public_key)
+        result.status = 'OK'
+        logging.info(f"Generated key '{private_key_file}' ({result.fingerprint}) for '{email_address}'")
+    except Exception as e:
+        result.status = 'FAILED'
+        result.error = str(e)
+        logging.error(f"Could not generate a key for '{email_address}': {e}")
+
+    return result
+
+
+def generate_keys(identities: List[dict], ssh_dir: str = DEFAULT_SSH_DIR, max_workers: int = DEFAULT_MAX_WORKERS) -> List[KeyResult]:
+    """Generate the key pairs for several identities concurrently.
+    :param identities: {list} - dicts with email_address and name, as returned by read_identities
+    :param ssh_dir: {str} - the directory the key pairs are written to
+    :param max_workers: {int} - the number of worker threads
+    :return results: {list} of KeyResult in the order of identities
+    """
+    os.makedirs(ssh_dir, mode=0o700, exist_ok=True)
+
+    logging.info(f"Generating '{len(identities)}' keys with ssh-keygen using '{max_workers}' workers")
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        return list(executor.map(
+            lambda identity: generate_key(identity['email_address'], identity.get('name', ''), ssh_dir),
+            identities,
+        ))
+
+
+def write_key_report(results: List[KeyResult], report_file: str, authorized_keys_file: Optional[str] = None) -> None:
+    """Write the consolidated public-key report (and optionally all public keys in authorized_keys format)."""
+    with open(report_file, 'w') as of:
+        of.write("status\temail_address\tname\tprivate_key_file\tfingerprint\tpublic_key_or_error\n")
+        for r in results:
+            detail = r.public_key if r.status == 'OK' else r.error
+            of.write(f"{r.status}\t{r.email_address}\t{r.name}\t{r.private_key_file}\t{r.fingerprint or ''}\t{detail}\n")
+
+    if authorized_keys_file is not None:
+        with open(authorized_keys_file, 'w') as of:
+            for r in results:
+                if r.status == 'OK':
+                    of.write(r.public_key + '\n')
@@ -0,0 +1,100 @@
+"""Fast start-up helpers shared by the Python entry points.
+
+lazy_import() defers the real import of a module until one of its attributes
+is first accessed, so scripts only pay for the modules a given run uses.
+render_banner() caches rendered pyfiglet banners on disk keyed by text and
+font, so pyfiglet (and its font files) is only loaded the first time a banner
+is shown.
+"""
+import hashlib
+import importlib.util
+import logging
+import os
+import pathlib
+import sys
+
+DEFAULT_BANNER_CACHE_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'banners')
+
+DEFAULT_BANNER_FONT = 'standard'
+
+
+def lazy_import(name: str):
+    """Return a module whose import is deferred until first attribute access.
+    :param name: {str} - the fully qualified module name
+    :return module: {module}
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ImportError(f"No module named '{name}'")
+
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+
+    return module
+
+
+def _banner_cache_file(text: str, font: str, cache_dir: str) -> str:
+    key = hashlib.sha1(f"{font}\0{text}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, f"{key}.txt")
+
+
+def render_banner(text: str, font: str = DEFAULT_BANNER_FONT, cache_dir: str = DEFAULT_BANNER_CACHE_DIR) -> str:
+    """Return the figlet rendering of text, using the on-disk cache when possible.
+    :param text: {str} - the banner text
+    :param font: {str} - the pyfiglet font name
+    :param cache_dir: {str} - the directory rendered banners are cached in
+    :return banner: {str}
+    """
+    cache_file = _banner_cache_file(text, font, cache_dir)
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return f.read()
+    except OSError:
+        pass
+
+    import pyfiglet
+
+    banner = pyfiglet.figlet_format(text, font=font)
+
+    try:
+        pathlib.Path(cache_dir).mkdir(parents=True, exist_ok=True)
+        tmp_file = f"{cache_file}.{os.getpid()}.tmp"
+        with open(tmp_file, 'w', encoding='utf-8') as of:
+            of.write(banner)
+        os.replace(tmp_file, cache_file)
+    except OSError as e:
+        logging.warning(f"Could not cache banner in '{cache_file}': {e}")
+
+    return banner
+
+
+def measure_import_times(argv):
+    """Run a Python command under -X importtime and collect the per-module cost.
+    :param argv: {list} - the arguments passed to the interpreter, e.g. [script, '--help']
+    :return records: {list} - (module, self_us, cumulative_us, depth) in import order
+    """
+    import subprocess
+
+    p = subprocess.run(
+        [sys.executable, '-X', 'importtime'] + list(argv),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+
+    records = []
+    for line in p.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|', 2)
+        depth = (len(name) - len(name.lstrip(' ')) - 1) // 2
+        records.append((name.strip(), int(self_us), int(cumulative_us), depth))
+
+    return records
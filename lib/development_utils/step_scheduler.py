@@ -0,0 +1,212 @@
+"""Dependency-aware parallel step scheduler.
+
+Steps are declared in an INI file where each section is one step:
+
+    [install_pycharm_live_template]
+    cmd=bash ${HOME}/pycharm-utils/util/install_pycharm_live_template.sh
+
+    [get_aws_access_keys]
+    cmd=bash ${HOME}/aws-sso-utils/get_access_keys.sh
+    after=install_pycharm_live_template
+
+Steps whose 'after' dependencies have all succeeded are executed concurrently
+on a bounded worker pool.  When a step fails, only the steps that depend on it
+(directly or transitively) are skipped; independent branches keep running.
+"""
+import configparser
+import logging
+import os
+import threading
+import time
+
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional
+
+DEFAULT_MAX_WORKERS = 4
+
+STATUS_PENDING = 'PENDING'
+STATUS_RUNNING = 'RUNNING'
+STATUS_SUCCEEDED = 'SUCCEEDED'
+STATUS_FAILED = 'FAILED'
+STATUS_SKIPPED = 'SKIPPED'
+
+
+@dataclass
+class Step:
+    """A single named command with its upstream dependencies."""
+    name: str
+    cmd: str
+    after: List[str] = field(default_factory=list)
+    status: str = STATUS_PENDING
+    duration: float = 0.0
+    error: Optional[str] = None
+
+
+def load_steps(config_file: str) -> Dict[str, Step]:
+    """Parse the INI step configuration file.
+    :param config_file: {str} - the INI file declaring the steps
+    :return steps: {dict} - step name to Step, in declaration order
+    """
+    if config_file is None:
+        raise Exception("config_file was not defined")
+
+    if not os.path.exists(config_file):
+        raise Exception(f"config file '{config_file}' does not exist")
+
+    parser = configparser.ConfigParser(interpolation=None)
+    parser.read(config_file)
+
+    steps = {}
+
+    for name in parser.sections():
+        section = parser[name]
+
+        cmd = section.get('cmd', '').strip()
+        if cmd == '':
+            raise Exception(f"step '{name}' in config file '{config_file}' does not have a 'cmd'")
+
+        after = [dep.strip() for dep in section.get('after', '').split(',') if dep.strip() != '']
+
+        steps[name] = Step(name=name, cmd=os.path.expandvars(cmd), after=after)
+
+    logging.info(f"Loaded '{len(steps)}' steps from config file '{config_file}'")
+
+    _validate_steps(steps)
+
+    return steps
+
+
+def _validate_steps(steps: Dict[str, Step]) -> None:
+    """Ensure every dependency exists and that there are no cycles.
+    :param steps: {dict} - step name to Step
+    """
+    for step in steps.values():
+        for dep in step.after:
+            if dep not in steps:
+                raise Exception(f"step '{step.name}' depends on unknown step '{dep}'")
+
+    visiting = set()
+    visited = set()
+
+    def visit(name: str, path: List[str]) -> None:
+        if name in visited:
+            return
+        if name in visiting:
+            raise Exception(f"dependency cycle detected: {' -> '.join(path + [name])}")
+        visiting.add(name)
+        for dep in steps[name].after:
+            visit(dep, path + [name])
+        visiting.remove(name)
+        visited.add(name)
+
+    for name in steps:
+        visit(name, [])
+
+
+def _print_status(step: Step) -> None:
+    """Default status reporter: one line per status transition.
+    :param step: {Step} - the step whose status changed
+    """
+    if step.status in (STATUS_SUCCEEDED, STATUS_FAILED):
+        print(f"[{step.status}] {step.name} ({step.duration:.1f}s)")
+    else:
+        print(f"[{step.status}] {step.name}")
+
+
+class StepScheduler:
+    """Execute a DAG of steps on a bounded worker pool."""
+
+    def __init__(
+        self,
+        steps: Dict[str, Step],
+        execute: Callable[[Step], None],
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        reporter: Callable[[Step], None] = _print_status,
+    ):
+        """Constructor
+        :param steps: {dict} - step name to Step, as returned by load_steps()
+        :param execute: {callable} - invoked with each Step; must raise on failure
+        :param max_workers: {int} - the maximum number of steps to run at the same time
+        :param reporter: {callable} - invoked with a Step on every status change
+        """
+        if max_workers is None or max_workers < 1:
+            raise Exception(f"max_workers must be a positive integer, got '{max_workers}'")
+
+        self.steps = steps
+        self.execute = execute
+        self.max_workers = max_workers
+        self.reporter = reporter
+        self._lock = threading.Lock()
+
+        self._dependents = {name: [] for name in steps}
+        for step in steps.values():
+            for dep in step.after:
+                self._dependents[dep].append(step.name)
+
+    def _set_status(self, step: Step, status: str) -> None:
+        with self._lock:
+            step.status = status
+            logging.info(f"Step '{step.name}' is now '{status}'")
+            self.reporter(step)
+
+    def _run_step(self, step: Step) -> None:
+        self._set_status(step, STATUS_RUNNING)
+        start = time.monotonic()
+        try:
+            self.execute(step)
+        except Exception as e:
+            step.duration = time.monotonic() - start
+            step.error = str(e)
+            logging.error(f"Step '{step.name}' failed: {e}")
+            self._set_status(step, STATUS_FAILED)
+            return
+        step.duration = time.monotonic() - start
+        self._set_status(step, STATUS_SUCCEEDED)
+
+    def _skip_dependents(self, name: str) -> None:
+        """Mark every transitive dependent of a failed or skipped step as skipped."""
+        for dependent in self._dependents[name]:
+            step = self.steps[dependent]
+            if step.status == STATUS_PENDING:
+                step.error = f"upstream step '{name}' did not succeed"
+                self._set_status(step, STATUS_SKIPPED)
+                self._skip_dependents(dependent)
+
+    def _ready_steps(self) -> List[Step]:
+        return [
+            step for step in self.steps.values()
+            if step.status == STATUS_PENDING
+            and all(self.steps[dep].status == STATUS_SUCCEEDED for dep in step.after)
+        ]
+
+    def run(self) -> bool:
+        """Run all steps, respecting dependencies.
+        :return: {bool} - True if every step succeeded
+        """
+        start = time.monotonic()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            in_flight = {}
+
+            while True:
+                for step in self._ready_steps():
+                    # Claim the step before handing it to the pool so that it is
+                    # not submitted twice while still waiting for a free worker.
+                    step.status = STATUS_RUNNING
+                    in_flight[executor.submit(self._run_step, step)] = step
+
+                if not in_flight:
+                    break
+
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+
+                for future in done:
+                    step = in_flight.pop(future)
+                    future.result()
+                    if step.status == STATUS_FAILED:
+                        self._skip_dependents(step.name)
+
+        logging.info(f"Executed '{len(self.steps)}' steps in '{time.monotonic() - start:.1f}' seconds")
+
+        return all(step.status == STATUS_SUCCEEDED for step in self.steps.values())
@@ -0,0 +1,38 @@
+import importlib.util
+import os
+import subprocess
+import sys
+
+import pytest
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+sys.path.insert(0, os.path.join(REPO_DIR, 'lib'))
+
+
+def load_script(relpath: str):
+    """Import a script from the repository by path without running its main()."""
+    path = os.path.join(REPO_DIR, relpath)
+    name = '_test_' + os.path.splitext(os.path.basename(path))[0]
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture(autouse=True)
+def isolated_home(tmp_path, monkeypatch):
+    """Keep caches, queues and git configuration of the tests out of the real home directory."""
+    home = tmp_path / 'home'
+    home.mkdir()
+    monkeypatch.setenv('HOME', str(home))
+    monkeypatch.setenv('GIT_CONFIG_NOSYSTEM', '1')
+    for variable in ('GIT_AUTHOR_NAME', 'GIT_COMMITTER_NAME'):
+        monkeypatch.setenv(variable, 'dev-utils tests')
+    for variable in ('GIT_AUTHOR_EMAIL', 'GIT_COMMITTER_EMAIL'):
+        monkeypatch.setenv(variable, 'dev-utils-tests@example.com')
+    return home
+
+
+def run_git(*args: str, cwd: str = None) -> str:
+    return subprocess.run(['git'] + list(args), cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, check=True).stdout
@@ -0,0 +1,115 @@
+import os
+
+import pytest
+
+from click.testing import CliRunner
+
+from conftest import load_script
+from development_utils.asset_transfer import LocalBackend, SshBackend, read_asset_list, transfer
+
+
+def _write(path, content):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as of:
+        of.write(content)
+
+
+def _project(tmp_path):
+    indir = tmp_path / 'project'
+    _write(str(indir / 'lib' / 'a.pm'), 'package A;\n1;\n')
+    _write(str(indir / 'lib' / 'sub' / 'b.pm'), 'package B;\n1;\n')
+    _write(str(indir / 'bin' / 'run.pl'), 'print "run";\n')
+    return str(indir)
+
+
+def test_read_asset_list_skips_comments_and_accepts_git_status_lines(tmp_path):
+    asset_list_file = tmp_path / 'assets.txt'
+    asset_list_file.write_text('# assets\n\nlib/a.pm\n  modified:   bin/run.pl\nlib/a.pm\n')
+
+    assert read_asset_list(str(asset_list_file)) == ['lib/a.pm', 'bin/run.pl']
+
+
+def test_transfer_sends_new_files_and_skips_unchanged_ones(tmp_path):
+    indir = _project(tmp_path)
+    target = tmp_path / 'target'
+
+    result = transfer(indir, ['lib', 'bin/run.pl'], LocalBackend(str(target)), batch_files=1)
+
+    assert result.errors == []
+    assert sorted(result.sent) == ['bin/run.pl', 'lib/a.pm', 'lib/sub/b.pm']
+    assert result.batches == 3
+    assert (target / 'lib' / 'sub' / 'b.pm').read_text() == 'package B;\n1;\n'
+
+    again = transfer(indir, ['lib', 'bin/run.pl'], LocalBackend(str(target)))
+
+    assert again.sent == []
+    assert again.batches == 0
+    assert len(again.skipped) == 3
+
+
+def test_checksum_comparison_detects_content_changes_stat_misses(tmp_path):
+    indir = _project(tmp_path)
+    target = tmp_path / 'target'
+    transfer(indir, ['lib/a.pm'], LocalBackend(str(target)))
+
+    # Same size and mtime, different content.
+    target_file = str(target / 'lib' / 'a.pm')
+    st = os.stat(target_file)
+    _write(target_file, 'package Z;\n1;\n')
+    os.utime(target_file, ns=(st.st_atime_ns, st.st_mtime_ns))
+
+    assert transfer(indir, ['lib/a.pm'], LocalBackend(str(target)), compare='stat').sent == []
+    assert transfer(indir, ['lib/a.pm'], LocalBackend(str(target)), compare='checksum').sent == ['lib/a.pm']
+    assert open(target_file).read() == 'package A;\n1;\n'
+
+
+def test_backup_keeps_a_copy_of_overwritten_files(tmp_path):
+    indir = _project(tmp_path)
+    target = tmp_path / 'target'
+    _write(str(target / 'lib' / 'a.pm'), 'old\n')
+
+    result = transfer(indir, ['lib/a.pm'], LocalBackend(str(target)), backup=True)
+
+    assert result.backed_up == 1
+    backups = [name for name in os.listdir(str(target / 'lib')) if name.endswith('.bak')]
+    assert len(backups) == 1
+    assert (target / 'lib' / backups[0]).read_text() == 'old\n'
+    assert (target / 'lib' / 'a.pm').read_text() == 'package A;\n1;\n'
+
+
+class ChattyBackend(LocalBackend):
+    """Writes far more than a pipe buffer to stderr before it reads the stream.
+
+    timeout ends the command if the stream is never read, so a deadlock fails the test instead of hanging it.
+    """
+
+    def extract_argv(self):
+        return ['timeout', '20', 'sh', '-c', f"head -c 300000 /dev/zero >&2; exec tar -x -f - -C '{self.target_dir}'"]
+
+
+def test_chatty_extractor_does_not_deadlock(tmp_path):
+    indir = _project(tmp_path)
+    target = tmp_path / 'target'
+
+    result = transfer(indir, ['lib'], ChattyBackend(str(target)))
+
+    assert result.errors == []
+    assert sorted(result.sent) == ['lib/a.pm', 'lib/sub/b.pm']
+
+
+def test_remote_checksums_are_limited_to_the_coreutils_programs(tmp_path):
+    script = load_script(os.path.join('util', 'scp_assets_by_list_file.py'))
+    indir = _project(tmp_path)
+    asset_list_file = tmp_path / 'assets.txt'
+    asset_list_file.write_text('lib/a.pm\n')
+
+    result = CliRunner().invoke(script.main, [
+        '--asset_list_file', str(asset_list_file), '--indir', indir, '--outdir', str(tmp_path / 'out'),
+        '--target', 'deploy@server1:/opt/app', '--compare', 'checksum', '--algorithm', 'sha3_256',
+    ])
+
+    assert result.exit_code == 1
+    assert "--algorithm 'sha3_256' cannot be computed on 'deploy@server1:/opt/app'" in result.output
+
+    with pytest.raises(Exception, match="checksum algorithm 'sha3_256' cannot be computed on 'server1'"):
+        SshBackend('server1', '/opt/app').state(['lib/a.pm'], 'sha3_256')
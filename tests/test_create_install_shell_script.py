@@ -0,0 +1,42 @@
+import subprocess
+
+from conftest import load_script
+
+script = load_script('util/create_install_shell_script.py')
+
+
+def test_only_bare_shell_state_lines_are_rerun(tmp_path):
+    infile = tmp_path / 'commands.txt'
+    infile.write_text('cd /tmp\nexport FOO=1\nsource ~/install_tree.sh\n. ~/install_tree.sh\ncd build && make\nexport A=1; make\nls | wc -l\n')
+
+    kinds = [(step['kind'], step['cmd']) for step in script.parse_steps(str(infile))]
+
+    assert kinds == [
+        ('shell', 'cd /tmp'),
+        ('shell', 'export FOO=1'),
+        ('step', 'source ~/install_tree.sh'),
+        ('step', '. ~/install_tree.sh'),
+        ('step', 'cd build && make'),
+        ('step', 'export A=1; make'),
+        ('step', 'ls | wc -l'),
+    ]
+
+
+def test_sourced_and_compound_lines_run_once_and_not_in_a_dry_run(tmp_path):
+    log_file = tmp_path / 'side_effects.log'
+    sourced = tmp_path / 'install.sh'
+    sourced.write_text(f"echo sourced >> '{log_file}'\n")
+    infile = tmp_path / 'commands.txt'
+    infile.write_text(f"mkdir -p build\ncd build\n. '{sourced}'\ncd .. && echo compound >> '{log_file}'\n")
+    outfile = tmp_path / 'install.sh.out'
+    script.write_script(script.parse_steps(str(infile)), str(outfile))
+
+    def run(*args):
+        subprocess.run(['sh', str(outfile)] + list(args), cwd=str(tmp_path), stdout=subprocess.DEVNULL, check=True)
+
+    run('--dry-run')
+    assert not log_file.exists()
+
+    run()
+    run()
+    assert log_file.read_text() == 'sourced\ncompound\n'
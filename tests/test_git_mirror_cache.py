@@ -0,0 +1,85 @@
+import os
+
+import pytest
+
+from conftest import load_script, run_git
+from development_utils.git_mirror_cache import GitMirrorCache
+
+
+@pytest.fixture
+def origin(tmp_path):
+    """A bare repository with master, devel and release/v1.0.0 branches."""
+    seed = str(tmp_path / 'seed')
+    bare = str(tmp_path / 'origin.git')
+    run_git('init', '--quiet', '-b', 'master', seed)
+    with open(os.path.join(seed, 'README'), 'w') as of:
+        of.write('first\n')
+    run_git('add', 'README', cwd=seed)
+    run_git('commit', '--quiet', '-m', 'first', cwd=seed)
+    run_git('branch', 'devel', cwd=seed)
+    run_git('checkout', '--quiet', '-b', 'release/v1.0.0', cwd=seed)
+    with open(os.path.join(seed, 'README'), 'a') as of:
+        of.write('release\n')
+    run_git('commit', '--quiet', '-am', 'release', cwd=seed)
+    run_git('checkout', '--quiet', 'master', cwd=seed)
+    run_git('clone', '--quiet', '--bare', seed, bare)
+    return bare
+
+
+def _push_commit(origin: str, tmp_path, branch: str, message: str) -> str:
+    work = str(tmp_path / f"work-{message}")
+    run_git('clone', '--quiet', '-b', branch, origin, work)
+    run_git('commit', '--quiet', '--allow-empty', '-m', message, cwd=work)
+    run_git('push', '--quiet', 'origin', branch, cwd=work)
+    return run_git('rev-parse', 'HEAD', cwd=work).strip()
+
+
+def test_clone_uses_a_dissociated_mirror(origin, tmp_path):
+    cache = GitMirrorCache(str(tmp_path / 'mirrors'))
+    dest = cache.clone(origin, str(tmp_path / 'checkout'))
+
+    assert os.path.isdir(cache.mirror_path(origin))
+    assert run_git('remote', 'get-url', 'origin', cwd=dest).strip() == origin
+    assert not os.path.exists(os.path.join(dest, '.git', 'objects', 'info', 'alternates'))
+    run_git('fsck', cwd=dest)
+
+
+def test_update_fetches_changed_and_drops_deleted_refs(origin, tmp_path):
+    cache = GitMirrorCache(str(tmp_path / 'mirrors'))
+    mirror = cache.update(origin)
+
+    head = _push_commit(origin, tmp_path, 'devel', 'second')
+    run_git('branch', '-D', 'release/v1.0.0', cwd=origin)
+
+    assert cache.update(origin) == mirror
+    assert run_git('rev-parse', 'refs/heads/devel', cwd=mirror).strip() == head
+    assert 'refs/heads/release/v1.0.0' not in run_git('show-ref', cwd=mirror)
+
+
+def test_clone_refuses_an_existing_destination(origin, tmp_path):
+    dest = tmp_path / 'checkout'
+    dest.mkdir()
+    with pytest.raises(Exception, match='already exists'):
+        GitMirrorCache(str(tmp_path / 'mirrors')).clone(origin, str(dest))
+
+
+def test_execute_release_merges_tags_and_pushes(origin, tmp_path):
+    script = load_script(os.path.join('bin', 'prepare_release_steps.py'))
+    cache = GitMirrorCache(str(tmp_path / 'mirrors'))
+
+    checkout = script.execute_release('code-base', origin, 'v1.0.0', 'ABC-1', str(tmp_path / 'release'), cache)
+
+    assert checkout == str(tmp_path / 'release' / 'code-base')
+    assert 'v1.0.0' in run_git('tag', '-l', cwd=origin).split()
+    release = run_git('rev-parse', 'refs/heads/release/v1.0.0', cwd=origin).strip()
+    # The steps push the branch they finish on (master) and the tag; devel is merged in the checkout.
+    run_git('merge-base', '--is-ancestor', release, 'refs/heads/master', cwd=origin)
+    run_git('merge-base', '--is-ancestor', release, 'refs/heads/devel', cwd=checkout)
+
+
+def test_execute_release_rejects_an_existing_tag(origin, tmp_path):
+    script = load_script(os.path.join('bin', 'prepare_release_steps.py'))
+    run_git('tag', 'v1.0.0', 'refs/heads/release/v1.0.0', cwd=origin)
+
+    with pytest.raises(Exception, match="tag 'v1.0.0' already exists"):
+        script.execute_release('code-base', origin, 'v1.0.0', 'ABC-1', str(tmp_path / 'release'), GitMirrorCache(str(tmp_path / 'mirrors')))
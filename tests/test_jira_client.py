@@ -0,0 +1,176 @@
+import json
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from development_utils import jira_client
+from development_utils.jira_client import STATUS_FAILED, JiraClient, UpdateQueue, flush, load_jira_config
+
+
+class MockJiraHandler(BaseHTTPRequestHandler):
+    """Answers from the server's scripted responses and records every request."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _answer(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        payload = json.loads(self.rfile.read(length)) if length else None
+        self.server.requests.append((self.command, self.path, payload))
+
+        scripted = self.server.responses.get((self.command, self.path))
+        if scripted:
+            status, content_type, body = scripted.pop(0)
+        elif self.path.endswith('/transitions') and self.command == 'GET':
+            status, content_type, body = 200, 'application/json', json.dumps({'transitions': [{'id': '31', 'name': 'Done'}]})
+        else:
+            status, content_type, body = 201, 'application/json', '{}'
+
+        body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    do_GET = _answer
+    do_POST = _answer
+
+
+@pytest.fixture
+def jira():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), MockJiraHandler)
+    server.requests = []
+    server.responses = {}
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def client(jira):
+    client = JiraClient(f"http://127.0.0.1:{jira.server_address[1]}", username='user', password='secret', max_connections=2, timeout=5)
+    yield client
+    client.close()
+
+
+@pytest.fixture
+def update_queue(tmp_path):
+    with UpdateQueue(str(tmp_path / 'jira_queue.sqlite')) as update_queue:
+        yield update_queue
+
+
+def _comment_path(issue):
+    return f"/rest/api/2/issue/{issue}/comment"
+
+
+def test_comments_are_sent_over_pooled_connections(jira, client, update_queue):
+    for i in range(6):
+        update_queue.enqueue(f"ABC-{i % 3}", 'comment', f"commit {i}")
+
+    stats = flush(update_queue, client)
+
+    assert (stats['due'], stats['sent'], stats['retrying'], stats['failed']) == (6, 6, 0, 0)
+    assert update_queue.updates() == []
+    assert sorted(payload['body'] for _, _, payload in jira.requests) == [f"commit {i}" for i in range(6)]
+    assert client.connections_opened <= 2
+
+
+def test_a_2xx_body_that_is_not_json_counts_as_sent(jira, client, update_queue):
+    jira.responses[('POST', _comment_path('ABC-1'))] = [(200, 'text/html', '<html>Signed in</html>')]
+    update_queue.enqueue('ABC-1', 'comment', 'released')
+
+    assert flush(update_queue, client)['sent'] == 1
+    assert flush(update_queue, client)['due'] == 0
+    assert len(jira.requests) == 1
+
+
+def test_transient_errors_are_retried_until_drained(jira, client, update_queue, monkeypatch):
+    monkeypatch.setattr(jira_client, 'BACKOFF_BASE', 0.05)
+    jira.responses[('POST', _comment_path('ABC-1'))] = [(503, 'text/plain', 'maintenance'), (502, 'text/plain', 'bad gateway')]
+    update_queue.enqueue('ABC-1', 'comment', 'released')
+
+    stats = flush(update_queue, client, drain=True, poll_interval=0.02)
+
+    assert (stats['sent'], stats['failed']) == (1, 0)
+    assert update_queue.updates() == []
+    assert len(jira.requests) == 3
+
+
+def test_client_errors_fail_without_a_retry(jira, client, update_queue):
+    jira.responses[('POST', _comment_path('ABC-404'))] = [(404, 'application/json', '{"errorMessages": ["Issue does not exist"]}')]
+    update_queue.enqueue('ABC-404', 'comment', 'released')
+
+    stats = flush(update_queue, client, drain=True, poll_interval=0.02)
+
+    assert (stats['sent'], stats['failed']) == (0, 1)
+    [failed] = update_queue.updates(STATUS_FAILED)
+    assert failed.attempts == 1
+    assert "'404'" in failed.last_error
+    assert update_queue.retry() == 1
+    assert [update.id for update in update_queue.due()] == [failed.id]
+
+
+def test_unexpected_responses_fail_the_update_instead_of_the_flush(jira, client, update_queue):
+    jira.responses[('GET', '/rest/api/2/issue/ABC-1/transitions')] = [(200, 'application/json', '[]')]
+    update_queue.enqueue('ABC-1', 'transition', 'Done')
+    update_queue.enqueue('ABC-2', 'comment', 'released')
+
+    stats = flush(update_queue, client)
+
+    assert (stats['sent'], stats['failed']) == (1, 1)
+    assert [update.issue for update in update_queue.updates(STATUS_FAILED)] == ['ABC-1']
+
+
+def test_updates_of_an_issue_are_sent_in_queue_order(jira, client, update_queue, monkeypatch):
+    monkeypatch.setattr(jira_client, 'BACKOFF_BASE', 0.2)
+    jira.responses[('POST', _comment_path('ABC-1'))] = [(503, 'text/plain', 'maintenance')]
+    update_queue.enqueue('ABC-1', 'comment', 'released')
+    update_queue.enqueue('ABC-1', 'transition', 'Done')
+    update_queue.enqueue('ABC-2', 'comment', 'released')
+
+    stats = flush(update_queue, client)
+
+    # The transition waits for the comment before it, and is not even looked up.
+    assert (stats['sent'], stats['retrying']) == (1, 2)
+    assert sorted(path for _, path, _ in jira.requests) == [_comment_path('ABC-1'), _comment_path('ABC-2')]
+    assert update_queue.due() == []
+
+    time.sleep(0.25)
+    del jira.requests[:]
+
+    assert flush(update_queue, client)['sent'] == 2
+    assert [(method, path) for method, path, _ in jira.requests] == [
+        ('POST', _comment_path('ABC-1')),
+        ('GET', '/rest/api/2/issue/ABC-1/transitions'),
+        ('POST', '/rest/api/2/issue/ABC-1/transitions'),
+    ]
+    assert jira.requests[-1][2] == {'transition': {'id': '31'}}
+
+
+@pytest.fixture
+def no_jira_environment(monkeypatch):
+    for variable in ('JIRA_URL', 'JIRA_USERNAME', 'JIRA_PASSWORD', 'JIRA_API_TOKEN'):
+        monkeypatch.delenv(variable, raising=False)
+
+
+def test_load_jira_config_reads_the_commit_code_issue_rest_url(tmp_path, no_jira_environment):
+    config_file = tmp_path / 'commit_code.ini'
+    config_file.write_text('[Jira]\nissue_rest_url=http://jira.example.com/tracker/rest/api/2/issue/\nusername=jdoe\npassword=secret\n')
+
+    assert load_jira_config(str(config_file)) == {'url': 'http://jira.example.com/tracker', 'username': 'jdoe', 'password': 'secret'}
+
+
+def test_load_jira_config_prefers_url_and_the_environment(tmp_path, no_jira_environment, monkeypatch):
+    config_file = tmp_path / 'jira_util.ini'
+    config_file.write_text('[jira]\nurl=https://jira.example.com\nissue_rest_url=http://other/rest/api/2/issue\nusername=jdoe\npassword=secret\n')
+    monkeypatch.setenv('JIRA_API_TOKEN', 'token')
+
+    assert load_jira_config(str(config_file)) == {'url': 'https://jira.example.com', 'username': 'jdoe', 'password': 'token'}
@@ -0,0 +1,20 @@
+from development_utils.perl_dependencies import parse_dependency_lines
+
+
+def test_edges_are_reported_at_the_line_of_their_keyword():
+    source = "package A;\nuse Moose;\n\n\nextends 'Foo::Bar';\n\nwith 'Role::One',\n     'Role::Two';\n\n  use parent qw(Base::One);\n"
+
+    assert parse_dependency_lines(source) == {
+        'Moose': 2,
+        'Foo::Bar': 5,
+        'Role::One': 7,
+        'Role::Two': 7,
+        'parent': 10,
+        'Base::One': 10,
+    }
+
+
+def test_pod_and_the_end_section_are_ignored():
+    source = "package A;\n\n=head1 NAME\n\nuse Not::Code;\n\n=cut\n\nuse Real::Code;\n__END__\nuse After::End;\n"
+
+    assert parse_dependency_lines(source) == {'Real::Code': 9}
@@ -0,0 +1,49 @@
+import os
+
+import pytest
+
+from conftest import load_script
+from development_utils.git_lookup_index import GitLookupIndex
+
+script = load_script(os.path.join('bin', 'prepare_release_steps.py'))
+
+
+@pytest.fixture
+def git_lookup(tmp_path):
+    lookup_file = tmp_path / 'git_clone_lookup.txt'
+    lookup_file.write_text('web-portal https://git.example.com/web-portal.git\nweb-portal-api https://git.example.com/web-portal-api.git\n'
+                           'billing https://git.example.com/billing.git\n')
+    git_lookup = GitLookupIndex.load(str(lookup_file), str(tmp_path / 'lookup.idx'))
+    yield git_lookup
+    git_lookup.close()
+
+
+def _row(code_base):
+    return {'line_number': 2, 'code_base': code_base, 'version': 'v1.0.0', 'jira_issue': 'ABC-1'}
+
+
+def test_batch_rows_need_an_exact_code_base(git_lookup, tmp_path):
+    outdir = tmp_path / 'out'
+    outdir.mkdir()
+
+    result = script.prepare_release(git_lookup, _row('billng'), str(outdir))
+
+    assert result['status'] == 'FAILED'
+    assert result['error'] == "code-base 'billng' is not in the lookup - did you mean: billing"
+    assert os.listdir(str(outdir)) == []
+
+    result = script.prepare_release(git_lookup, _row('billing'), str(outdir))
+
+    assert result['status'] == 'OK'
+    assert result['repo'] == 'https://git.example.com/billing.git'
+
+
+def test_an_inexact_code_base_is_confirmed_interactively(git_lookup, monkeypatch):
+    answers = iter(['n', 'billing'])
+    monkeypatch.setattr('builtins.input', lambda prompt: next(answers))
+
+    # Declining 'billng' -> 'billing' asks for the code-base again.
+    assert script.select_code_base(git_lookup, 'billng') == 'billing'
+
+    monkeypatch.setattr('builtins.input', lambda prompt: 'y')
+    assert script.select_code_base(git_lookup, 'billng') == 'billing'
@@ -0,0 +1,136 @@
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from development_utils.smoke_tests import Check, load_checks, run_checks, summarize
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """A webapp stand-in speaking keep-alive HTTP/1.1."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b'') -> None:
+        self.send_response(status)
+        self.send_header('Content-Type', 'text/html')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == '/login':
+            self._send(200, b'<h1>Welcome</h1>')
+        elif self.path in ('/no-content', '/not-modified'):
+            # No Content-Length: the client must not wait for a body that never comes.
+            self.send_response(204 if self.path == '/no-content' else 304)
+            self.end_headers()
+        elif self.path == '/early-hints':
+            self.send_response_only(103)
+            self.send_header('Link', '</style.css>; rel=preload; as=style')
+            self.end_headers()
+            self._send(200, b'hinted')
+        elif self.path == '/chunked':
+            self.send_response(200)
+            self.send_header('Transfer-Encoding', 'chunked')
+            self.end_headers()
+            for chunk in (b'Wel', b'come'):
+                self.wfile.write(f"{len(chunk):x}\r\n".encode() + chunk + b'\r\n')
+            self.wfile.write(b'0\r\n\r\n')
+        else:
+            self._send(404, b'not found')
+
+
+@pytest.fixture
+def base_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), StandInHandler)
+    thread = threading.Thread(target=server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def _check(base_url, path, **kwargs):
+    kwargs.setdefault('timeout', 2.0)
+    return Check(instance='stand-in', path=path, url=base_url + path, **kwargs)
+
+
+def test_expect_text_is_found_in_plain_and_chunked_bodies(base_url):
+    results, _ = run_checks([
+        _check(base_url, '/login', expect_text='Welcome'),
+        _check(base_url, '/chunked', expect_text='Welcome'),
+    ])
+
+    assert [result.error for result in results] == [None, None]
+    assert [result.bytes for result in results] == [16, 7]
+
+
+@pytest.mark.parametrize('path, status', [('/no-content', 204), ('/not-modified', 304)])
+def test_responses_without_a_body_do_not_time_out(base_url, path, status):
+    results, stats = run_checks([_check(base_url, path, expect_status=(status,), repeat=3)], per_host_limit=1)
+
+    assert [result.error for result in results] == [None, None, None]
+    assert stats['connections'] == 1
+
+
+def test_interim_responses_are_skipped(base_url):
+    results, _ = run_checks([_check(base_url, '/early-hints', expect_text='hinted')])
+
+    assert results[0].error is None
+    assert results[0].status == 200
+
+
+def test_keep_alive_connections_are_reused(base_url):
+    results, stats = run_checks([_check(base_url, '/login', repeat=5)], per_host_limit=1)
+
+    assert all(result.ok for result in results)
+    assert stats['connections'] == 1
+    assert stats['reused'] == 4
+
+
+def test_unexpected_status_and_missing_text_fail(base_url):
+    results, _ = run_checks([
+        _check(base_url, '/missing'),
+        _check(base_url, '/login', expect_text='Goodbye'),
+    ])
+
+    assert results[0].error == "status '404' is not one of '200'"
+    assert results[1].error == "the response does not contain 'Goodbye'"
+
+    overall = summarize(results)[-1]
+    assert (overall.name, overall.count, overall.failures) == ('(all)', 2, 2)
+
+
+def test_load_checks(tmp_path):
+    config_file = tmp_path / 'webapp_smoke_tests.ini'
+    config_file.write_text(
+        '[DEFAULT]\nchecks=/, /login\nexpect_status=200, 302\n\n'
+        '[prod-1]\nbase_url=http://server1:8080/myapp\n\n'
+        '[prod-2]\nbase_url=https://server2/myapp/\nexpect_text=Welcome\nverify_tls=false\nrepeat=3\n'
+    )
+
+    checks = load_checks(str(config_file))
+
+    assert [check.url for check in checks] == [
+        'http://server1:8080/myapp/',
+        'http://server1:8080/myapp/login',
+        'https://server2/myapp/',
+        'https://server2/myapp/login',
+    ]
+    assert checks[0].expect_status == (200, 302)
+    assert checks[2].expect_text == 'Welcome'
+    assert checks[2].verify_tls is False
+    assert checks[3].repeat == 3
+
+
+def test_load_checks_requires_an_http_base_url(tmp_path):
+    config_file = tmp_path / 'webapp_smoke_tests.ini'
+    config_file.write_text('[prod-1]\nbase_url=server1/myapp\n')
+
+    with pytest.raises(Exception, match="instance 'prod-1'"):
+        load_checks(str(config_file))
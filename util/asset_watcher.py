@@ -0,0 +1,155 @@
+import click
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.inotify_watcher import (
+    DEFAULT_DEBOUNCE_SECONDS,
+    DEFAULT_MAX_DEPTH,
+    DEFAULT_POLL_INTERVAL,
+    DirectoryWatcher,
+)
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg, flush=True)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg, flush=True)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def load_asset_lookup(infile: str) -> set:
+    """Load the known/registered assets list file
+    :param infile: {str} - newline-separated list of directories; blank lines and # comments are ignored
+    :return lookup: {set}
+    """
+    lookup = set()
+
+    if infile is None:
+        return lookup
+
+    with open(infile) as f:
+        for line in f:
+            line = line.strip()
+            if line == '' or line.startswith('#'):
+                continue
+            lookup.add(line)
+
+    logging.info(f"Loaded '{len(lookup)}' known assets from '{infile}'")
+
+    return lookup
+
+
+@click.command()
+@click.option('--debounce', type=float, default=DEFAULT_DEBOUNCE_SECONDS, help=f"Seconds of quiet before a burst of changes is reported - default is '{DEFAULT_DEBOUNCE_SECONDS}'")
+@click.option('--duration', type=float, help="Stop after this many seconds - default is to run until interrupted")
+@click.option('--indir', help="The directory to watch - default is the current working directory")
+@click.option('--known_assets_list_file', help="File listing the known/registered asset directories")
+@click.option('--logfile', help="The log file")
+@click.option('--max_depth', type=int, default=DEFAULT_MAX_DEPTH, help=f"The maximum directory depth to watch - default is '{DEFAULT_MAX_DEPTH}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--poll_interval', type=float, default=DEFAULT_POLL_INTERVAL, help=f"Seconds between scans if inotify watches are exhausted - default is '{DEFAULT_POLL_INTERVAL}'")
+def main(debounce: float, duration: float, indir: str, known_assets_list_file: str, logfile: str, max_depth: int, outdir: str, poll_interval: float):
+    """Watch a directory for new/unregistered asset directories"""
+
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    indir = os.path.abspath(indir)
+
+    if not os.path.isdir(indir):
+        print_red(f"input directory '{indir}' does not exist")
+        sys.exit(1)
+
+    if known_assets_list_file is not None and not os.path.exists(known_assets_list_file):
+        print_red(f"known assets list file '{known_assets_list_file}' does not exist")
+        sys.exit(1)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    asset_lookup = load_asset_lookup(known_assets_list_file)
+
+    def report_new_assets(assets: set) -> None:
+        new_assets = sorted(asset for asset in assets if asset not in asset_lookup)
+        for asset in new_assets:
+            logging.warning(f"Found new/unregistered asset '{asset}'")
+            print_red(f"{datetime.now().strftime('%H:%M:%S')} new/unregistered asset '{asset}'")
+
+    def on_change(added: set, removed: set) -> None:
+        report_new_assets(added)
+        for asset in sorted(removed):
+            logging.info(f"Asset '{asset}' was removed")
+            print_yellow(f"{datetime.now().strftime('%H:%M:%S')} removed asset '{asset}'")
+
+    watcher = DirectoryWatcher(
+        indir,
+        on_change,
+        max_depth=max_depth,
+        debounce=debounce,
+        poll_interval=poll_interval,
+    )
+
+    assets = watcher.seed()
+    print(f"Processed '{len(assets)}' assets")
+    report_new_assets(assets)
+
+    print(f"Watching '{indir}' using {watcher.mode} - press Ctrl-C to stop", flush=True)
+
+    try:
+        watcher.run(duration=duration)
+    except KeyboardInterrupt:
+        pass
+
+    print(f"The log file is '{logfile}'")
+
+
+if __name__ == "__main__":
+    main()
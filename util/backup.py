@@ -0,0 +1,183 @@
+import click
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.backup_store import (
+    DEFAULT_COMPRESSION_LEVEL,
+    DEFAULT_MAX_WORKERS,
+    DEFAULT_STORE_DIR,
+    BackupStore,
+)
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+DEFAULT_KEEP = 30
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _open_store(store_dir: str, logfile: str, compression_level: int = DEFAULT_COMPRESSION_LEVEL) -> BackupStore:
+    """Apply the defaults shared by the sub-commands and set up logging."""
+    if store_dir is None:
+        store_dir = DEFAULT_STORE_DIR
+        print_yellow(f"--store_dir was not specified and therefore was set to '{store_dir}'")
+
+    if logfile is None:
+        logfile = os.path.join(DEFAULT_OUTDIR, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    pathlib.Path(os.path.dirname(os.path.abspath(logfile))).mkdir(parents=True, exist_ok=True)
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    return BackupStore(store_dir, compression_level=compression_level)
+
+
+def _mib(size: int) -> str:
+    return f"{size / 1024 / 1024:.1f} MiB"
+
+
+@click.group()
+def main():
+    """Deduplicating incremental backups of directories into a local chunk store"""
+
+
+@main.command()
+@click.option('--compression_level', type=int, default=DEFAULT_COMPRESSION_LEVEL, help=f"The zlib level of new chunks, 0 to store them uncompressed - default is '{DEFAULT_COMPRESSION_LEVEL}'")
+@click.option('--indir', help="The directory to back up - default is the current working directory")
+@click.option('--logfile', help="The log file")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help=f"The number of compression threads - default is '{DEFAULT_MAX_WORKERS}'")
+@click.option('--store_dir', help=f"The chunk store - default is '{DEFAULT_STORE_DIR}'")
+def backup(compression_level: int, indir: str, logfile: str, max_workers: int, store_dir: str):
+    """Write a new snapshot of a directory"""
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    if not os.path.isdir(indir):
+        print_red(f"input directory '{indir}' does not exist")
+        sys.exit(1)
+
+    store = _open_store(store_dir, logfile, compression_level)
+    stats = store.backup(indir, max_workers=max_workers, exclude=(store.store_dir,))
+
+    print(f"Files: '{stats.files}' ('{stats.reused_files}' unchanged and not read, '{stats.read_files}' read)")
+    print(f"Read {_mib(stats.bytes_read)} in '{stats.chunks}' chunks; stored '{stats.new_chunks}' new chunks ({_mib(stats.bytes_stored)})")
+    print(f"Recorded '{stats.directories}' directories and '{stats.symlinks}' symbolic links")
+
+    if stats.skipped:
+        print_yellow(f"Skipped '{stats.skipped}' special files (sockets, FIFOs, devices) - see the log file")
+
+    if stats.errors:
+        print_red(f"Could not back up '{stats.errors}' files - see the log file")
+        sys.exit(1)
+
+    print_green(f"Wrote snapshot '{stats.snapshot}' in {stats.seconds:.1f} seconds")
+
+
+@main.command(name='list')
+@click.option('--indir', help="Only list the snapshots of this directory")
+@click.option('--logfile', help="The log file")
+@click.option('--store_dir', help=f"The chunk store - default is '{DEFAULT_STORE_DIR}'")
+def list_snapshots(indir: str, logfile: str, store_dir: str):
+    """List the snapshots in the store"""
+    store = _open_store(store_dir, logfile)
+
+    for snapshot in store.list_snapshots(indir):
+        manifest = store.load_snapshot(snapshot)
+        stats = manifest['stats']
+        print(f"{snapshot}\t{manifest['source']}\t{stats['files']} files\t{_mib(stats['bytes_stored'])} new")
+
+
+@main.command()
+@click.option('--logfile', help="The log file")
+@click.option('--outdir', required=True, help="The directory the files are restored into")
+@click.option('--overwrite', is_flag=True, help="Replace files that already exist in --outdir")
+@click.option('--path', 'paths', multiple=True, help="Only restore this file or directory, relative to the backed-up directory (can be repeated)")
+@click.option('--snapshot', help="The snapshot to restore - default is the latest snapshot of --indir")
+@click.option('--indir', help="The backed-up directory whose latest snapshot is restored when --snapshot is not specified")
+@click.option('--store_dir', help=f"The chunk store - default is '{DEFAULT_STORE_DIR}'")
+def restore(logfile: str, outdir: str, overwrite: bool, paths: tuple, snapshot: str, indir: str, store_dir: str):
+    """Restore a snapshot by streaming its chunks"""
+    store = _open_store(store_dir, logfile)
+
+    if snapshot is None:
+        if indir is None:
+            print_red("Either --snapshot or --indir must be specified")
+            sys.exit(1)
+        snapshots = store.list_snapshots(indir)
+        if not snapshots:
+            print_red(f"There is no snapshot of '{indir}' in '{store.store_dir}'")
+            sys.exit(1)
+        snapshot = snapshots[-1]
+        print_yellow(f"--snapshot was not specified and therefore was set to '{snapshot}'")
+
+    stats = store.restore(snapshot, outdir, paths=paths, overwrite=overwrite)
+
+    print_green(f"Restored '{stats['files']}' files ({_mib(stats['bytes'])}), '{stats['directories']}' directories and "
+                f"'{stats['symlinks']}' symbolic links into '{outdir}'")
+
+
+@main.command()
+@click.option('--keep', type=int, default=DEFAULT_KEEP, help=f"The number of snapshots kept per backed-up directory - default is '{DEFAULT_KEEP}'")
+@click.option('--logfile', help="The log file")
+@click.option('--store_dir', help=f"The chunk store - default is '{DEFAULT_STORE_DIR}'")
+def prune(keep: int, logfile: str, store_dir: str):
+    """Delete old snapshots and the chunks only they referenced"""
+    store = _open_store(store_dir, logfile)
+    stats = store.prune(keep)
+
+    print_green(f"Deleted '{stats['snapshots']}' snapshots and '{stats['chunks']}' chunks, freeing {_mib(stats['bytes'])}")
+
+
+if __name__ == "__main__":
+    main()
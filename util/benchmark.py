@@ -0,0 +1,145 @@
+import click
+import json
+import logging
+import os
+import pathlib
+import sys
+import tempfile
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.benchmarks import BENCHMARKS, DEFAULT_REPEAT, DEFAULT_THRESHOLD, compare_results, run_benchmarks
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+DEFAULT_BASELINE_FILE = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'benchmarks', 'baseline.json')
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _write_json(data: dict, outfile: str) -> None:
+    pathlib.Path(os.path.dirname(os.path.abspath(outfile))).mkdir(parents=True, exist_ok=True)
+    tmp_file = f"{outfile}.{os.getpid()}.tmp"
+    with open(tmp_file, 'w') as of:
+        json.dump(data, of, indent=2, sort_keys=True)
+    os.replace(tmp_file, outfile)
+
+
+@click.command()
+@click.option('--baseline', help=f"The baseline results file - default is '{DEFAULT_BASELINE_FILE}'")
+@click.option('--benchmark', 'names', multiple=True, type=click.Choice(sorted(BENCHMARKS)), help="The benchmark to run (can be repeated) - default is all of them")
+@click.option('--logfile', help="The log file")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--outfile', help="The JSON results file - default is benchmark_results.json in --outdir")
+@click.option('--repeat', type=int, default=DEFAULT_REPEAT, help=f"The base number of samples per measurement - default is '{DEFAULT_REPEAT}'")
+@click.option('--save_baseline', is_flag=True, help="Store the results as the new baseline instead of comparing against it")
+@click.option('--threshold', type=float, default=DEFAULT_THRESHOLD, help=f"The relative slow-down of a median that fails the run - default is '{DEFAULT_THRESHOLD}'")
+def main(baseline: str, names: tuple, logfile: str, outdir: str, outfile: str, repeat: int, save_baseline: bool, threshold: float):
+    """Benchmark the hot paths of the Python utilities and compare against a baseline"""
+
+    if baseline is None:
+        baseline = DEFAULT_BASELINE_FILE
+        print_yellow(f"--baseline was not specified and therefore was set to '{baseline}'")
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    if outfile is None:
+        outfile = os.path.join(outdir, 'benchmark_results.json')
+        print_yellow(f"--outfile was not specified and therefore was set to '{outfile}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    with tempfile.TemporaryDirectory(prefix='dev-utils-bench-') as scratch_dir:
+        current = run_benchmarks(scratch_dir, names=list(names) or None, repeat=repeat)
+
+    _write_json(current, outfile)
+    print(f"Wrote '{len(current['results'])}' measurements to '{outfile}'")
+
+    if save_baseline:
+        _write_json(current, baseline)
+        print_green(f"Saved the results as the baseline '{baseline}'")
+        return
+
+    if not os.path.exists(baseline):
+        print_yellow(f"Baseline '{baseline}' does not exist - run with --save_baseline to create it")
+        for measurement, result in sorted(current['results'].items()):
+            print(f"    {measurement:<40} {result['median'] * 1000:>10.3f} ms")
+        return
+
+    with open(baseline) as f:
+        rows = compare_results(json.load(f), current, threshold=threshold)
+
+    print(f"\n{'measurement':<40} {'baseline ms':>12} {'current ms':>12} {'change':>8}")
+    for measurement, before, after, change, regressed in rows:
+        line = f"{measurement:<40} {before * 1000:>12.3f} {after * 1000:>12.3f} {change:>+8.0%}"
+        if regressed:
+            print_red(line)
+        else:
+            print(line)
+
+    regressions = [row for row in rows if row[4]]
+    if regressions:
+        print_red(f"\n'{len(regressions)}' measurements regressed by more than {threshold:.0%} against '{baseline}'")
+        sys.exit(1)
+
+    print_green(f"\nNo measurement regressed by more than {threshold:.0%}")
+
+
+if __name__ == "__main__":
+    main()
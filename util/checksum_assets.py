@@ -0,0 +1,169 @@
+import click
+import hashlib
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.checksum_manifest import (
+    DEFAULT_ALGORITHM,
+    DEFAULT_MAX_WORKERS,
+    build_manifest,
+    diff_manifests,
+    load_manifest,
+    save_manifest,
+)
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+DEFAULT_MANIFEST_DIR = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'checksum_manifests')
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _default_manifest_file(indir: str) -> str:
+    key = hashlib.sha1(indir.encode('utf-8')).hexdigest()[:16]
+    return os.path.join(DEFAULT_MANIFEST_DIR, f"{os.path.basename(indir) or 'root'}-{key}.json")
+
+
+@click.command()
+@click.option('--algorithm', default=DEFAULT_ALGORITHM, help=f"The hashlib algorithm - default is '{DEFAULT_ALGORITHM}'")
+@click.option('--full', is_flag=True, help="Re-read and re-hash every file instead of trusting unchanged stat keys")
+@click.option('--indir', help="The directory containing the assets to be checksummed - default is the current working directory")
+@click.option('--logfile', help="The log file")
+@click.option('--manifest', help=f"The manifest file from the previous run - default is derived from --indir under '{DEFAULT_MANIFEST_DIR}'")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help=f"The number of hashing processes - default is '{DEFAULT_MAX_WORKERS}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--outfile', help="The md5sum-style checksum listing to write")
+@click.option('--verbose', is_flag=True, help="List every added, removed and changed file")
+def main(algorithm: str, full: bool, indir: str, logfile: str, manifest: str, max_workers: int, outdir: str, outfile: str, verbose: bool):
+    """Checksum the assets in a directory and report what changed since the previous run"""
+
+    if algorithm not in hashlib.algorithms_available:
+        print_red(f"--algorithm '{algorithm}' is not supported")
+        sys.exit(1)
+
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    indir = os.path.abspath(indir)
+
+    if not os.path.isdir(indir):
+        print_red(f"input directory '{indir}' does not exist")
+        sys.exit(1)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    if outfile is None:
+        outfile = os.path.join(outdir, os.path.basename(__file__) + '.txt')
+        print_yellow(f"--outfile was not specified and therefore was set to '{outfile}'")
+
+    if manifest is None:
+        manifest = _default_manifest_file(indir)
+        print_yellow(f"--manifest was not specified and therefore was set to '{manifest}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    previous = load_manifest(manifest)
+
+    if previous['algorithm'] not in (None, algorithm):
+        print_yellow(f"The previous manifest used '{previous['algorithm']}' so every file will be re-hashed with '{algorithm}'")
+
+    current, stats = build_manifest(
+        indir,
+        previous=None if full else previous,
+        algorithm=algorithm,
+        max_workers=max_workers,
+        exclude=(os.path.abspath(manifest), os.path.abspath(outfile)),
+    )
+
+    with open(outfile, 'w') as of:
+        for relpath in sorted(current['files']):
+            of.write(f"{current['files'][relpath][4]}\t {os.path.join(indir, relpath)}\n")
+
+    print(f"Wrote '{stats['files']}' records to '{outfile}'")
+    print(f"Hashed '{stats['hashed']}' files ({stats['bytes_hashed'] / 1024 / 1024:.1f} MiB) and reused '{stats['reused']}' in {stats['seconds']:.1f} seconds")
+
+    if previous['files'] and previous['algorithm'] == algorithm:
+        diff = diff_manifests(previous, current)
+        if diff.is_empty:
+            print_green("No files were added, removed or changed since the previous run")
+        else:
+            for label, paths in (('Added', diff.added), ('Removed', diff.removed), ('Changed', diff.changed)):
+                if not paths:
+                    continue
+                print_yellow(f"{label}: '{len(paths)}' files")
+                if verbose:
+                    for path in paths:
+                        print(f"    {path}")
+
+    save_manifest(current, manifest)
+
+    if stats['errors']:
+        print_red(f"Could not checksum '{len(stats['errors'])}' files - see the log file '{logfile}'")
+        sys.exit(1)
+
+    print(f"The log file is '{logfile}'")
+
+
+if __name__ == "__main__":
+    main()
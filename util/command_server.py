@@ -0,0 +1,86 @@
+import click
+import logging
+import os
+import pathlib
+import signal
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.command_server import DEFAULT_GIT_LOOKUP_FILE, DEFAULT_SOCKET_FILE, CommandServer, request
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_LOGFILE = os.path.join(os.environ.get('HOME', '/tmp'), '.cache', 'dev-utils', 'command_server.log')
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+@click.command()
+@click.option('--git_lookup_file', default=DEFAULT_GIT_LOOKUP_FILE, help=f"The git lookup file whose index is preloaded - default is '{DEFAULT_GIT_LOOKUP_FILE}'")
+@click.option('--logfile', default=DEFAULT_LOGFILE, help=f"The log file - default is '{DEFAULT_LOGFILE}'")
+@click.option('--socket_file', default=DEFAULT_SOCKET_FILE, help=f"The Unix domain socket - default is '{DEFAULT_SOCKET_FILE}'")
+@click.option('--status', is_flag=True, help="Report whether a server is listening and exit")
+@click.option('--stop', is_flag=True, help="Stop the running server and exit")
+def main(git_lookup_file: str, logfile: str, socket_file: str, status: bool, stop: bool):
+    """Run the warm command server used by util/warm_run.py"""
+
+    if status or stop:
+        try:
+            reply = request('stop' if stop else 'ping', socket_file=socket_file)
+        except OSError:
+            print_red(f"No command server is listening on '{socket_file}'")
+            sys.exit(1)
+        if stop:
+            print_green(f"Stopped the command server on '{socket_file}'")
+        else:
+            print_green(f"Command server PID '{reply['pid']}' is listening on '{socket_file}' with '{reply['modules']}' modules loaded")
+        return
+
+    pathlib.Path(os.path.dirname(logfile)).mkdir(parents=True, exist_ok=True)
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    def terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, terminate)
+
+    server = CommandServer(socket_file=socket_file, git_lookup_file=git_lookup_file)
+    server.warm()
+
+    print(f"Listening on '{socket_file}' - the log file is '{logfile}'", flush=True)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        logging.info("Stopped")
+
+
+if __name__ == "__main__":
+    main()
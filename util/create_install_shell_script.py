@@ -1,36 +1,215 @@
+import hashlib
 import os
 import sys
 
 DEFAULT_OUTFILE = os.path.join('/tmp', os.path.basename(__file__) + '.sh')
-outfile = None
-infile = sys.argv[1]
 
-if len(sys.argv) == 3:
-    outfile = sys.argv[2]
+# Trailing annotation marking a step that may run concurrently with the
+# neighbouring annotated steps, e.g.:  sudo apt-get install -y tree  # @parallel
+PARALLEL_ANNOTATION = '# @parallel'
 
-if infile is None:
-    print("Usage: python __file__ [input text file with commands] [output bash shell script file]")
-    sys.exit(1)
+# Commands that only change the state of the running shell.  They are
+# re-executed on every run so that later steps see the same environment.
+# Sourced scripts ('source', '.') do real work and are resumable steps.
+SHELL_STATE_COMMANDS = ('cd', 'export', 'set', 'unset', 'umask', 'alias', 'pushd', 'popd')
 
-if not os.path.exists(infile):
-    raise Exception(f"File '{infile}' does not exist")
+# A line containing any of these runs more than the one builtin, e.g. 'cd foo && make'.
+COMPOUND_CHARACTERS = ';&|'
 
-if outfile is None:
-    basename = os.path.basename(infile)
-    if basename.endswith('.txt'):
-        basename = basename.replace('.txt', '')
-    outfile = os.path.join('/tmp', basename + '.sh')
-    print(f"outfile was not specified and therefore was set to '{outfile}'")
+SCRIPT_HEADER = r'''#!/bin/sh
+#
+# Resumable install script.  Each completed step is recorded in the state
+# file by its step ID (a hash of the command text); re-running the script
+# skips the completed steps and resumes at the first one that failed.
+#
+# Usage: sh SCRIPT [--dry-run] [--reset]
+#   --dry-run  report which steps would run without executing them
+#   --reset    forget completed steps and start over
+#
+STATE_FILE="${STATE_FILE:-$0.state}"
+# Steps may cd elsewhere; keep recording completions in the same file.
+case "$STATE_FILE" in
+    /*) ;;
+    *) STATE_FILE="$PWD/$STATE_FILE" ;;
+esac
+DRY_RUN=0
+
+for arg in "$@"; do
+    case "$arg" in
+        --dry-run) DRY_RUN=1 ;;
+        --reset) rm -f "$STATE_FILE" ;;
+        *) echo "Unknown option '$arg'" >&2; exit 2 ;;
+    esac
+done
+
+touch "$STATE_FILE" || exit 1
+
+run_step() {
+    step_id="$1"
+    step_cmd="$2"
+
+    if grep -qx "$step_id" "$STATE_FILE"; then
+        echo "Already completed: $step_cmd"
+        return 0
+    fi
+
+    if [ "$DRY_RUN" = 1 ]; then
+        echo "Would execute: $step_cmd"
+        return 0
+    fi
+
+    echo "Will attempt to execute: $step_cmd"
+    if eval "$step_cmd"; then
+        echo "$step_id" >> "$STATE_FILE"
+        return 0
+    fi
+
+    echo "Step failed: $step_cmd" >&2
+    return 1
+}
+
+run_shell_step() {
+    if [ "$DRY_RUN" = 1 ]; then
+        # Keep the shell state in step for the report, but a directory
+        # created by a step that has not run yet may not exist.
+        echo "Would execute: $1"
+        eval "$1" 2>/dev/null || true
+        return 0
+    fi
+
+    echo "Will attempt to execute: $1"
+    eval "$1" || { echo "Step failed: $1" >&2; exit 1; }
+}
+
+fail() {
+    echo "Stopping; re-run '$0' to resume from the failed step (state file '$STATE_FILE')" >&2
+    exit 1
+}
+
+'''
+
+
+def _quote(text: str) -> str:
+    """Single-quote text for /bin/sh
+    :param text: {str}
+    :return: {str}
+    """
+    return "'" + text.replace("'", "'\"'\"'") + "'"
+
+
+def _is_shell_state_command(line: str) -> bool:
+    if any(character in line for character in COMPOUND_CHARACTERS):
+        return False
+    return line.split()[0] in SHELL_STATE_COMMANDS
+
+
+def parse_steps(infile: str) -> list:
+    """Parse the command list file into steps
+    :param infile: {str} - one command per line; lines mentioning 'reference' are echoed only
+    :return steps: {list} of dict with kind ('echo', 'shell', 'step'), cmd, step_id and parallel
+    """
+    steps = []
+    occurrences = {}
 
-with open(outfile, 'wt') as of:
-    of.write("#!/bin/sh\n\n")
     with open(infile, 'r') as f:
         for line in f:
             line = line.strip()
+            if line == '':
+                continue
+
             if 'reference' in line.lower():
-                of.write(f'echo "{line}"\n')
+                steps.append({'kind': 'echo', 'cmd': line})
+                continue
+
+            parallel = line.endswith(PARALLEL_ANNOTATION)
+            if parallel:
+                line = line[:-len(PARALLEL_ANNOTATION)].rstrip()
+
+            if _is_shell_state_command(line):
+                steps.append({'kind': 'shell', 'cmd': line})
+                continue
+
+            # A repeated command gets its own ID so that both occurrences run.
+            occurrences[line] = occurrences.get(line, 0) + 1
+            key = line if occurrences[line] == 1 else f"{line}\n#{occurrences[line]}"
+            step_id = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16]
+
+            steps.append({'kind': 'step', 'cmd': line, 'step_id': step_id, 'parallel': parallel})
+
+    return steps
+
+
+def write_script(steps: list, outfile: str) -> None:
+    """Write the resumable shell script
+    :param steps: {list} - as returned by parse_steps
+    :param outfile: {str} - the shell script to be written
+    """
+    with open(outfile, 'wt') as of:
+        of.write(SCRIPT_HEADER)
+
+        i = 0
+        while i < len(steps):
+            step = steps[i]
+
+            if step['kind'] == 'echo':
+                of.write(f"echo {_quote(step['cmd'])}\n\n")
+                i += 1
+                continue
+
+            if step['kind'] == 'shell':
+                of.write(f"run_shell_step {_quote(step['cmd'])}\n\n")
+                i += 1
+                continue
+
+            group = [step]
+            while step['parallel'] and i + len(group) < len(steps):
+                following = steps[i + len(group)]
+                if following['kind'] != 'step' or not following['parallel']:
+                    break
+                group.append(following)
+
+            if len(group) == 1:
+                of.write(f"run_step {step['step_id']} {_quote(step['cmd'])} || fail\n\n")
             else:
-                of.write(f'echo "Will attempt to execute: {line}"\n')
-                of.write(f"{line}\n\n")
+                of.write(f"# {len(group)} independent steps run concurrently\n")
+                of.write("pids=''\n")
+                for member in group:
+                    of.write(f"run_step {member['step_id']} {_quote(member['cmd'])} &\n")
+                    of.write('pids="$pids $!"\n')
+                of.write("group_failed=0\n")
+                of.write('for pid in $pids; do wait "$pid" || group_failed=1; done\n')
+                of.write('[ "$group_failed" = 0 ] || fail\n\n')
+
+            i += len(group)
+
+        of.write('[ "$DRY_RUN" = 1 ] || echo "All steps completed"\n')
+
+    os.chmod(outfile, 0o755)
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: python {os.path.basename(__file__)} [input text file with commands] [output bash shell script file]")
+        sys.exit(1)
+
+    infile = sys.argv[1]
+    outfile = sys.argv[2] if len(sys.argv) == 3 else None
+
+    if not os.path.exists(infile):
+        raise Exception(f"File '{infile}' does not exist")
+
+    if outfile is None:
+        basename = os.path.basename(infile)
+        if basename.endswith('.txt'):
+            basename = basename.replace('.txt', '')
+        outfile = os.path.join('/tmp', basename + '.sh')
+        print(f"outfile was not specified and therefore was set to '{outfile}'")
+
+    steps = parse_steps(infile)
+    write_script(steps, outfile)
+
+    print(f"Wrote shell script '{outfile}' with '{sum(1 for step in steps if step['kind'] == 'step')}' resumable steps")
+
 
-    print(f"Wrote shell script '{outfile}'")
+if __name__ == "__main__":
+    main()
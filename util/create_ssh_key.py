@@ -2,13 +2,20 @@ import click
 import logging
 import os
 import pathlib
-import pyfiglet
-import subprocess
 import sys
 
-from colorama import Fore, Style
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.command import run_streaming
+from development_utils.logging_setup import setup_logging
+from development_utils.run_history import RunHistory
+from development_utils.ssh_keys import DEFAULT_MAX_WORKERS, DEFAULT_SSH_DIR, generate_keys, read_identities, write_key_report
+from development_utils.startup import lazy_import, render_banner
+
+colorama = lazy_import('colorama')
+
 DEFAULT_OUTDIR = os.path.join(
     "/tmp",
     os.path.splitext(os.path.basename(__file__))[0],
@@ -31,8 +38,8 @@ def print_red(msg: str = None) -> None:
     if msg is None:
         raise Exception("msg was not defined")
 
-    print(Fore.RED + msg)
-    print(Style.RESET_ALL + "", end="")
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
 
 
 def print_green(msg: str = None) -> None:
@@ -42,8 +49,8 @@ def print_green(msg: str = None) -> None:
     if msg is None:
         raise Exception("msg was not defined")
 
-    print(Fore.GREEN + msg)
-    print(Style.RESET_ALL + "", end="")
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
 
 
 def print_yellow(msg: str = None) -> None:
@@ -53,16 +60,19 @@ def print_yellow(msg: str = None) -> None:
     if msg is None:
         raise Exception("msg was not defined")
 
-    print(Fore.YELLOW + msg)
-    print(Style.RESET_ALL + "", end="")
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
 
 
-def _execute_cmd(cmd, outdir: str = DEFAULT_OUTDIR, stdout_file=None, stderr_file=None):
+def _execute_cmd(cmd, outdir: str = DEFAULT_OUTDIR, stdout_file=None, stderr_file=None, history: RunHistory = None, step: str = None):
     """Execute a command via system call using the subprocess module
     :param cmd: {str} - the executable to be invoked
     :param outdir: {str} - the output directory where STDOUT, STDERR and the shell script should be written to
     :param stdout_file: {str} - the file to which STDOUT will be captured in
     :param stderr_file: {str} - the file to which STDERR will be captured in
+    :param history: {RunHistory} - when specified, the resource usage is recorded
+    :param step: {str} - the step name recorded in the history - default is the command
+    :return stdout_file: {str} - the file STDOUT was streamed to
     """
     if cmd is None:
         raise Exception("cmd was not specified")
@@ -89,59 +99,81 @@ def _execute_cmd(cmd, outdir: str = DEFAULT_OUTDIR, stdout_file=None, stderr_fil
         logging.info(f"STDERR file '{stderr_file}' already exists so will delete it now")
         os.remove(stderr_file)
 
-    p = subprocess.Popen(cmd, shell=True)
+    result = run_streaming(cmd, stdout_file=stdout_file, stderr_file=stderr_file)
 
-    (stdout, stderr) = p.communicate()
+    logging.info(f"The return code was '{result.returncode}'")
+    logging.info(f"Captured '{result.stdout_bytes}' bytes of STDOUT in '{stdout_file}'")
+    logging.info(f"Captured '{result.stderr_bytes}' bytes of STDERR in '{stderr_file}'")
 
-    pid = p.pid
+    if history is not None:
+        history.record(step or cmd, result)
 
-    logging.info(f"The child process ID is '{pid}'")
+    if result.returncode == 0:
+        logging.info(f"Execution of cmd '{cmd}' has completed")
+    else:
+        logging.error(f"The tail of STDERR for cmd '{cmd}' was:\n{result.stderr_tail}")
+        raise Exception(f"Received status '{result.returncode}' - see '{stderr_file}'")
 
-    p_status = p.wait()
+    return stdout_file
 
-    p_returncode = p.returncode
 
-    if p_returncode is not None:
-        logging.info(f"The return code was '{p_returncode}'")
-    else:
-        logging.info("There was no return code")
+def run_batch(batch_file: str, ssh_dir: str, outdir: str, max_workers: int) -> None:
+    """Generate a key pair for every identity in the batch file and write the consolidated report
+    :param batch_file: {str} - CSV file with header email_address,name
+    :param ssh_dir: {str} - the directory the key pairs are written to
+    :param outdir: {str} - the directory the reports are written to
+    :param max_workers: {int} - the number of worker threads
+    """
+    identities = read_identities(batch_file)
 
-    if p_status == 0:
-        logging.info(f"Execution of cmd '{cmd}' has completed")
-    else:
-        raise Exception(f"Received status '{p_status}'")
+    results = generate_keys(identities, ssh_dir=ssh_dir, max_workers=max_workers)
 
-    if stdout is not None:
-        logging.info("stdout is: " + stdout)
+    report_file = os.path.join(outdir, 'ssh_public_keys_report.txt')
+    authorized_keys_file = os.path.join(outdir, 'ssh_public_keys.txt')
+    write_key_report(results, report_file, authorized_keys_file)
 
-    if stderr is not None:
-        logging.info("stderr is: " + stderr)
+    failed = [r for r in results if r.status != 'OK']
+    for r in failed:
+        print_red(f"FAILED: {r.email_address} - {r.error}")
 
-    return stdout_file
+    print(f"Generated '{len(results) - len(failed)}' of '{len(results)}' keys in '{ssh_dir}'")
+    print(f"Wrote the public-key report to '{report_file}'")
+    print(f"Wrote the public keys to '{authorized_keys_file}' - add them to the accounts at '{DEFAULT_GITHUB_SETTINGS_KEY_URL}'")
+
+    if failed:
+        sys.exit(1)
 
 
 @click.command()
+@click.option('--batch', 'batch_file', help="CSV file with header email_address,name - generates an unencrypted key for each identity")
 @click.option('--email_address', help="The email address to associate with the account")
 @click.option('--logfile', help="The log file")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help=f"The number of workers in batch mode - default is '{DEFAULT_MAX_WORKERS}'")
 @click.option('--name', help="The first and last name to associate with the account - default is environemnt variable GIT_CONFIG_NAME")
 @click.option('--outdir', help="The default is the current working directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--ssh_dir', default=DEFAULT_SSH_DIR, help=f"The directory batch mode writes the keys to - default is '{DEFAULT_SSH_DIR}'")
 @click.option('--verbose', is_flag=True, help=f"Will print more info to STDOUT - default is '{DEFAULT_VERBOSE}'")
-def main(email_address: str, logfile: str, name: str, outdir: str, verbose: bool):
+def main(batch_file: str, email_address: str, logfile: str, max_workers: int, name: str, outdir: str, ssh_dir: str, verbose: bool):
     """Create ssh key by executing ssh-keygen"""
 
-    print(pyfiglet.figlet_format("SSH Keygen"))
+    print(render_banner("SSH Keygen"))
 
     error_ctr = 0
 
-    if email_address is None:
-        print_red(f"--email_address was not specified")
-        error_ctr += 1
+    if batch_file is not None:
+        if not os.path.exists(batch_file):
+            print_red(f"batch file '{batch_file}' does not exist")
+            error_ctr += 1
+    else:
+        if email_address is None:
+            print_red(f"--email_address was not specified")
+            error_ctr += 1
 
-    if name is None:
-        name = os.getenv('GIT_CONFIG_NAME', None)
         if name is None:
-            print_red(f"--name was not specified and environment variable GIT_CONFIG_NAME was not defined")
-            error_ctr += 1
+            name = os.getenv('GIT_CONFIG_NAME', None)
+            if name is None:
+                print_red(f"--name was not specified and environment variable GIT_CONFIG_NAME was not defined")
+                error_ctr += 1
 
     if error_ctr > 0:
         sys.exit(1)
@@ -164,7 +196,11 @@ def main(email_address: str, logfile: str, name: str, outdir: str, verbose: bool
 
     assert isinstance(logfile, str)
 
-    logging.basicConfig(filename=logfile, format=DEFAULT_LOGGING_FORMAT, level=DEFAULT_LOG_LEVEL)
+    setup_logging(logfile, format=DEFAULT_LOGGING_FORMAT, level=DEFAULT_LOG_LEVEL)
+
+    if batch_file is not None:
+        run_batch(batch_file, ssh_dir, outdir, max_workers)
+        return
 
     basename = email_address
     basename = basename.split('@')[0].replace('.', '_')
@@ -172,7 +208,7 @@ def main(email_address: str, logfile: str, name: str, outdir: str, verbose: bool
 
     cmd = f"ssh-keygen -t ed25519 -C '{email_address}' -f {privatekey_filepath}"
     print(cmd)
-    _execute_cmd(cmd)
+    _execute_cmd(cmd, outdir=outdir, history=RunHistory(os.path.basename(__file__)), step='ssh-keygen')
 
     pubkey_filepath = privatekey_filepath + '.pub'
     if not os.path.exists(pubkey_filepath):
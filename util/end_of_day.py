@@ -2,19 +2,28 @@ import click
 import logging
 import os
 import pathlib
-import pyfiglet
-import subprocess
 import sys
 
-from colorama import Fore, Style
 from datetime import datetime
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.command import run_streaming
+from development_utils.logging_setup import log_step, setup_logging
+from development_utils.run_history import RunHistory
+from development_utils.startup import lazy_import, render_banner
+from development_utils.step_scheduler import DEFAULT_MAX_WORKERS, StepScheduler, load_steps
+
+colorama = lazy_import('colorama')
+
 DEFAULT_OUTDIR = "/tmp/" + os.path.basename(__file__) + '/' + str(datetime.today().strftime('%Y-%m-%d-%H%M%S'))
 
 LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
 
 LOG_LEVEL = logging.INFO
 
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'conf', 'end_of_day.ini')
+
 DEFAULT_VERBOSE = True
 
 
@@ -25,8 +34,8 @@ def print_red(msg: str = None) -> None:
     if msg is None:
         raise Exception("msg was not defined")
 
-    print(Fore.RED + msg)
-    print(Style.RESET_ALL + "", end="")
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
 
 
 def print_green(msg: str = None) -> None:
@@ -36,8 +45,8 @@ def print_green(msg: str = None) -> None:
     if msg is None:
         raise Exception("msg was not defined")
 
-    print(Fore.GREEN + msg)
-    print(Style.RESET_ALL + "", end="")
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
 
 
 def print_yellow(msg: str = None) -> None:
@@ -47,16 +56,19 @@ def print_yellow(msg: str = None) -> None:
     if msg is None:
         raise Exception("msg was not defined")
 
-    print(Fore.YELLOW + msg)
-    print(Style.RESET_ALL + "", end="")
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
 
 
-def _execute_cmd(cmd, outdir: str = DEFAULT_OUTDIR, stdout_file=None, stderr_file=None):
+def _execute_cmd(cmd, outdir: str = DEFAULT_OUTDIR, stdout_file=None, stderr_file=None, history: RunHistory = None, step: str = None):
     """Execute a command via system call using the subprocess module
     :param cmd: {str} - the executable to be invoked
     :param outdir: {str} - the output directory where STDOUT, STDERR and the shell script should be written to
     :param stdout_file: {str} - the file to which STDOUT will be captured in
     :param stderr_file: {str} - the file to which STDERR will be captured in
+    :param history: {RunHistory} - when specified, the resource usage is recorded
+    :param step: {str} - the step name recorded in the history - default is the command
+    :return stdout_file: {str} - the file STDOUT was streamed to
     """
     if cmd is None:
         raise Exception("cmd was not specified")
@@ -83,51 +95,52 @@ def _execute_cmd(cmd, outdir: str = DEFAULT_OUTDIR, stdout_file=None, stderr_fil
         logging.info(f"STDERR file '{stderr_file}' already exists so will delete it now")
         os.remove(stderr_file)
 
-    p = subprocess.Popen(cmd, shell=True)
-
-    (stdout, stderr) = p.communicate()
+    result = run_streaming(cmd, stdout_file=stdout_file, stderr_file=stderr_file)
 
-    pid = p.pid
+    logging.info(f"The return code was '{result.returncode}'")
+    logging.info(f"Captured '{result.stdout_bytes}' bytes of STDOUT in '{stdout_file}'")
+    logging.info(f"Captured '{result.stderr_bytes}' bytes of STDERR in '{stderr_file}'")
 
-    logging.info(f"The child process ID is '{pid}'")
+    if history is not None:
+        history.record(step or cmd, result)
 
-    p_status = p.wait()
-
-    p_returncode = p.returncode
-
-    if p_returncode is not None:
-        logging.info(f"The return code was '{p_returncode}'")
-    else:
-        logging.info("There was no return code")
-
-    if p_status == 0:
+    if result.returncode == 0:
         logging.info(f"Execution of cmd '{cmd}' has completed")
     else:
-        raise Exception(f"Received status '{p_status}'")
-
-    if stdout is not None:
-        logging.info("stdout is: " + stdout)
-
-    if stderr is not None:
-        logging.info("stderr is: " + stderr)
+        logging.error(f"The tail of STDERR for cmd '{cmd}' was:\n{result.stderr_tail}")
+        raise Exception(f"Received status '{result.returncode}' - see '{stderr_file}'")
 
     return stdout_file
 
 
 @click.command()
+@click.option('--config_file', help=f"The INI file declaring the steps - default is '{DEFAULT_CONFIG_FILE}'")
 @click.option('--logfile', help="The log file")
+@click.option('--max_workers', type=int, help=f"The maximum number of steps to execute at the same time - default is '{DEFAULT_MAX_WORKERS}'")
 @click.option('--outdir', help="The default is the current working directory - default is '{DEFAULT_OUTDIR}'")
 @click.option('--verbose', is_flag=True, help=f"Will print more info to STDOUT - default is '{DEFAULT_VERBOSE}'")
-def main(logfile: str, outdir: str, verbose: bool):
+def main(config_file: str, logfile: str, max_workers: int, outdir: str, verbose: bool):
     """Run End of Day scripts"""
 
-    print(pyfiglet.figlet_format("End of Day"))
+    print(render_banner("End of Day"))
 
     error_ctr = 0
 
+    if config_file is None:
+        config_file = DEFAULT_CONFIG_FILE
+        print_yellow(f"--config_file was not specified and therefore was set to '{config_file}'")
+
+    if not os.path.exists(config_file):
+        print_red(f"config file '{config_file}' does not exist")
+        error_ctr += 1
+
     if error_ctr > 0:
         sys.exit(1)
 
+    if max_workers is None:
+        max_workers = DEFAULT_MAX_WORKERS
+        print_yellow(f"--max_workers was not specified and therefore was set to '{max_workers}'")
+
     if outdir is None:
         outdir = DEFAULT_OUTDIR
         print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
@@ -145,11 +158,32 @@ def main(logfile: str, outdir: str, verbose: bool):
 
     assert isinstance(logfile, str)
 
-    logging.basicConfig(filename=logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    steps = load_steps(config_file)
+
+    history = RunHistory(os.path.basename(__file__))
+
+    def execute_step(step):
+        with log_step(step.name):
+            _execute_cmd(
+                step.cmd,
+                outdir=outdir,
+                stdout_file=os.path.join(outdir, step.name + '.stdout'),
+                stderr_file=os.path.join(outdir, step.name + '.stderr'),
+                history=history,
+                step=step.name,
+            )
+
+    scheduler = StepScheduler(steps, execute_step, max_workers=max_workers)
+
+    if not scheduler.run():
+        for step in steps.values():
+            if step.error is not None:
+                print_red(f"{step.status}: {step.name} - {step.error}")
+        print_red(f"See the log file '{logfile}' for details")
+        sys.exit(1)
 
-    cmd = f"bash {os.path.join(os.getenv('HOME'), 'pycharm-utils', 'util', 'install_pycharm_live_template.sh')}"
-    print(f"\n\nNow attempting to execute {cmd}")
-    _execute_cmd(cmd)
     print("Have a great day!!")
     
 
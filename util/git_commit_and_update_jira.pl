@@ -30,6 +30,10 @@ use constant DEFAULT_INDIR => File::Spec->rel2abs(cwd());
 
 use constant DEFAULT_ADMIN_EMAIL_ADDRESS => '';
 
+use constant DEFAULT_QUEUE_JIRA_COMMENT => FALSE;
+
+use constant JIRA_QUEUE_SCRIPT => "$FindBin::Bin/jira_queue.py";
+
 my $login =  getlogin || getpwuid($<) || "";
 
 use constant DEFAULT_OUTDIR => '/tmp/' . $login . '/' . File::Basename::basename($0) . '/' . time();
@@ -60,6 +64,7 @@ my (
     $git_commit_asset_list_file,    
     $admin_email_address,
     $is_commit_and_push,
+    $queue_jira_comment,
     $test_mode
     );
 
@@ -78,6 +83,7 @@ my $results = GetOptions (
     'git_commit_asset_list_file=s'   => \$git_commit_asset_list_file,    
     'admin_email_address=s'          => \$admin_email_address,
     'commit-push=s'                  => \$is_commit_and_push,
+    'queue_jira_comment'             => \$queue_jira_comment,
     'test_mode=s'                    => \$test_mode,
     );
 
@@ -167,7 +173,22 @@ if ($git_manager->isCommitPushed()){
         $jira_manager->setComment($jira_comment);
     }
 
-    $jira_manager->addComment();
+    if ($queue_jira_comment){
+        ## Hand the comment to the local Jira queue; it is sent in the background so the commit does not wait for Jira.
+        my $body = $jira_manager->getComment();
+        $body =~ s|\\n|\n|g;
+
+        my @cmd = ('python3', JIRA_QUEUE_SCRIPT, 'comment', '--issue', $jira_issue_id, '--body', $body, '--config_file', $config_file, '--logfile', $outdir . '/jira_queue.py.log');
+
+        $logger->info("About to execute '" . join(' ', @cmd) . "'");
+
+        if (system(@cmd) != 0){
+            $logger->logdie("Could not queue the comment for JIRA issue '$jira_issue_id'");
+        }
+    }
+    else {
+        $jira_manager->addComment();
+    }
 }
 else {
 
@@ -276,6 +297,18 @@ sub checkCommandLineArguments {
 
     $logfile = File::Spec->rel2abs($logfile);
 
+    if (!defined($queue_jira_comment)){
+
+        $queue_jira_comment = DEFAULT_QUEUE_JIRA_COMMENT;
+    }
+
+    if (($queue_jira_comment) && (!defined($jira_issue_id))){
+
+        printBoldRed("--jira_issue_id must be specified with --queue_jira_comment");
+
+        exit(1);
+    }
+
    if (!defined($is_commit_and_push)){
 
         $is_commit_and_push = DEFAULT_IS_COMMIT_AND_PUSH;
@@ -412,6 +445,12 @@ __END__
   if the --logfile option is not specified.
   A default value is assigned /tmp/[username]/webInstaller.pl/[timestamp]/
 
+=item B<--queue_jira_comment>
+
+  Queue the JIRA comment with util/jira_queue.py instead of posting it during
+  the run; the queue is flushed in the background with the Jira settings of
+  --config_file.  Requires --jira_issue_id.
+
 =item B<--install-dir>
 
   The directory where the web-based components will be installed.
@@ -0,0 +1,178 @@
+import click
+import logging
+import os
+import pathlib
+import subprocess
+import sys
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.git_mirror_cache import DEFAULT_MIRROR_DIR, GitMirrorCache
+from development_utils.git_status_scanner import get_repo_status
+from development_utils.logging_setup import setup_logging
+from development_utils.parallel_archive import (
+    DEFAULT_LEVELS,
+    DEFAULT_MAX_WORKERS,
+    EXTENSIONS,
+    FORMATS,
+    archive_directory,
+)
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+DEFAULT_FORMAT = 'gzip'
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def get_reference_mirror(indir: str, mirror_dir: str) -> str:
+    """Find the GitMirrorCache mirror of the checkout's origin.
+    :param indir: {str} - the checkout
+    :param mirror_dir: {str} - the mirror cache directory
+    :return mirror: {str} - the mirror directory, or None when there is no origin or no mirror yet
+    """
+    p = subprocess.run(['git', 'config', '--get', 'remote.origin.url'], cwd=indir, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True)
+    url = p.stdout.strip()
+    if p.returncode != 0 or not url:
+        return None
+
+    mirror = GitMirrorCache(mirror_dir).mirror_path(url)
+    return mirror if os.path.isdir(mirror) else None
+
+
+@click.command()
+@click.option('--format', 'fmt', type=click.Choice(FORMATS), default=DEFAULT_FORMAT, help=f"The compression format - default is '{DEFAULT_FORMAT}'")
+@click.option('--indir', help="The git project to be archived - default is the current working directory")
+@click.option('--level', type=int, help=f"The compression level - default is '{DEFAULT_LEVELS['gzip']}' for gzip and '{DEFAULT_LEVELS['zstd']}' for zstd")
+@click.option('--logfile', help="The log file")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help=f"The number of compression threads - default is '{DEFAULT_MAX_WORKERS}'")
+@click.option('--mirror_dir', default=DEFAULT_MIRROR_DIR, help=f"The mirror cache used by --reference auto - default is '{DEFAULT_MIRROR_DIR}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--outfile', help="The archive file - default is <project>.<date> with the extension of --format in --outdir")
+@click.option('--reference', help="A bare mirror whose .git objects are left out of the archive, or 'auto' for the cached mirror of origin")
+def main(fmt: str, indir: str, level: int, logfile: str, max_workers: int, mirror_dir: str, outdir: str, outfile: str, reference: str):
+    """Archive a git project as a compressed tar file, compressing on every core"""
+
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    indir = os.path.abspath(indir)
+
+    if not os.path.isdir(indir):
+        print_red(f"input directory '{indir}' does not exist")
+        sys.exit(1)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    if outfile is None:
+        outfile = os.path.join(outdir, os.path.basename(indir) + '.' + datetime.today().strftime("%Y-%m-%d-%H%M%S") + EXTENSIONS[fmt])
+        print_yellow(f"--outfile was not specified and therefore was set to '{outfile}'")
+
+    if os.path.exists(outfile):
+        print_red(f"archive file '{outfile}' already exists")
+        sys.exit(1)
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    if reference == 'auto':
+        reference = get_reference_mirror(indir, mirror_dir)
+        if reference is None:
+            print_yellow(f"No mirror of the origin of '{indir}' was found in '{mirror_dir}' so every .git object will be archived")
+        else:
+            print_yellow(f"--reference was set to '{reference}'")
+
+    if reference is not None and not os.path.isdir(reference):
+        print_red(f"reference mirror '{reference}' does not exist")
+        sys.exit(1)
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        status_future = executor.submit(get_repo_status, indir) if os.path.exists(os.path.join(indir, '.git')) else None
+
+        try:
+            stats = archive_directory(indir, outfile, fmt=fmt, level=level, max_workers=max_workers, reference=reference)
+        except Exception as e:
+            logging.error(f"Could not archive '{indir}': {e}")
+            print_red(f"Could not archive '{indir}': {e}")
+            sys.exit(1)
+
+        status = status_future.result() if status_future is not None else None
+
+    if status is not None:
+        if status.error:
+            print_yellow(f"Could not determine the status of '{indir}': {status.error}")
+        elif status.has_uncommitted_assets:
+            print_yellow(f"'{indir}' has '{len(status.uncommitted_assets)}' uncommitted assets (staged, not staged or not tracked):")
+            for asset in status.uncommitted_assets:
+                print(f"    {asset}")
+        else:
+            print_green(f"'{indir}' has no uncommitted assets")
+
+    print(f"Archived '{stats.files}' files into '{outfile}'")
+    print(f"Read {stats.bytes_in / 1024 / 1024:.1f} MiB and wrote {stats.bytes_out / 1024 / 1024:.1f} MiB ({stats.ratio:.1%}) "
+          f"in {stats.seconds:.1f} seconds: {stats.throughput:.1f} MiB/s with '{max_workers}' {fmt} workers")
+
+    if reference is not None:
+        print(f"Left out '{stats.excluded_objects}' .git object files ({stats.excluded_bytes / 1024 / 1024:.1f} MiB) already in '{reference}'")
+
+    print(f"The log file is '{logfile}'")
+
+
+if __name__ == "__main__":
+    main()
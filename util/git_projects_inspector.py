@@ -0,0 +1,200 @@
+import click
+import logging
+import os
+import pathlib
+import shutil
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.git_status_scanner import DEFAULT_CACHE_FILE, DEFAULT_MAX_WORKERS, discover_repos, get_repo_status, scan
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+DEFAULT_INDIR = os.path.join(os.environ.get('HOME', '/tmp'), 'projects')
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+DEFAULT_TEST_MODE = True
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _is_still_removable(d: str, checkout: bool) -> bool:
+    """Check again, without the scan cache, that nothing was added since the scan.
+
+    The cached status does not notice edits or untracked files, so a checkout
+    reported as clean is asked for its status once more right before removal.
+    :param d: {str} - the directory
+    :param checkout: {bool} - True for a git checkout, False for an empty directory
+    """
+    if not checkout:
+        return os.path.isdir(d) and not os.listdir(d)
+
+    status = get_repo_status(d)
+    if status.error is not None:
+        print_red(f"Will not remove '{d}': {status.error}")
+        return False
+
+    if status.has_uncommitted_assets:
+        print_red(f"Will not remove '{d}': it now has '{len(status.uncommitted_assets)}' uncommitted assets")
+        logging.warning(f"'{d}' was reported as clean but now has uncommitted assets: {status.uncommitted_assets}")
+        return False
+
+    return True
+
+
+def _remove_directories(dirs: list, test_mode: bool, checkouts: bool = True) -> None:
+    """Prompt the user and remove the directories
+    :param dirs: {list} - the directories to be removed
+    :param test_mode: {bool} - if True, only report what would have been removed
+    :param checkouts: {bool} - whether the directories are git checkouts or empty directories
+    """
+    answer = input("Shall I remove them? [y/N] ").strip().upper()
+    if answer != 'Y':
+        return
+
+    for d in dirs:
+        if not _is_still_removable(d, checkouts):
+            continue
+
+        if test_mode:
+            print_yellow(f"Running in test mode - would have removed '{d}'")
+            continue
+
+        logging.info(f"Will remove directory '{d}'")
+        shutil.rmtree(d)
+
+
+@click.command()
+@click.option('--indir', help=f"The projects directory - default is '{DEFAULT_INDIR}'")
+@click.option('--logfile', help="The log file")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help=f"The number of concurrent git status calls - default is '{DEFAULT_MAX_WORKERS}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--pattern', help="Only inspect checkouts whose path matches this regular expression")
+@click.option('--refresh', is_flag=True, help="Ignore the scan cache - use after editing files without staging or committing them")
+@click.option('--report_uncommitted_assets_only', is_flag=True, help="Only report; do not offer to remove directories")
+@click.option('--test_mode', type=bool, default=DEFAULT_TEST_MODE, help=f"Report which directories would be removed without removing them - default is '{DEFAULT_TEST_MODE}'")
+@click.option('--verbose', is_flag=True, help="List the uncommitted assets of each checkout")
+def main(indir: str, logfile: str, max_workers: int, outdir: str, pattern: str, refresh: bool, report_uncommitted_assets_only: bool, test_mode: bool, verbose: bool):
+    """Scan all git checkouts under the projects directory for uncommitted assets"""
+
+    if indir is None:
+        indir = DEFAULT_INDIR
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    if not os.path.isdir(indir):
+        print_red(f"projects directory '{indir}' does not exist")
+        sys.exit(1)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    repos, empty_dirs = discover_repos(indir, pattern=pattern)
+
+    if not repos:
+        print_red(f"Did not find any project directories in '{indir}'")
+        sys.exit(1)
+
+    clean = []
+    uncommitted = []
+    failed = []
+
+    for status in scan(repos, max_workers=max_workers, cache_file=None if refresh else DEFAULT_CACHE_FILE):
+        suffix = ' (cached)' if status.cached else ''
+
+        if status.error is not None:
+            failed.append(status.path)
+            print_red(f"ERROR       {status.path}: {status.error}")
+        elif status.has_uncommitted_assets:
+            uncommitted.append(status.path)
+            print_red(f"UNCOMMITTED {status.path} [{status.branch}] {len(status.uncommitted_assets)} assets{suffix}")
+            if verbose:
+                for asset in status.uncommitted_assets:
+                    print(f"    {asset}")
+        else:
+            clean.append(status.path)
+            print_green(f"CLEAN       {status.path} [{status.branch}]{suffix}")
+
+    print(f"\nCompleted analysis of projects directory '{indir}'")
+
+    if clean:
+        print_green(f"\nThe following '{len(clean)}' project version directories have no uncommitted assets")
+        print("\n".join(sorted(clean)))
+        if not report_uncommitted_assets_only:
+            _remove_directories(sorted(clean), test_mode)
+
+    if empty_dirs:
+        print_red(f"\nThe following '{len(empty_dirs)}' directories are empty")
+        print("\n".join(empty_dirs))
+        if not report_uncommitted_assets_only:
+            _remove_directories(empty_dirs, test_mode, checkouts=False)
+
+    if uncommitted:
+        print_red(f"\nThe following '{len(uncommitted)}' project version directories have uncommitted assets")
+        print("\n".join(sorted(uncommitted)))
+        print("\nPlease inspect them and decide how to proceed.  Thanks.")
+
+    print(f"The log file is '{logfile}'")
+
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+import click
+import os
+import sys
+
+from colorama import Fore, Style
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.startup import measure_import_times
+
+DEFAULT_SCRIPTS = [
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'start_of_day.py'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'end_of_day.py'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'create_ssh_key.py'),
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'bin', 'prepare_release_steps.py'),
+]
+
+DEFAULT_BUDGET_MS = 150
+
+DEFAULT_TOP = 10
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(Fore.RED + msg)
+    print(Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(Fore.GREEN + msg)
+    print(Style.RESET_ALL + "", end="")
+
+
+@click.command()
+@click.option('--script', 'scripts', multiple=True, help="The script to measure, may be repeated - default is the Python entry points in this project")
+@click.option('--budget_ms', type=float, default=DEFAULT_BUDGET_MS, help=f"The import-time budget per script in milliseconds - default is '{DEFAULT_BUDGET_MS}'")
+@click.option('--top', type=int, default=DEFAULT_TOP, help=f"The number of most expensive top-level imports to report - default is '{DEFAULT_TOP}'")
+def main(scripts: tuple, budget_ms: float, top: int):
+    """Report per-module import cost of each script and check it against a budget"""
+
+    if not scripts:
+        scripts = DEFAULT_SCRIPTS
+
+    over_budget = 0
+
+    for script in scripts:
+        records = measure_import_times([script, '--help'])
+        top_level = [record for record in records if record[3] == 0]
+        total_ms = sum(record[2] for record in top_level) / 1000
+
+        print(f"\n{os.path.normpath(script)}: {total_ms:.1f} ms in '{len(records)}' module imports")
+        for name, self_us, cumulative_us, _ in sorted(top_level, key=lambda record: record[2], reverse=True)[:top]:
+            print(f"    {cumulative_us / 1000:8.1f} ms  {name}")
+
+        if total_ms > budget_ms:
+            print_red(f"{os.path.normpath(script)} exceeds the import-time budget of {budget_ms} ms")
+            over_budget += 1
+        else:
+            print_green(f"{os.path.normpath(script)} is within the import-time budget of {budget_ms} ms")
+
+    if over_budget > 0:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,218 @@
+import click
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.jira_client import (
+    DEFAULT_CONFIG_FILE,
+    DEFAULT_MAX_CONNECTIONS,
+    DEFAULT_QUEUE_FILE,
+    STATUS_FAILED,
+    JiraClient,
+    UpdateQueue,
+    flush as flush_queue,
+    load_jira_config,
+    spawn_flush,
+)
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _setup(logfile: str, queue_file: str, config_file: str) -> tuple:
+    """Apply the defaults shared by the sub-commands and set up logging."""
+    if logfile is None:
+        logfile = os.path.join(DEFAULT_OUTDIR, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    pathlib.Path(os.path.dirname(os.path.abspath(logfile))).mkdir(parents=True, exist_ok=True)
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    return queue_file or DEFAULT_QUEUE_FILE, config_file or DEFAULT_CONFIG_FILE
+
+
+def _enqueue(issue: str, action: str, value: str, background: bool, logfile: str, queue_file: str, config_file: str) -> None:
+    queue_file, config_file = _setup(logfile, queue_file, config_file)
+
+    with UpdateQueue(queue_file) as update_queue:
+        update = update_queue.enqueue(issue, action, value)
+
+    print(f"Queued {action} '{update.id}' for Jira issue '{issue}' in '{queue_file}'")
+
+    if background:
+        pid = spawn_flush(queue_file, config_file)
+        print(f"Started the background flush '{pid}'")
+
+
+QUEUE_OPTIONS = (
+    click.option('--config_file', help=f"The INI file with the [jira] url (or [Jira] issue_rest_url), username and password - default is '{DEFAULT_CONFIG_FILE}'"),
+    click.option('--logfile', help="The log file"),
+    click.option('--queue_file', help=f"The queue database - default is '{DEFAULT_QUEUE_FILE}'"),
+)
+
+
+def queue_options(func):
+    for option in reversed(QUEUE_OPTIONS):
+        func = option(func)
+    return func
+
+
+@click.group()
+def main():
+    """Queue Jira comments and transitions and send them in the background"""
+
+
+@main.command()
+@click.option('--background/--no_background', default=True, help="Start a background flush after queuing - default is to start one")
+@click.option('--body', help="The comment")
+@click.option('--body_file', type=click.Path(exists=True, dir_okay=False), help="A file containing the comment")
+@click.option('--issue', required=True, help="The Jira issue, e.g. ABC-123")
+@queue_options
+def comment(background: bool, body: str, body_file: str, issue: str, config_file: str, logfile: str, queue_file: str):
+    """Queue a comment on an issue"""
+    if body_file is not None:
+        with open(body_file) as f:
+            body = f.read()
+
+    if not body or not body.strip():
+        print_red("Either --body or --body_file must be specified")
+        sys.exit(1)
+
+    _enqueue(issue, 'comment', body, background, logfile, queue_file, config_file)
+
+
+@main.command()
+@click.option('--background/--no_background', default=True, help="Start a background flush after queuing - default is to start one")
+@click.option('--issue', required=True, help="The Jira issue, e.g. ABC-123")
+@click.option('--to', 'transition', required=True, help="The transition name (e.g. 'Resolve Issue') or id")
+@queue_options
+def transition(background: bool, issue: str, transition: str, config_file: str, logfile: str, queue_file: str):
+    """Queue a workflow transition of an issue"""
+    _enqueue(issue, 'transition', transition, background, logfile, queue_file, config_file)
+
+
+@main.command()
+@click.option('--drain', is_flag=True, help="Keep running, waiting for the retries, until no pending update is left")
+@click.option('--max_connections', type=int, default=DEFAULT_MAX_CONNECTIONS, help=f"The number of pooled connections to Jira - default is '{DEFAULT_MAX_CONNECTIONS}'")
+@click.option('--no_wait', is_flag=True, help="Return at once when another flush is running")
+@queue_options
+def flush(drain: bool, max_connections: int, no_wait: bool, config_file: str, logfile: str, queue_file: str):
+    """Send every due update to Jira"""
+    queue_file, config_file = _setup(logfile, queue_file, config_file)
+
+    config = load_jira_config(config_file)
+    if not config['url']:
+        print_red(f"The Jira url is not defined in config file '{config_file}' or JIRA_URL; the updates stay queued")
+        sys.exit(1)
+
+    client = JiraClient(config['url'], config['username'], config['password'], max_connections=max_connections)
+
+    try:
+        with UpdateQueue(queue_file) as update_queue:
+            stats = flush_queue(update_queue, client, blocking=not no_wait, drain=drain)
+    finally:
+        client.close()
+
+    if stats['skipped']:
+        print_yellow("Another flush is running")
+        return
+
+    print(f"Sent '{stats['sent']}' of '{stats['due']}' due updates over '{client.connections_opened}' connections in {stats['seconds']:.2f} seconds")
+
+    if stats['retrying']:
+        print_yellow(f"'{stats['retrying']}' updates will be retried")
+
+    if stats['failed']:
+        print_red(f"'{stats['failed']}' updates were rejected - see 'status' and 'retry'")
+        sys.exit(1)
+
+
+@main.command()
+@click.option('--failed', is_flag=True, help="Only list the updates Jira rejected")
+@queue_options
+def status(failed: bool, config_file: str, logfile: str, queue_file: str):
+    """List the queued updates"""
+    queue_file, _ = _setup(logfile, queue_file, config_file)
+
+    with UpdateQueue(queue_file) as update_queue:
+        updates = update_queue.updates(STATUS_FAILED if failed else None)
+
+    for update in updates:
+        created = datetime.fromtimestamp(update.created).strftime('%Y-%m-%d %H:%M:%S')
+        line = f"{update.id}\t{update.status}\t{created}\t{update.issue}\t{update.action}\t{update.value.splitlines()[0][:60]}"
+        if update.last_error:
+            line += f"\t(attempts: {update.attempts}; {update.last_error})"
+        print(line)
+
+    print(f"'{len(updates)}' updates are queued in '{queue_file}'")
+
+
+@main.command()
+@click.option('--background/--no_background', default=True, help="Start a background flush - default is to start one")
+@click.option('--id', 'ids', type=int, multiple=True, help="Only retry this update (can be repeated) - default is every failed update")
+@queue_options
+def retry(background: bool, ids: tuple, config_file: str, logfile: str, queue_file: str):
+    """Make failed updates due again"""
+    queue_file, config_file = _setup(logfile, queue_file, config_file)
+
+    with UpdateQueue(queue_file) as update_queue:
+        count = update_queue.retry(list(ids))
+
+    print_green(f"'{count}' updates are due again")
+
+    if background and count:
+        spawn_flush(queue_file, config_file)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import click
+import os
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.log_reader import DEFAULT_SESSION_GAP, FORMATS, LogFile, follow, to_seconds
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DATETIME_FORMATS = ('%Y-%m-%d %H:%M:%S', '%Y-%m-%dT%H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%d')
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _parse_datetime(value: str) -> float:
+    """Convert a command-line date/time into the seconds used by the log index
+    :param value: {str} - e.g. '2026-10-18 17:09:17'
+    :return: {float}
+    """
+    for fmt in DATETIME_FORMATS:
+        try:
+            return to_seconds(datetime.strptime(value, fmt))
+        except ValueError:
+            continue
+    raise click.BadParameter(f"'{value}' does not match any of {', '.join(DATETIME_FORMATS)}")
+
+
+def _write_line(line: bytes) -> None:
+    sys.stdout.buffer.write(line + b'\n')
+
+
+@click.command()
+@click.option('--end', help="Only show entries at or before this date/time, e.g. '2026-10-18 17:30:00'")
+@click.option('--follow', 'follow_mode', is_flag=True, help="Keep printing new lines as they are appended to the log file")
+@click.option('--format', 'log_format', type=click.Choice(sorted(FORMATS)), help="The log timestamp format - default is to detect it")
+@click.option('--logfile', help="The log file to read")
+@click.option('--session_gap', type=float, default=DEFAULT_SESSION_GAP, help=f"Seconds of inactivity that separate sessions - default is '{DEFAULT_SESSION_GAP}'")
+@click.option('--session_marker', help="Regular expression matching the first line of a session; overrides --session_gap")
+@click.option('--start', help="Only show entries at or after this date/time, e.g. '2026-10-18 17:00:00'")
+def main(end: str, follow_mode: bool, log_format: str, logfile: str, session_gap: float, session_marker: str, start: str):
+    """Show the most recent session, or a time range, of a log file"""
+
+    if logfile is None:
+        print_red("--logfile was not specified")
+        sys.exit(1)
+
+    if not os.path.exists(logfile):
+        print_red(f"log file '{logfile}' does not exist")
+        sys.exit(1)
+
+    log = LogFile(logfile, log_format=log_format)
+
+    try:
+        if start is not None or end is not None:
+            start_ts = _parse_datetime(start) if start is not None else None
+            end_ts = _parse_datetime(end) if end is not None else None
+            for _, line in log.time_range(start_ts, end_ts):
+                _write_line(line)
+        else:
+            offset = log.latest_session(marker=session_marker, gap=session_gap)
+            print_yellow(f"The most recent session in '{logfile}' starts at byte offset '{offset}'")
+            print("__BEGIN__")
+            for _, line in log.lines(offset):
+                _write_line(line)
+            print("__END__", flush=True)
+
+        size = log.size
+    finally:
+        log.close()
+
+    if follow_mode:
+        try:
+            for line in follow(logfile, size):
+                _write_line(line)
+                sys.stdout.flush()
+        except KeyboardInterrupt:
+            pass
+
+
+if __name__ == "__main__":
+    main()
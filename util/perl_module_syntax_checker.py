@@ -0,0 +1,138 @@
+import click
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.logging_setup import setup_logging
+from development_utils.perl_syntax import DEFAULT_CACHE_FILE, DEFAULT_MAX_WORKERS, check_modules
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+@click.command()
+@click.option('--cache_file', help=f"The cached results - default is '{DEFAULT_CACHE_FILE}'")
+@click.option('--full', is_flag=True, help="Check every module instead of trusting cached results")
+@click.option('--indir', help="Comma-separated directories containing the modules; '/lib' is appended unless the directory is named lib - default is the current working directory")
+@click.option('--logfile', help="The log file")
+@click.option('--max_workers', type=int, default=DEFAULT_MAX_WORKERS, help=f"The number of perl processes run at the same time - default is '{DEFAULT_MAX_WORKERS}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--verbose', is_flag=True, help="Print the perl output of every module with errors")
+def main(cache_file: str, full: bool, indir: str, logfile: str, max_workers: int, outdir: str, verbose: bool):
+    """Check the syntax (perl -wc) of the Perl modules in one or more lib directories"""
+
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    lib_dirs = []
+    for directory in indir.split(','):
+        directory = os.path.abspath(directory)
+        if os.path.basename(directory) != 'lib':
+            directory = os.path.join(directory, 'lib')
+        if not os.path.isdir(directory):
+            print_red(f"'{directory}' is not a regular directory")
+            sys.exit(1)
+        lib_dirs.append(directory)
+
+    if cache_file is None:
+        cache_file = DEFAULT_CACHE_FILE
+        print_yellow(f"--cache_file was not specified and therefore was set to '{cache_file}'")
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    failed = []
+    checked_ctr = 0
+    cached_ctr = 0
+
+    for result in check_modules(lib_dirs, cache_file=cache_file, max_workers=max_workers, full=full):
+        checked_ctr += 1
+        if result.cached:
+            cached_ctr += 1
+        label = 'cached' if result.cached else f"{result.seconds:.2f}s"
+
+        if result.status == 'OK':
+            print(f"OK      {result.module} ({label})")
+        else:
+            failed.append(result)
+            print_red(f"FAILED  {result.module} ({label})")
+            logging.error(f"'{result.module_file}' failed the syntax check:\n{result.output}")
+            if verbose:
+                print(result.output)
+
+    print(f"Processed '{checked_ctr}' module files ('{cached_ctr}' results from the cache)")
+
+    if failed:
+        print_red(f"Found the following '{len(failed)}' modules with syntax errors:")
+        for result in sorted(failed, key=lambda result: result.module):
+            print(f"\t{result.module_file}")
+        print(f"The log file is '{logfile}'")
+        sys.exit(1)
+
+    print_green("All modules had good syntax")
+    print(f"The log file is '{logfile}'")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+import click
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.logging_setup import setup_logging
+from development_utils.perl_dependency_index import DEFAULT_INDEX_DIR, DependencyIndex
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+@click.command()
+@click.option('--index_file', help=f"The dependency index database - default is derived from --indir under '{DEFAULT_INDEX_DIR}'")
+@click.option('--indir', help="The directory containing the Perl modules - default is the current working directory")
+@click.option('--logfile', help="The log file")
+@click.option('--module', required=True, help="The package whose users are reported, e.g. DevelopmentUtils::Logger or Moose")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--transitive', is_flag=True, help="Also report the modules that depend on --module through other modules")
+def main(index_file: str, indir: str, logfile: str, module: str, outdir: str, transitive: bool):
+    """Report the Perl modules that use a package, from an incrementally updated index"""
+
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    indir = os.path.abspath(indir)
+
+    if not os.path.isdir(indir):
+        print_red(f"input directory '{indir}' does not exist")
+        sys.exit(1)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    with DependencyIndex(indir, index_file=index_file) as index:
+        stats = index.update()
+        print(f"Indexed '{stats['files']}' modules in directory '{indir}' (parsed '{stats['parsed']}' in {stats['seconds']:.2f} seconds)")
+
+        uses = index.dependents(module) if transitive else index.users(module)
+
+    if not uses:
+        print_yellow(f"Looks like no modules in directory '{indir}' depend on module '{module}'")
+        return
+
+    direct = [use for use in uses if use.depth == 1]
+    print(f"\nThe module '{module}' is used directly by the following '{len(direct)}' modules:")
+    for use in direct:
+        print_yellow(f"\n{use.package} in file:")
+        print(f"{os.path.join(indir, use.path)} at line {use.line}\n\t{use.text}")
+
+    indirect = [use for use in uses if use.depth > 1]
+    if indirect:
+        print(f"\nThe following '{len(indirect)}' modules depend on '{module}' through other modules:")
+        for use in indirect:
+            print(f"\t{use.package}\t(depth {use.depth}, via line {use.line}: {use.text})")
+
+    print_green(f"\n'{len(uses)}' modules depend on '{module}'")
+
+
+if __name__ == "__main__":
+    main()
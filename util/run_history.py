@@ -0,0 +1,92 @@
+import click
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.run_history import (
+    DEFAULT_HISTORY_FILE,
+    DEFAULT_REGRESSION_THRESHOLD,
+    find_regressions,
+    summarize,
+)
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_DAYS = 30
+
+DEFAULT_RECENT_DAYS = 7
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+@click.group()
+def main():
+    """Inspect the run history recorded by the day/release/ssh-key scripts"""
+
+
+@main.command()
+@click.option('--days', type=float, default=DEFAULT_DAYS, help=f"The number of days summarised - default is '{DEFAULT_DAYS}'")
+@click.option('--history_file', default=DEFAULT_HISTORY_FILE, help=f"The run history database - default is '{DEFAULT_HISTORY_FILE}'")
+@click.option('--recent_days', type=float, default=DEFAULT_RECENT_DAYS, help=f"Runs in this many recent days are compared with the rest of the period - default is '{DEFAULT_RECENT_DAYS}'")
+@click.option('--script', help="Only report the steps of this script, e.g. start_of_day.py")
+@click.option('--threshold', type=float, default=DEFAULT_REGRESSION_THRESHOLD, help=f"The relative slow-down reported as a regression - default is '{DEFAULT_REGRESSION_THRESHOLD}'")
+def report(days: float, history_file: str, recent_days: float, script: str, threshold: float):
+    """Report p50/p95 wall time per step and the regressions since last week"""
+
+    if not os.path.exists(history_file):
+        print_red(f"run history '{history_file}' does not exist")
+        sys.exit(1)
+
+    summaries = summarize(history_file, days=days, script=script)
+    if not summaries:
+        print(f"No runs were recorded in the last '{days:g}' days")
+        return
+
+    width = max(len(f"{s.script} {s.step}") for s in summaries)
+    print(f"Wall time per step over the last {days:g} days\n")
+    print(f"{'step':<{width}}  {'runs':>5}  {'failed':>6}  {'p50 (s)':>9}  {'p95 (s)':>9}  {'peak RSS (MiB)':>14}")
+    for s in summaries:
+        print(f"{s.script + ' ' + s.step:<{width}}  {s.runs:>5}  {s.failures:>6}  {s.p50:>9.2f}  {s.p95:>9.2f}  {s.max_rss_kb / 1024:>14.1f}")
+
+    regressions = find_regressions(
+        history_file,
+        recent_days=recent_days,
+        baseline_days=max(days - recent_days, recent_days),
+        threshold=threshold,
+        script=script,
+    )
+
+    print()
+    if not regressions:
+        print_green(f"No step slowed down by more than {threshold:.0%} in the last {recent_days:g} days")
+        return
+
+    print_red(f"Steps that slowed down by more than {threshold:.0%} in the last {recent_days:g} days:")
+    for r in regressions:
+        print(f"    {r.script} {r.step}: median {r.baseline_p50:.2f}s -> {r.recent_p50:.2f}s ({r.change:+.0%})")
+
+
+if __name__ == "__main__":
+    main()
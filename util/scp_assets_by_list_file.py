@@ -0,0 +1,225 @@
+import click
+import hashlib
+import logging
+import os
+import pathlib
+import sys
+
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.asset_transfer import (
+    COMPARE_MODES,
+    DEFAULT_BATCH_BYTES,
+    DEFAULT_BATCH_FILES,
+    DEFAULT_COMPARE,
+    DEFAULT_MAX_PARALLEL,
+    REMOTE_DIGEST_PROGRAMS,
+    SshBackend,
+    parse_target,
+    read_asset_list,
+    transfer,
+)
+from development_utils.checksum_manifest import DEFAULT_ALGORITHM
+from development_utils.logging_setup import setup_logging
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+DEFAULT_USERNAME = 'root'
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def read_scp_conf_file(scp_conf_file: str, username: str) -> str:
+    """Derive the target from the scp_conf.txt written by scp_assets_by_list_file.pl.
+    :param scp_conf_file: {str} - target_machine=, target_base_dir= and project_dir= lines
+    :param username: {str} - the user on the target machine
+    :return target: {str} - user@host:dir
+    """
+    values = {}
+    with open(scp_conf_file) as f:
+        for line in f:
+            key, sep, value = line.strip().partition('=')
+            if sep:
+                values[key] = value.strip()
+
+    for key in ('target_machine', 'target_base_dir', 'project_dir'):
+        if not values.get(key):
+            raise Exception(f"'{key}' is not defined in scp configuration file '{scp_conf_file}'")
+
+    return f"{username}@{values['target_machine']}:{os.path.join(values['target_base_dir'], values['project_dir'])}"
+
+
+@click.command()
+@click.option('--algorithm', default=DEFAULT_ALGORITHM, help=f"The checksum algorithm used by --compare checksum; a remote target supports {', '.join(REMOTE_DIGEST_PROGRAMS)} - default is '{DEFAULT_ALGORITHM}'")
+@click.option('--asset_list_file', required=True, help="The file listing the assets to be transferred, one per line")
+@click.option('--backup', is_flag=True, help="Copy target files to <file>.<timestamp>.bak before they are overwritten")
+@click.option('--batch_bytes', type=int, default=DEFAULT_BATCH_BYTES, help=f"The maximum number of bytes per batch - default is '{DEFAULT_BATCH_BYTES}'")
+@click.option('--batch_files', type=int, default=DEFAULT_BATCH_FILES, help=f"The maximum number of files per batch - default is '{DEFAULT_BATCH_FILES}'")
+@click.option('--compare', type=click.Choice(COMPARE_MODES), default=DEFAULT_COMPARE, help=f"How unchanged target files are detected - default is '{DEFAULT_COMPARE}'")
+@click.option('--dry_run', is_flag=True, help="Only report which assets would be transferred")
+@click.option('--indir', help="The project base directory the assets are relative to - default is the current working directory")
+@click.option('--logfile', help="The log file")
+@click.option('--max_parallel', type=int, default=DEFAULT_MAX_PARALLEL, help=f"The number of batches transferred at the same time - default is '{DEFAULT_MAX_PARALLEL}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--report_file', help="The report file listing the transferred and skipped assets")
+@click.option('--scp_conf_file', help="The scp configuration file read when --target is not specified - default is scp_conf.txt in the current working directory")
+@click.option('--target', help="[user@]host:dir, or a local directory")
+@click.option('--username', default=DEFAULT_USERNAME, help=f"The user on the target machine when read from --scp_conf_file - default is '{DEFAULT_USERNAME}'")
+@click.option('--verbose', is_flag=True, help="List every transferred and skipped asset")
+def main(algorithm: str, asset_list_file: str, backup: bool, batch_bytes: int, batch_files: int, compare: str, dry_run: bool, indir: str,
+         logfile: str, max_parallel: int, outdir: str, report_file: str, scp_conf_file: str, target: str, username: str, verbose: bool):
+    """Transfer the assets in a list file in a few batches, skipping those the target already has"""
+
+    if not os.path.isfile(asset_list_file):
+        print_red(f"asset list file '{asset_list_file}' does not exist")
+        sys.exit(1)
+
+    if algorithm not in hashlib.algorithms_available:
+        print_red(f"--algorithm '{algorithm}' is not supported")
+        sys.exit(1)
+
+    if indir is None:
+        indir = os.getcwd()
+        print_yellow(f"--indir was not specified and therefore was set to '{indir}'")
+
+    indir = os.path.abspath(indir)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    if report_file is None:
+        report_file = os.path.join(outdir, 'report.txt')
+        print_yellow(f"--report_file was not specified and therefore was set to '{report_file}'")
+
+    if target is None:
+        if scp_conf_file is None:
+            scp_conf_file = os.path.join(os.getcwd(), 'scp_conf.txt')
+            print_yellow(f"--scp_conf_file was not specified and therefore was set to '{scp_conf_file}'")
+
+        if not os.path.isfile(scp_conf_file):
+            print_red(f"--target was not specified and scp configuration file '{scp_conf_file}' does not exist")
+            sys.exit(1)
+
+        target = read_scp_conf_file(scp_conf_file, username)
+        print_yellow(f"--target was not specified and therefore was set to '{target}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    assets = read_asset_list(asset_list_file)
+    if not assets:
+        print_red(f"Did not find any files in asset list file '{asset_list_file}'")
+        sys.exit(1)
+
+    backend = parse_target(target)
+
+    if compare == 'checksum' and isinstance(backend, SshBackend) and algorithm not in REMOTE_DIGEST_PROGRAMS:
+        print_red(f"--algorithm '{algorithm}' cannot be computed on '{backend.describe()}' - choose from {', '.join(REMOTE_DIGEST_PROGRAMS)}")
+        sys.exit(1)
+
+    try:
+        result = transfer(
+            indir,
+            assets,
+            backend,
+            compare=compare,
+            algorithm=algorithm,
+            max_parallel=max_parallel,
+            batch_files=batch_files,
+            batch_bytes=batch_bytes,
+            backup=backup,
+            dry_run=dry_run,
+        )
+    except Exception as e:
+        logging.error(f"Could not transfer the assets in '{asset_list_file}': {e}")
+        print_red(f"Could not transfer the assets in '{asset_list_file}': {e}")
+        sys.exit(1)
+
+    with open(report_file, 'w') as of:
+        of.write(f"## target: {backend.describe()}\n")
+        for relpath in result.sent:
+            of.write(f"{'would transfer' if dry_run else 'transferred'}\t{relpath}\n")
+        for relpath in result.skipped:
+            of.write(f"unchanged\t{relpath}\n")
+
+    if verbose:
+        for relpath in result.sent:
+            print(f"    {'would transfer' if dry_run else 'transferred'} {relpath}")
+        for relpath in result.skipped:
+            print(f"    unchanged {relpath}")
+
+    print(f"Processed '{result.files}' files from '{len(assets)}' assets: '{len(result.skipped)}' are unchanged on '{backend.describe()}'")
+
+    if dry_run:
+        print_yellow(f"Would transfer '{len(result.sent)}' files")
+    else:
+        print(f"Transferred '{len(result.sent)}' files ({result.bytes_sent / 1024 / 1024:.1f} MiB) in '{result.batches}' batches "
+              f"in {result.seconds:.1f} seconds")
+        if result.backed_up:
+            print(f"Backed up '{result.backed_up}' target files before overwriting them")
+
+    print(f"The report file is '{report_file}'")
+    print(f"The log file is '{logfile}'")
+
+    if result.errors:
+        print_red(f"'{len(result.errors)}' batches failed - see the log file '{logfile}'")
+        sys.exit(1)
+
+    print_green(f"{os.path.basename(__file__)} execution completed")
+
+
+if __name__ == "__main__":
+    main()
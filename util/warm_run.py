@@ -0,0 +1,32 @@
+"""Run a dev-utils Python script on the warm command server.
+
+Usage: python warm_run.py SCRIPT [ARGS...]
+e.g.   alias start_of_day='python3 ~/dev-utils/util/warm_run.py start_of_day.py'
+
+Falls back to running the script in a fresh interpreter when
+util/command_server.py is not running, so aliases can always use the shim.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.command_server import resolve_script, run_remote
+
+
+def main():
+    if len(sys.argv) < 2:
+        print(f"Usage: python {os.path.basename(__file__)} [script, e.g. start_of_day.py] [script arguments]")
+        sys.exit(2)
+
+    script, args = sys.argv[1], sys.argv[2:]
+
+    try:
+        sys.exit(run_remote(script, args))
+    except (ConnectionRefusedError, FileNotFoundError):
+        path = resolve_script(script)
+        os.execv(sys.executable, [sys.executable, path] + args)
+
+
+if __name__ == "__main__":
+    main()
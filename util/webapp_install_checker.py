@@ -0,0 +1,167 @@
+import click
+import json
+import logging
+import os
+import pathlib
+import sys
+
+from dataclasses import asdict
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'lib'))
+
+from development_utils.logging_setup import setup_logging
+from development_utils.smoke_tests import (
+    DEFAULT_MAX_CONCURRENCY,
+    DEFAULT_PER_HOST_LIMIT,
+    PERCENTILES,
+    load_checks,
+    run_checks,
+    summarize,
+)
+from development_utils.startup import lazy_import
+
+colorama = lazy_import('colorama')
+
+DEFAULT_CONFIG_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'conf', 'webapp_smoke_tests.ini')
+
+DEFAULT_OUTDIR = os.path.join(
+    "/tmp",
+    os.path.splitext(os.path.basename(__file__))[0],
+    str(datetime.today().strftime("%Y-%m-%d-%H%M%S")),
+)
+
+LOGGING_FORMAT = "%(levelname)s : %(asctime)s : %(pathname)s : %(lineno)d : %(message)s"
+
+LOG_LEVEL = logging.INFO
+
+
+def print_red(msg: str = None) -> None:
+    """Print message to STDOUT in red text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.RED + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_green(msg: str = None) -> None:
+    """Print message to STDOUT in green text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.GREEN + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def print_yellow(msg: str = None) -> None:
+    """Print message to STDOUT in yellow text.
+    :param msg: {str} - the message to be printed
+    """
+    if msg is None:
+        raise Exception("msg was not defined")
+
+    print(colorama.Fore.YELLOW + msg)
+    print(colorama.Style.RESET_ALL + "", end="")
+
+
+def _ms(seconds: float) -> str:
+    return f"{seconds * 1000:8.1f}"
+
+
+@click.command()
+@click.option('--config_file', help=f"The INI file declaring the instances and their checks - default is '{DEFAULT_CONFIG_FILE}'")
+@click.option('--instance', multiple=True, help="Only check this instance (section); may be repeated")
+@click.option('--logfile', help="The log file")
+@click.option('--max_concurrency', type=int, default=DEFAULT_MAX_CONCURRENCY, help=f"The maximum number of requests in flight - default is '{DEFAULT_MAX_CONCURRENCY}'")
+@click.option('--outdir', help=f"The output directory - default is '{DEFAULT_OUTDIR}'")
+@click.option('--outfile', help="The JSON file with the result of every request")
+@click.option('--per_host_limit', type=int, default=DEFAULT_PER_HOST_LIMIT, help=f"The maximum number of connections per host - default is '{DEFAULT_PER_HOST_LIMIT}'")
+@click.option('--verbose', is_flag=True, help="Report the result of every request")
+def main(config_file: str, instance: tuple, logfile: str, max_concurrency: int, outdir: str, outfile: str, per_host_limit: int, verbose: bool):
+    """Run the smoke tests of installed webapp instances concurrently and report their latency"""
+
+    if config_file is None:
+        config_file = DEFAULT_CONFIG_FILE
+        print_yellow(f"--config_file was not specified and therefore was set to '{config_file}'")
+
+    if not os.path.exists(config_file):
+        print_red(f"config file '{config_file}' does not exist")
+        sys.exit(1)
+
+    if outdir is None:
+        outdir = DEFAULT_OUTDIR
+        print_yellow(f"--outdir was not specified and therefore was set to '{outdir}'")
+
+    if not os.path.exists(outdir):
+        pathlib.Path(outdir).mkdir(parents=True, exist_ok=True)
+
+        print_yellow(f"Created output directory '{outdir}'")
+
+    if logfile is None:
+        logfile = os.path.join(outdir, os.path.basename(__file__) + '.log')
+        print_yellow(f"--logfile was not specified and therefore was set to '{logfile}'")
+
+    if outfile is None:
+        outfile = os.path.join(outdir, 'results.json')
+        print_yellow(f"--outfile was not specified and therefore was set to '{outfile}'")
+
+    setup_logging(logfile, format=LOGGING_FORMAT, level=LOG_LEVEL)
+
+    checks = load_checks(config_file)
+
+    if instance:
+        unknown = sorted(set(instance) - {check.instance for check in checks})
+        if unknown:
+            print_red(f"instances '{', '.join(unknown)}' are not declared in config file '{config_file}'")
+            sys.exit(1)
+        checks = [check for check in checks if check.instance in instance]
+
+    if not checks:
+        print_red(f"No checks are declared in config file '{config_file}'")
+        sys.exit(1)
+
+    results, stats = run_checks(checks, max_concurrency=max_concurrency, per_host_limit=per_host_limit)
+
+    with open(outfile, 'w') as of:
+        json.dump([{**asdict(result), 'check': asdict(result.check)} for result in results], of, indent=2)
+
+    failures = [result for result in results if not result.ok]
+
+    if verbose:
+        for result in results:
+            line = f"    {result.check.instance} {result.check.url}: {result.status} in {_ms(result.latency or 0).strip()} ms"
+            if result.ok:
+                print(line)
+            else:
+                print_red(f"{line} - {result.error}")
+
+    header = 'check'.ljust(30) + ''.join(f"ttfb p{p} ".rjust(10) for p in PERCENTILES) + ''.join(f"p{p} ms".rjust(10) for p in PERCENTILES) + '  failed'
+    print(header)
+    for summary in summarize(results):
+        print(summary.name[:30].ljust(30)
+              + ''.join(_ms(summary.ttfb[p]).rjust(10) for p in PERCENTILES)
+              + ''.join(_ms(summary.latency[p]).rjust(10) for p in PERCENTILES)
+              + f"  {summary.failures}/{summary.count}")
+
+    instances = len({check.instance for check in checks})
+    print(f"Ran '{stats['requests']}' requests against '{instances}' instances over '{stats['connections']}' connections "
+          f"in {stats['seconds']:.2f} seconds")
+    print(f"The results file is '{outfile}'")
+    print(f"The log file is '{logfile}'")
+
+    if failures:
+        for result in failures if not verbose else ():
+            print_red(f"{result.check.instance} {result.check.url}: {result.error}")
+        print_red(f"'{len(failures)}' of '{len(results)}' requests failed")
+        sys.exit(1)
+
+    print_green(f"All '{len(results)}' requests passed")
+
+
+if __name__ == "__main__":
+    main()